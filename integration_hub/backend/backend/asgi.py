@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core_hub.lifespan import LifespanMiddleware  # noqa: E402
+
+# Runs core_hub shutdown hooks (e.g. closing pooled HTTP clients) on exit
+application = LifespanMiddleware(django_application)
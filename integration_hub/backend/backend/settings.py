@@ -167,3 +167,23 @@ LOGGING = {
         },
     },
 }
+
+# Integration Hub runtime tuning (see core_hub/conf.py for defaults)
+INTEGRATION_HUB = {
+    'BATCH_MAX_RECORDS': int(os.environ.get('HUB_BATCH_MAX_RECORDS', 50000)),
+    'OFFLOAD_ENABLED': os.environ.get('HUB_OFFLOAD_ENABLED', 'True') == 'True',
+    'OFFLOAD_MIN_RECORDS': int(os.environ.get('HUB_OFFLOAD_MIN_RECORDS', 2000)),
+    'HTTP_MAX_CONNECTIONS': int(os.environ.get('HUB_HTTP_MAX_CONNECTIONS', 100)),
+    'HTTP_MAX_KEEPALIVE_CONNECTIONS': int(os.environ.get('HUB_HTTP_MAX_KEEPALIVE_CONNECTIONS', 20)),
+    'HTTP2': os.environ.get('HUB_HTTP2', 'False') == 'True',
+    'HTTP_TOTAL_TIMEOUT': float(os.environ.get('HUB_HTTP_TOTAL_TIMEOUT', 30)),
+    'HTTP_RETRY_ATTEMPTS': int(os.environ.get('HUB_HTTP_RETRY_ATTEMPTS', 2)),
+    'BREAKER_ENABLED': os.environ.get('HUB_BREAKER_ENABLED', 'True') == 'True',
+    'UPSTREAM_MAX_CONCURRENCY': int(os.environ.get('HUB_UPSTREAM_MAX_CONCURRENCY', 0)),
+    'JOB_WORKER_CONCURRENCY': int(os.environ.get('HUB_JOB_WORKER_CONCURRENCY', 4)),
+    'JOB_MAX_ATTEMPTS': int(os.environ.get('HUB_JOB_MAX_ATTEMPTS', 3)),
+    'TEMPLATE_CACHE_SIZE': int(os.environ.get('HUB_TEMPLATE_CACHE_SIZE', 512)),
+    'TEMPLATE_CACHE_INVALIDATION': os.environ.get('HUB_TEMPLATE_CACHE_INVALIDATION') or None,
+    'LOG_BUFFER_ENABLED': os.environ.get('HUB_LOG_BUFFER_ENABLED', 'True') == 'True',
+    'LOG_BACKPRESSURE': os.environ.get('HUB_LOG_BACKPRESSURE', 'sync'),
+}
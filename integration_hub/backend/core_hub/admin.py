@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import IntegrationProfile, MappingTemplate, MappingVersion, ExecutionLog
+from .models import IntegrationProfile, MappingTemplate, MappingVersion, ExecutionLog, ExecutionJob
 
 @admin.register(IntegrationProfile)
 class IntegrationProfileAdmin(admin.ModelAdmin):
@@ -19,6 +19,21 @@ class MappingVersionAdmin(admin.ModelAdmin):
 
 @admin.register(ExecutionLog)
 class ExecutionLogAdmin(admin.ModelAdmin):
-    list_display = ('template', 'status', 'timestamp')
+    list_display = ('template', 'status', 'timestamp', 'duration_ms', 'input_size', 'output_size')
+    list_filter = ('status', 'template')
+    exclude = ('input_data', 'output_data', 'input_blob', 'output_blob')
+    readonly_fields = ('input_payload', 'output_payload', 'error_message')
+
+    @admin.display(description='Input data')
+    def input_payload(self, obj):
+        return obj.get_input_data()
+
+    @admin.display(description='Output data')
+    def output_payload(self, obj):
+        return obj.get_output_data()
+
+
+@admin.register(ExecutionJob)
+class ExecutionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'template', 'status', 'attempts', 'created_at', 'finished_at')
     list_filter = ('status', 'template')
-    readonly_fields = ('input_data', 'output_data', 'error_message')
@@ -10,6 +10,8 @@ from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
+from .automap import AutoMapCache, match_fields, match_fuzzy
+from .conf import hub_setting
 import logging
 
 # Load environment variables from .env file
@@ -25,6 +27,9 @@ logger = logging.getLogger(__name__)
 # Gemini API Key
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 
+# Bump whenever the prompt or the model changes: it is part of the cache key
+PROMPT_VERSION = 2
+
 
 def get_gemini_model():
     """Initialize and return Gemini model."""
@@ -42,14 +47,24 @@ def auto_map(request):
     """
     AI-powered auto-mapping endpoint.
     Uses schema fields from manifest.json to suggest mappings.
+
+    Target fields matched locally by name or synonym skip the LLM, and the
+    merged suggestions are cached per (source fields, target fields, prompt
+    version), so repeated requests are answered without calling Gemini.
+    When Gemini is not configured, fails or exceeds AUTOMAP_LLM_TIMEOUT, the
+    remaining fields go to the offline fuzzy matcher instead.
     
     Request:
         - source_fields: JSON array of source schema field names
         - target_fields: JSON array of target schema field names
+        - engine: "auto" (default) or "local" to skip the LLM
     
     Response:
         - detected_fields: List of target field labels
         - suggestions: List of mapping suggestions with confidence scores
+        - ai_powered: Whether the LLM was asked for part of the mapping
+        - cached: Whether the suggestions came from the cache
+        - fallback_reason: Why the offline matcher replaced the LLM, if it did
     """
     try:
         source_fields_json = request.data.get('source_fields', '[]')
@@ -76,12 +91,109 @@ def auto_map(request):
                 {"error": "No source_fields provided"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        engine = request.data.get('engine', 'auto')
+        if engine not in ('auto', 'local'):
+            return Response(
+                {"error": "engine must be 'auto' or 'local'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Exact, normalized and synonym matches; only the rest needs a matcher
+        suggestions, unresolved = match_fields(source_fields, target_fields)
+        if engine == 'local':
+            suggestions += fuzzy_suggestions(source_fields, suggestions, unresolved)
+            suggestions.sort(key=lambda x: x.get('confidence', 0), reverse=True)
+            return Response({
+                "detected_fields": target_fields,
+                "suggestions": suggestions,
+                "ai_powered": False,
+                "cached": False
+            })
+
+        cache_key = AutoMapCache.key(source_fields, target_fields, PROMPT_VERSION)
+        cached = AutoMapCache.get(cache_key)
+        if cached is not None:
+            return Response({
+                "detected_fields": target_fields,
+                "suggestions": cached["suggestions"],
+                "ai_powered": cached["ai_powered"],
+                "cached": True
+            })
+
+        AutoMapCache.record_resolution(len(suggestions), len(unresolved))
+        fallback_reason = None
+        if unresolved:
+            try:
+                suggestions += suggest_with_llm(source_fields, unresolved)
+            except Exception as e:
+                # Not cached: the next request tries the LLM again. The client
+                # only gets a reason code; the details stay in the log.
+                fallback_reason = llm_failure_reason(e)
+                logger.warning(f"Auto-map LLM unavailable ({fallback_reason}), using the offline matcher: {e}", exc_info=True)
+                suggestions += fuzzy_suggestions(source_fields, suggestions, unresolved)
+
+        # Sort by confidence descending
+        suggestions.sort(key=lambda x: x.get('confidence', 0), reverse=True)
+        ai_powered = bool(unresolved) and fallback_reason is None
+        if fallback_reason is None:
+            AutoMapCache.put(cache_key, PROMPT_VERSION, {"suggestions": suggestions, "ai_powered": ai_powered})
+
+        response = {
+            "detected_fields": target_fields,
+            "suggestions": suggestions,
+            "ai_powered": ai_powered,
+            "cached": False
+        }
+        if fallback_reason is not None:
+            response["fallback_reason"] = fallback_reason
+        return Response(response)
         
-        # Initialize Gemini
-        model = get_gemini_model()
-        
-     # AI Prompt for Schema-to-Schema mapping
-        prompt = f"""
+    except ValueError as e:
+        # Invalid input
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"Auto-map error: {e}", exc_info=True)
+        return Response(
+            {"error": f"AI processing error: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def llm_failure_reason(error):
+    """
+    Reason code returned as fallback_reason for an LLM failure.
+    """
+    if isinstance(error, ImportError) or not GEMINI_API_KEY:
+        return 'llm_not_configured'
+    if isinstance(error, TimeoutError) or type(error).__name__ in ('DeadlineExceeded', 'ReadTimeout', 'Timeout'):
+        return 'llm_timeout'
+    if isinstance(error, json.JSONDecodeError):
+        return 'llm_invalid_response'
+    return 'llm_error'
+
+
+def fuzzy_suggestions(source_fields, suggestions, target_fields):
+    """
+    Offline suggestions for target_fields from the source fields not already
+    used by suggestions.
+    """
+    used = {suggestion['source_path'] for suggestion in suggestions}
+    return match_fuzzy([field for field in source_fields if field not in used], target_fields)
+
+
+def suggest_with_llm(source_fields, target_fields):
+    """
+    Asks Gemini to map target_fields onto source_fields. Suggestions for
+    fields outside target_fields are dropped.
+    """
+    # Initialize Gemini
+    model = get_gemini_model()
+
+    # AI Prompt for Schema-to-Schema mapping
+    prompt = f"""
 You are an expert Data Integration Analyst and Schema Mapper. Your specialty is semantic mapping between disparate data structures, specifically handling cross-language matches (e.g., Portuguese to English) and complex nested objects.
 
 ### TASK
@@ -100,15 +212,17 @@ TARGET SCHEMA (Destination):
    - Example: "celular" matches "mobile_phone".
    - Example: "cnpj" matches "id".
 2. **Flattening:** The source may be nested. Use JSONPath notation for source fields (e.g., "$.address.city").
-3. **Data Types:** If a source field implies a different type than the target (e.g., string "100" -> integer 100), suggest a CAST transformation.
+3. **Transformations:** Only suggest a transformation from the list below when the target clearly needs it (e.g., rounding an amount, reformatting a date); otherwise use "".
 4. **Completeness:** You MUST provide a mapping for ALL {len(target_fields)} target fields.
    - If a strong match is not found, select the most logically related field and assign a low confidence score (< 30).
 
 ### AVAILABLE TRANSFORMATIONS
 - "UPPERCASE", "LOWERCASE", "TRIM"
-- "TO_INT", "TO_FLOAT", "TO_STRING", "TO_BOOLEAN"
-- "DATE_FORMAT(source_fmt -> target_fmt)"
-- "EXTRACT_DIGITS" (for phones/docs)
+- "REMOVE_PUNCTUATION" (for phones/docs, e.g. "12.345.678/0001-90" -> "12345678000190")
+- "ROUND(n)" (n decimal places)
+- "DATE_FORMAT(strftime pattern)" (input is an ISO date, e.g. "DATE_FORMAT(%d/%m/%Y)")
+- "DEFAULT(value)" (used when the source value is empty)
+- Chains with "|", applied left to right (e.g. "TRIM | UPPERCASE")
 - "" (empty string if no transform needed)
 
 ### OUTPUT FORMAT
@@ -128,35 +242,19 @@ Output JSON Structure:
 REMEMBER: Return ONLY the JSON array. No prologue, no epilogue.
 """
 
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean markdown if present
-        if response_text.startswith('```'):
-            response_text = re.sub(r'^```\w*\n?', '', response_text)
-            response_text = re.sub(r'\n?```$', '', response_text)
-        
-        suggestions = json.loads(response_text)
-        
-        # Sort by confidence descending
-        if suggestions:
-            suggestions.sort(key=lambda x: x.get('confidence', 0), reverse=True)
-        
-        return Response({
-            "detected_fields": target_fields,
-            "suggestions": suggestions,
-            "ai_powered": True
-        })
-        
-    except ValueError as e:
-        # Configuration errors (like missing API key)
-        return Response(
-            {"error": str(e)},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    except Exception as e:
-        logger.error(f"Auto-map error: {e}", exc_info=True)
-        return Response(
-            {"error": f"AI processing error: {str(e)}"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    response = model.generate_content(
+        prompt, request_options={"timeout": hub_setting('AUTOMAP_LLM_TIMEOUT')}
+    )
+    response_text = response.text.strip()
+
+    # Clean markdown if present
+    if response_text.startswith('```'):
+        response_text = re.sub(r'^```\w*\n?', '', response_text)
+        response_text = re.sub(r'\n?```$', '', response_text)
+
+    suggestions = json.loads(response_text)
+    wanted = {json.dumps(field, sort_keys=True) for field in target_fields}
+    return [
+        dict(suggestion, matched_by='llm') for suggestion in suggestions
+        if isinstance(suggestion, dict) and json.dumps(suggestion.get('target_field'), sort_keys=True) in wanted
+    ]
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class CoreHubConfig(AppConfig):
-    name = 'core_hub'
\ No newline at end of file
+    name = 'core_hub'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,408 @@
+"""
+Local fast path and persistent cache for the AI auto-mapping endpoint.
+
+match_fields() resolves the target fields whose source is unambiguous by
+name alone: the same name, the same name once normalized (case, accents,
+separators, camelCase) or a known PT/EN synonym. Only the remaining fields
+are sent to the LLM.
+
+match_fuzzy() is the offline matcher used when the LLM is unavailable, slow
+or not wanted: fields become TF-IDF vectors of character trigrams of their
+normalized paths (plus the canonical name of any synonym they belong to),
+one NumPy product gives every source/target cosine similarity, and a
+one-to-one assignment maximizing the total similarity picks the pairs.
+Each target only competes for its AUTOMAP_FUZZY_CANDIDATES best sources, so
+the optimal assignment runs on a sparse graph with scipy's
+min_weight_full_bipartite_matching: a dense one is cubic and dominates the
+cost on large schemas. scipy is in requirements.txt; without it the pairs
+are picked greedily, which can miss the best total.
+
+AutoMapCache stores the merged suggestions in AutoMapCacheEntry rows keyed by
+the SHA-256 of the sorted source fields, sorted target fields and the prompt
+version, so the same schemas are answered without calling the LLM. Entries
+expire after AUTOMAP_CACHE_TTL seconds and the least recently used ones are
+evicted past AUTOMAP_CACHE_MAX_ENTRIES.
+"""
+import functools
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import F
+from django.utils import timezone
+
+from .conf import hub_setting
+from .models import AutoMapCacheEntry
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+except ImportError:
+    min_weight_full_bipartite_matching = None
+
+# Field names meaning the same thing, compared after normalize()
+SYNONYMS = (
+    ('cnpj', 'tax_id', 'company_tax_id'),
+    ('cpf', 'document', 'document_number', 'ssn'),
+    ('razao_social', 'company_name', 'legal_name', 'company_legal_name', 'corporate_name'),
+    ('nome_fantasia', 'trading_name', 'trade_name', 'fantasy_name', 'dba'),
+    ('nome', 'name', 'full_name', 'nome_completo'),
+    ('situacao_cadastral', 'situacao', 'status', 'registration_status'),
+    ('data_inicio_atividade', 'data_abertura', 'opening_date', 'start_date', 'founded_at'),
+    ('porte_empresa', 'porte', 'company_size', 'size'),
+    ('logradouro', 'endereco', 'rua', 'street', 'address', 'address_line1', 'address_line_1'),
+    ('complemento', 'address_line2', 'address_line_2', 'complement'),
+    ('numero', 'number', 'street_number', 'address_number'),
+    ('bairro', 'district', 'neighborhood', 'neighbourhood'),
+    ('municipio', 'cidade', 'city', 'town'),
+    ('uf', 'estado', 'state', 'state_province', 'province', 'region'),
+    ('cep', 'zip', 'zip_code', 'zipcode', 'postal_code', 'zip_postal_code'),
+    ('pais', 'country'),
+    ('telefone', 'fone', 'phone', 'phone_number', 'telephone'),
+    ('celular', 'mobile', 'mobile_phone', 'cell_phone', 'cellphone'),
+    ('email', 'e_mail', 'email_address', 'mail'),
+    ('sexo', 'genero', 'gender', 'sex'),
+    ('data_nascimento', 'nascimento', 'birth_date', 'birthdate', 'date_of_birth', 'dob'),
+    ('valor', 'amount', 'value', 'total'),
+    ('moeda', 'currency'),
+    ('data', 'date'),
+    ('descricao', 'description'),
+    ('quantidade', 'quantity', 'qty'),
+    ('preco', 'price'),
+    ('periodo', 'period'),
+    ('frequencia', 'frequency'),
+)
+
+_CONCEPTS = {name: index for index, group in enumerate(SYNONYMS) for name in group}
+
+_CAMEL_CASE = re.compile(r'([a-z0-9])([A-Z])')
+_WORDS = re.compile(r'[a-z0-9]+')
+_PATH_SEPARATORS = re.compile(r"[.\[\]'\"$]+")
+
+# (tier, confidence, reasoning), tried in order
+_TIERS = (
+    ('exact', 100, "Exact name match"),
+    ('normalized', 95, "Same name after normalization"),
+    ('synonym', 85, "Known synonym"),
+)
+
+
+def normalize(name):
+    """
+    Lowercase ASCII words joined by '_': "Zip/Postal Code" -> "zip_postal_code",
+    "razãoSocial" -> "razao_social".
+    """
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    name = _CAMEL_CASE.sub(r'\1_\2', name)
+    return '_'.join(_WORDS.findall(name.lower()))
+
+
+def leaf(path):
+    """
+    Last segment of a dotted or JSONPath source field: "$.data.cnpj" -> "cnpj".
+    """
+    segments = [segment for segment in _PATH_SEPARATORS.split(str(path)) if segment]
+    return segments[-1] if segments else str(path)
+
+
+def _candidates(target, source_fields, tier):
+    if tier == 'exact':
+        matches = [source for source in source_fields if source == target]
+        return matches or [source for source in source_fields if leaf(source) == target]
+    wanted = normalize(target)
+    if tier == 'normalized':
+        return [
+            source for source in source_fields
+            if wanted and wanted in (normalize(source), normalize(leaf(source)))
+        ]
+    concept = _CONCEPTS.get(wanted)
+    if concept is None:
+        return []
+    return [source for source in source_fields if _CONCEPTS.get(normalize(leaf(source))) == concept]
+
+
+def match_fields(source_fields, target_fields):
+    """
+    Maps the target fields with exactly one candidate source at the first
+    tier that has any. Returns (suggestions, unresolved target fields).
+    """
+    sources = [source for source in source_fields if isinstance(source, str)]
+    suggestions, unresolved = [], []
+    for target in target_fields:
+        if not isinstance(target, str):
+            unresolved.append(target)
+            continue
+        for tier, confidence, reasoning in _TIERS:
+            matches = _candidates(target, sources, tier)
+            if matches:
+                break
+        if len(matches) != 1:
+            # No match, or ambiguous: the LLM decides
+            unresolved.append(target)
+            continue
+        suggestions.append({
+            "source_path": matches[0],
+            "target_field": target,
+            "confidence": confidence,
+            "transform": "",
+            "reasoning": reasoning,
+            "matched_by": tier,
+        })
+    return suggestions, unresolved
+
+
+def _document(field):
+    """
+    Words the field is matched on: its normalized path, and the canonical
+    name of the synonym group of its leaf or of any word in it.
+    """
+    words = normalize(field).split('_')
+    name = normalize(leaf(field))
+    for candidate in [name] + name.split('_'):
+        concept = _CONCEPTS.get(candidate)
+        if concept is not None:
+            words += SYNONYMS[concept][0].split('_')
+    return [word for word in words if word]
+
+
+@functools.lru_cache(maxsize=16384)
+def _trigrams(field):
+    # Cached: the same schemas come back on every auto-mapping request
+    return tuple(
+        padded[start:start + 3]
+        for padded in (f" {word} " for word in _document(field))
+        for start in range(len(padded) - 2)
+    )
+
+
+def _trigram_ids(fields, vocabulary):
+    trigrams = [_trigrams(field) for field in fields]
+    grams = [vocabulary.setdefault(gram, len(vocabulary)) for field_grams in trigrams for gram in field_grams]
+    docs = np.repeat(np.arange(len(fields), dtype=np.int64), [len(field_grams) for field_grams in trigrams])
+    return docs, np.array(grams, dtype=np.int64)
+
+
+def similarity_matrix(source_fields, target_fields):
+    """
+    Cosine similarities of the TF-IDF trigram vectors, shape
+    (len(target_fields), len(source_fields)).
+    """
+    vocabulary = {}
+    source_docs, source_grams = _trigram_ids(source_fields, vocabulary)
+    target_docs, target_grams = _trigram_ids(target_fields, vocabulary)
+    size = len(vocabulary)
+    n_sources = len(source_fields)
+    if not size:
+        return np.zeros((len(target_fields), n_sources), dtype=np.float32)
+
+    # One row per distinct (document, trigram): targets numbered after sources
+    keys, counts = np.unique(
+        np.concatenate([source_docs, target_docs + n_sources]) * size
+        + np.concatenate([source_grams, target_grams]),
+        return_counts=True,
+    )
+    docs, grams = np.divmod(keys, size)
+    n_docs = n_sources + len(target_fields)
+    idf = np.log((1 + n_docs) / (1 + np.bincount(grams, minlength=size))) + 1
+    weights = counts * idf[grams]
+    weights /= np.sqrt(np.bincount(docs, weights ** 2, minlength=n_docs))[docs]
+
+    # Dot products, over the trigrams present on both sides. Trigrams shared
+    # by many fields go through one dense matrix product; the others add
+    # their few (target, source) products directly.
+    n_targets = len(target_fields)
+    is_source = docs < n_sources
+    source_df = np.bincount(grams[is_source], minlength=size)
+    pairs = source_df * np.bincount(grams[~is_source], minlength=size)
+    dense = pairs > max(1, n_sources * n_targets // 256)
+    similarity = np.zeros((n_targets, n_sources), dtype=np.float32)
+
+    if dense.any():
+        column = np.cumsum(dense) - 1
+        sources = np.zeros((n_sources, int(dense.sum())), dtype=np.float32)
+        targets = np.zeros((n_targets, sources.shape[1]), dtype=np.float32)
+        rows = dense[grams] & is_source
+        sources[docs[rows], column[grams[rows]]] = weights[rows]
+        rows = dense[grams] & ~is_source
+        targets[docs[rows] - n_sources, column[grams[rows]]] = weights[rows]
+        similarity += targets @ sources.T
+
+    sparse = (pairs > 0) & ~dense
+    if sparse.any():
+        # Source entries grouped by trigram; each target entry is repeated
+        # once per source entry sharing its trigram
+        source_rows = np.flatnonzero(is_source & sparse[grams])
+        source_rows = source_rows[np.argsort(grams[source_rows], kind='stable')]
+        group_sizes = np.where(sparse, source_df, 0)
+        group_starts = np.cumsum(group_sizes) - group_sizes
+        target_rows = np.flatnonzero(~is_source & sparse[grams])
+        repeats = group_sizes[grams[target_rows]]
+        offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        matched = source_rows[np.repeat(group_starts[grams[target_rows]], repeats) + offsets]
+        target_rows = np.repeat(target_rows, repeats)
+        np.add.at(
+            similarity, (docs[target_rows] - n_sources, docs[matched]),
+            (weights[target_rows] * weights[matched]).astype(np.float32),
+        )
+    return similarity
+
+
+def _candidate_pairs(similarity, min_similarity, per_target):
+    """
+    (target, source) pairs scoring min_similarity, keeping only each
+    target's per_target best sources (all of them with 0).
+    """
+    n_sources = similarity.shape[1]
+    if 0 < per_target < n_sources:
+        sources = np.argpartition(-similarity, per_target - 1, axis=1)[:, :per_target].ravel()
+        targets = np.repeat(np.arange(similarity.shape[0]), per_target)
+        keep = similarity[targets, sources] >= min_similarity
+        return targets[keep], sources[keep]
+    return np.nonzero(similarity >= min_similarity)
+
+
+def _assign(similarity, min_similarity, per_target=0):
+    """
+    One-to-one (target, source) pairs maximizing the total similarity, among
+    each target's per_target best candidates (all of them with 0).
+    """
+    targets, sources = _candidate_pairs(similarity, min_similarity, per_target)
+    if not len(targets):
+        return []
+    scores = similarity[targets, sources]
+    if min_weight_full_bipartite_matching is not None:
+        # Sparse solver over the candidate pairs only. Every target also gets
+        # a private "unmatched" column scoring ~0, so a full matching exists.
+        n_targets, n_sources = similarity.shape
+        rows = np.concatenate([targets, np.arange(n_targets)])
+        columns = np.concatenate([sources, n_sources + np.arange(n_targets)])
+        weights = np.concatenate([scores, np.full(n_targets, 1e-9, dtype=scores.dtype)])
+        graph = csr_matrix((weights, (rows, columns)), shape=(n_targets, n_sources + n_targets))
+        _, matched = min_weight_full_bipartite_matching(graph, maximize=True)
+        pairs = [(target, source) for target, source in enumerate(matched.tolist()) if source < n_sources]
+    else:
+        # Greedy: best remaining pair first
+        order = np.argsort(-scores, kind='stable')
+        used_targets, used_sources, pairs = set(), set(), []
+        for target, source in zip(targets[order].tolist(), sources[order].tolist()):
+            if target not in used_targets and source not in used_sources:
+                used_targets.add(target)
+                used_sources.add(source)
+                pairs.append((target, source))
+    return [(target, source) for target, source in pairs if similarity[target, source] >= min_similarity]
+
+
+def match_fuzzy(source_fields, target_fields, min_similarity=None):
+    """
+    Offline suggestions for target_fields, at most one per source field.
+    Targets without a source scoring min_similarity are left out.
+    """
+    if min_similarity is None:
+        min_similarity = hub_setting('AUTOMAP_FUZZY_MIN_SIMILARITY')
+    sources = [source for source in source_fields if isinstance(source, str)]
+    targets = [target for target in target_fields if isinstance(target, str)]
+    if not sources or not targets:
+        return []
+    similarity = similarity_matrix(sources, targets)
+    suggestions = []
+    for target, source in _assign(similarity, min_similarity, hub_setting('AUTOMAP_FUZZY_CANDIDATES')):
+        score = float(similarity[target, source])
+        suggestions.append({
+            "source_path": sources[source],
+            "target_field": targets[target],
+            "confidence": min(99, round(score * 100)),
+            "transform": "",
+            "reasoning": f"Similar field name (similarity {score:.2f})",
+            "matched_by": "fuzzy",
+        })
+    return suggestions
+
+
+class AutoMapCache:
+    """
+    Persistent cache of auto-mapping suggestions, with this process's counters.
+    """
+    hits = 0
+    misses = 0
+    local_matches = 0
+    llm_fields = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def key(source_fields, target_fields, prompt_version):
+        """
+        Order-insensitive digest of both field lists and the prompt version.
+        """
+        canonical = json.dumps({
+            "prompt_version": prompt_version,
+            "source": sorted({json.dumps(field, sort_keys=True) for field in source_fields}),
+            "target": sorted({json.dumps(field, sort_keys=True) for field in target_fields}),
+        }, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get(cls, key):
+        """
+        The cached suggestions for key, or None.
+        """
+        entries = AutoMapCacheEntry.objects.filter(key=key)
+        ttl = hub_setting('AUTOMAP_CACHE_TTL')
+        if ttl:
+            entries = entries.filter(created_at__gte=timezone.now() - timedelta(seconds=ttl))
+        entry = entries.first()
+        with cls._lock:
+            if entry is None:
+                cls.misses += 1
+            else:
+                cls.hits += 1
+        if entry is None:
+            return None
+        AutoMapCacheEntry.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        return entry.suggestions
+
+    @classmethod
+    def put(cls, key, prompt_version, suggestions):
+        """
+        Stores suggestions under key, evicting expired and least recently
+        used entries.
+        """
+        max_entries = hub_setting('AUTOMAP_CACHE_MAX_ENTRIES')
+        if not max_entries:
+            return
+        now = timezone.now()
+        AutoMapCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={"prompt_version": prompt_version, "suggestions": suggestions,
+                      "hits": 0, "created_at": now, "last_used_at": now},
+        )
+        ttl = hub_setting('AUTOMAP_CACHE_TTL')
+        if ttl:
+            AutoMapCacheEntry.objects.filter(created_at__lt=now - timedelta(seconds=ttl)).delete()
+        stale = list(
+            AutoMapCacheEntry.objects.order_by('-last_used_at').values_list('key', flat=True)[max_entries:]
+        )
+        if stale:
+            AutoMapCacheEntry.objects.filter(key__in=stale).delete()
+
+    @classmethod
+    def record_resolution(cls, local, unresolved):
+        with cls._lock:
+            cls.local_matches += local
+            cls.llm_fields += unresolved
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            lookups = cls.hits + cls.misses
+            return {
+                "max_entries": hub_setting('AUTOMAP_CACHE_MAX_ENTRIES'),
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "hit_rate": round(cls.hits / lookups, 4) if lookups else None,
+                "local_matches": cls.local_matches,
+                "llm_fields": cls.llm_fields,
+            }
@@ -0,0 +1,169 @@
+"""
+Micro-batching of Target sends.
+
+For targets that accept JSON arrays, single mapped records are collected per
+target profile and POSTed together once options["batch"]["max_size"] records
+are waiting or options["batch"]["max_linger_ms"] has passed since the first
+one. Every caller awaits its own future and receives its slice of the
+response: element i of an array response (or of the array at
+options["batch"]["results_path"]), or the whole response otherwise.
+
+Batches are per event loop, so they only span requests on a persistent loop
+(see lifespan.py); under WSGI records are sent directly.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+
+from .conf import hub_setting
+from .json_stream import parse_records_path
+from .lifespan import on_loop_release, on_shutdown
+
+logger = logging.getLogger(__name__)
+
+
+class _TargetBatch:
+    """
+    Pending records for one target profile on one event loop.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.profile = None
+        self.pending = []
+        self.timer = None
+        self.sending = set()
+
+
+class BatchingSender:
+    """
+    Collects single-record Target sends into array POSTs.
+    """
+    _batches = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+    batches_sent = 0
+    records_sent = 0
+
+    @staticmethod
+    def options_for(profile):
+        """
+        Returns the profile's batch options, or None when batching is off.
+        """
+        options = (getattr(profile, 'options', None) or {}).get('batch')
+        if not options or not options.get('enabled', True):
+            return None
+        return {
+            'max_size': int(options.get('max_size', hub_setting('SEND_BATCH_MAX_SIZE'))),
+            'max_linger': options.get('max_linger_ms', hub_setting('SEND_BATCH_MAX_LINGER_MS')) / 1000.0,
+            'results_path': options.get('results_path', ''),
+        }
+
+    @classmethod
+    def _batch_for(cls, loop, profile):
+        with cls._lock:
+            batches = cls._batches.get(loop)
+            if batches is None:
+                batches = cls._batches[loop] = {}
+            batch = batches.get(profile.pk)
+            if batch is None:
+                batch = batches[profile.pk] = _TargetBatch(loop)
+        batch.profile = profile
+        return batch
+
+    @classmethod
+    async def submit(cls, profile, record, options):
+        """
+        Queues one record for the profile's next batch and awaits its result.
+        """
+        loop = asyncio.get_running_loop()
+        batch = cls._batch_for(loop, profile)
+        future = loop.create_future()
+        batch.pending.append((record, future))
+
+        if len(batch.pending) >= options['max_size']:
+            cls._flush(batch, options)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(options['max_linger'], cls._flush, batch, options)
+        return await future
+
+    @classmethod
+    def _flush(cls, batch, options):
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        items, batch.pending = batch.pending, []
+        if not items:
+            return None
+        task = batch.loop.create_task(cls._send(batch.profile, items, options))
+        batch.sending.add(task)
+        task.add_done_callback(batch.sending.discard)
+        return task
+
+    @classmethod
+    async def _send(cls, profile, items, options):
+        from .utils import DataSender
+
+        records = [record for record, _ in items]
+        try:
+            response = await DataSender.post(profile, records)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        cls.batches_sent += 1
+        cls.records_sent += len(records)
+        results = cls._split_response(response, len(records), options['results_path'])
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _split_response(response, count, results_path):
+        results = response
+        for segment in parse_records_path(results_path):
+            if isinstance(results, dict):
+                results = results.get(segment)
+            elif isinstance(results, list) and isinstance(segment, int) and segment < len(results):
+                results = results[segment]
+            else:
+                results = None
+        if isinstance(results, list) and len(results) == count:
+            return results
+        return [response] * count
+
+    @classmethod
+    async def aflush_all(cls):
+        """
+        Sends every pending batch of the running loop and waits for in-flight
+        batches to finish.
+        """
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            batches = list(cls._batches.get(loop, {}).values())
+        tasks = []
+        for batch in batches:
+            options = cls.options_for(batch.profile) or {'results_path': ''}
+            cls._flush(batch, options)
+            tasks.extend(batch.sending)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @classmethod
+    def stats(cls):
+        pending = sum(
+            len(batch.pending)
+            for batches in list(cls._batches.values())
+            for batch in batches.values()
+        )
+        return {
+            "batches_sent": cls.batches_sent,
+            "records_sent": cls.records_sent,
+            "pending": pending,
+        }
+
+
+on_shutdown(BatchingSender.aflush_all)
+on_loop_release(BatchingSender.aflush_all)
@@ -0,0 +1,394 @@
+"""
+Benchmark suites for the mapping engine and the execute pipeline.
+
+Run with `manage.py benchmark`. Every measurement is a named metric with a
+unit and a direction, so a saved run can be compared with a baseline:
+
+    engine.*    TransformationEngine.apply per transform (µs per call)
+    paths.*     ExecutionPlan.apply on shallow, deep and fan-out documents
+                (µs per document)
+    pipeline.*  POST /api/templates/<id>/execute/ end to end, against stand-in
+                Source and Target upstreams on httpx.MockTransport
+                (throughput and latency percentiles)
+    logs.*      ExecutionLog insert cost: one row per write, bulk writes and
+                the buffered record() call on the request path
+
+The pipeline and logs suites need a database; the command runs them against a
+throwaway test database.
+"""
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import django
+import httpx
+from django.utils import timezone
+
+from .compiler import RuleCompiler
+from .conf import hub_setting
+from .engine import TransformationEngine
+
+SUITES = ('engine', 'paths', 'pipeline', 'logs')
+
+SOURCE_HOST = 'bench-source.local'
+TARGET_HOST = 'bench-target.local'
+
+
+def metric(value, unit, better='lower'):
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def _per_call(func, calls, repeat):
+    """
+    Seconds per call of func(), which itself performs `calls` calls. Best of
+    `repeat` runs, as timeit does: slower runs measure machine noise.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) / calls)
+    return min(samples)
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Sample data -----------------------------------------------------------------
+
+_UFS = ['SP', 'RJ', 'MG', 'BA', 'PR', 'RS', 'SC', 'PE', 'CE', 'GO']
+_SITUACOES = ['ATIVA', 'BAIXADA', 'INAPTA', 'SUSPENSA', 'NULA']
+
+
+def sample_company(cnpj, rng=random):
+    """
+    A CNPJ-lookup style document, as returned by the stand-in Source.
+    """
+    return {
+        "cnpj": f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:14]}",
+        "razao_social": f"  empresa {cnpj} ltda ",
+        "situacao_cadastral": rng.choice(_SITUACOES),
+        "data_inicio_atividade": f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "capital_social": f"{rng.uniform(1000, 10 ** 7):.4f}",
+        "estabelecimento": {
+            "nome_fantasia": f"Loja {cnpj[-4:]}",
+            "email": None,
+            "telefone": f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+            "endereco": {
+                "logradouro": "Rua das Flores",
+                "numero": str(rng.randint(1, 3000)),
+                "cep": f"{rng.randint(10000, 99999)}-{rng.randint(100, 999)}",
+                "cidade": {"nome": f"Cidade {rng.randint(1, 50)}", "ibge": rng.randint(1000000, 5999999)},
+                "estado": {"sigla": rng.choice(_UFS)},
+            },
+        },
+        "socios": [
+            {"nome": f"socio {n} de {cnpj}", "qualificacao": rng.choice(["Sócio", "Administrador"]),
+             "data_entrada": f"20{rng.randint(10, 23)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"}
+            for n in range(rng.randint(1, 4))
+        ],
+    }
+
+
+COMPANY_RULES = [
+    {"source_path": "$.cnpj", "target_field": "document", "transform": "REMOVE_PUNCTUATION"},
+    {"source_path": "$.razao_social", "target_field": "legal_name", "transform": "TRIM | UPPERCASE"},
+    {"source_path": "$.estabelecimento.nome_fantasia", "target_field": "trade_name", "transform": ""},
+    {"source_path": "$.situacao_cadastral", "target_field": "status", "transform": "LOWERCASE"},
+    {"source_path": "$.data_inicio_atividade", "target_field": "opened_at", "transform": "DATE_FORMAT(%d/%m/%Y)"},
+    {"source_path": "$.capital_social", "target_field": "capital", "transform": "ROUND(2)"},
+    {"source_path": "$.estabelecimento.email", "target_field": "email", "transform": "DEFAULT(N/A)"},
+    {"source_path": "$.estabelecimento.telefone", "target_field": "phone", "transform": "REMOVE_PUNCTUATION"},
+    {"source_path": "$.estabelecimento.endereco.cep", "target_field": "zip", "transform": "REMOVE_PUNCTUATION"},
+    {"source_path": "$.estabelecimento.endereco.cidade.nome", "target_field": "city", "transform": "UPPERCASE"},
+    {"source_path": "$.estabelecimento.endereco.estado.sigla", "target_field": "state", "transform": ""},
+    {"source_path": "$.socios[*].nome", "target_field": "partners", "transform": "UPPERCASE"},
+]
+
+
+# engine ------------------------------------------------------------------------
+
+def run_engine(scale=1.0, repeat=5):
+    """
+    TransformationEngine.apply per transform. Inputs have more distinct
+    values than a transform memo holds, so the raw transform cost is
+    measured; the *.repeated variants use 10 distinct values, as on
+    low-cardinality columns.
+    """
+    rng = random.Random(42)
+    count = max(2 * hub_setting('TRANSFORM_MEMO_SIZE'), int(5000 * scale))
+    names = [f"  Empresa {n} Comércio Ltda " for n in range(count)]
+    cnpjs = [f"{n:08d}/0001-{n % 97:02d}" for n in range(count)]
+    numbers = [f"{rng.uniform(0, 10 ** 6):.5f}" for _ in range(count)]
+    dates = [f"20{n % 24:02d}-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:{n % 60:02d}:00Z" for n in range(count)]
+    mixed = [None if n % 3 == 0 else f"v{n}" for n in range(count)]
+    cases = [
+        ('UPPERCASE', 'UPPERCASE', names),
+        ('LOWERCASE', 'LOWERCASE', names),
+        ('TRIM', 'TRIM', names),
+        ('REMOVE_PUNCTUATION', 'REMOVE_PUNCTUATION', cnpjs),
+        ('ROUND', 'ROUND(2)', numbers),
+        ('DATE_FORMAT', 'DATE_FORMAT(%d/%m/%Y)', dates),
+        ('DEFAULT', 'DEFAULT(N/A)', mixed),
+        ('pipeline', 'TRIM | UPPERCASE | DEFAULT(N/A)', names),
+        ('DATE_FORMAT.repeated', 'DATE_FORMAT(%d/%m/%Y)', dates[:10] * (count // 10)),
+        ('pipeline.repeated', 'TRIM | UPPERCASE | DEFAULT(N/A)', names[:10] * (count // 10)),
+    ]
+
+    results = {}
+    apply = TransformationEngine.apply
+    for name, rule, values in cases:
+        def run(values=values, rule=rule):
+            for value in values:
+                apply(value, rule)
+        run()
+        results[f"engine.{name}"] = metric(_per_call(run, len(values), repeat) * 1e6, 'us/call')
+    return results
+
+
+# paths -------------------------------------------------------------------------
+
+def run_paths(scale=1.0, repeat=5):
+    """
+    ExecutionPlan.apply with identity transforms, isolating path resolution.
+    """
+    documents = max(200, int(5000 * scale))
+    shallow_doc = {f"field_{n}": f"value {n}" for n in range(30)}
+    deep_doc = sample_company('12345678000190', random.Random(7))
+    deep_doc["socios"] = [
+        {"nome": f"socio {n}", "qualificacao": "Sócio", "documento": {"cpf": f"{n:011d}"}} for n in range(50)
+    ]
+    shapes = {
+        'shallow': (shallow_doc, [f"$.field_{n}" for n in range(30)]),
+        'deep': (deep_doc, [rule["source_path"] for rule in COMPANY_RULES if '[' not in rule["source_path"]] * 3),
+        'fan_out': (deep_doc, ["$.socios[*].nome", "$.socios[*].documento.cpf", "$.socios[-1].nome",
+                               "$.socios[?(@.qualificacao == 'Sócio')].nome", "$..sigla"]),
+    }
+
+    results = {}
+    for shape, (document, paths) in shapes.items():
+        plan = RuleCompiler.compile([
+            {"source_path": path, "target_field": f"out_{n}", "transform": ""} for n, path in enumerate(paths)
+        ])
+
+        def run(plan=plan, document=document):
+            for _ in range(documents):
+                plan.apply(document)
+        run()
+        results[f"paths.{shape}"] = metric(_per_call(run, documents, repeat) * 1e6, 'us/doc')
+    return results
+
+
+# pipeline ----------------------------------------------------------------------
+
+def mock_transport(latency_ms=0.0):
+    """
+    Stand-in upstreams: GET on the Source host answers a company document
+    for the CNPJ in the last path segment; the Target host accepts any POST.
+    """
+    rng = random.Random(11)
+
+    async def handler(request):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if request.url.host == SOURCE_HOST:
+            cnpj = request.url.path.rsplit('/', 1)[-1]
+            return httpx.Response(200, json=sample_company(cnpj, rng))
+        if request.url.host == TARGET_HOST:
+            return httpx.Response(200, json={"accepted": True})
+        return httpx.Response(404, json={"error": "unknown benchmark host"})
+
+    return httpx.MockTransport(handler)
+
+
+def create_pipeline_template():
+    """
+    Source, Target, template and active version for the pipeline suite.
+    """
+    from .models import IntegrationProfile, MappingTemplate, MappingVersion
+
+    source = IntegrationProfile.objects.create(
+        name='benchmark-source', type='SOURCE', api_url=f"http://{SOURCE_HOST}/cnpj/{{cnpj}}"
+    )
+    target = IntegrationProfile.objects.create(
+        name='benchmark-target', type='TARGET', api_url=f"http://{TARGET_HOST}/companies"
+    )
+    template = MappingTemplate.objects.create(name='benchmark', source=source, target=target)
+    version = MappingVersion.objects.create(template=template, version_number=1, rules=COMPANY_RULES)
+    template.active_version = version
+    template.save()
+    return template
+
+
+async def run_pipeline(template, requests=500, concurrency=20, latency_ms=0.0):
+    """
+    Drives the execute endpoint through Django's ASGI test client. Each
+    request fetches a distinct CNPJ, so fetch caching and coalescing do not
+    flatter the numbers.
+    """
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    from .http_clients import ClientRegistry
+    from .lifespan import mark_persistent_loop, run_shutdown_hooks
+    from .log_sink import ExecutionLogSink
+
+    # Served like the ASGI server loop: pooled clients persist across requests
+    mark_persistent_loop()
+    ClientRegistry.set_transport(mock_transport(latency_ms))
+    client = AsyncClient()
+    url = reverse('execute-template', args=[template.pk])
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def execute(n, record=True):
+        nonlocal failures
+        body = json.dumps({"params": {"cnpj": f"{n:014d}"}})
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(url, data=body, content_type='application/json')
+            if record:
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+    try:
+        # Warm up: template cache, compiled plan, pooled client
+        await asyncio.gather(*[execute(n, record=False) for n in range(min(50, requests))])
+        started = time.perf_counter()
+        await asyncio.gather(*[execute(n) for n in range(requests)])
+        elapsed = time.perf_counter() - started
+        await ExecutionLogSink.aflush()
+    finally:
+        await run_shutdown_hooks()
+        ClientRegistry.set_transport(None)
+
+    latencies.sort()
+    return {
+        "pipeline.throughput": metric(requests / elapsed, 'req/s', better='higher'),
+        "pipeline.latency_p50": metric(_percentile(latencies, 50) * 1000, 'ms'),
+        "pipeline.latency_p95": metric(_percentile(latencies, 95) * 1000, 'ms'),
+        "pipeline.latency_p99": metric(_percentile(latencies, 99) * 1000, 'ms'),
+        "pipeline.error_rate": metric(failures / requests, 'ratio'),
+    }
+
+
+# logs --------------------------------------------------------------------------
+
+def run_logs(template, rows=500, repeat=3):
+    """
+    ExecutionLog insert cost per row: one write per row (unbuffered logging),
+    bulk writes of LOG_FLUSH_BATCH_SIZE (the buffered sink), and the time
+    ExecutionLogSink.record() adds to a request.
+    """
+    from .log_sink import ExecutionLogSink
+    from .models import ExecutionLog
+
+    rng = random.Random(3)
+    sequence = iter(range(10 ** 9))
+
+    def entries(count):
+        made = []
+        for _ in range(count):
+            document = sample_company(f"{next(sequence):014d}", rng)
+            entry = ExecutionLog(
+                template=template, version=template.active_version, status='SUCCESS', timestamp=timezone.now()
+            )
+            entry._pending_payloads = (document, RuleCompiler.get_plan(template.active_version).apply(document))
+            made.append(entry)
+        return made
+
+    batch_size = hub_setting('LOG_FLUSH_BATCH_SIZE')
+
+    def single(batch):
+        for entry in batch:
+            ExecutionLogSink._write([entry])
+
+    def bulk(batch):
+        for start in range(0, len(batch), batch_size):
+            ExecutionLogSink._write(batch[start:start + batch_size])
+
+    results = {}
+    for name, write in (('single_insert', single), ('bulk_insert', bulk)):
+        samples = []
+        for _ in range(repeat):
+            batch = entries(rows)
+            started = time.perf_counter()
+            write(batch)
+            samples.append((time.perf_counter() - started) / rows)
+        results[f"logs.{name}"] = metric(statistics.median(samples) * 1e6, 'us/row')
+
+    async def record():
+        version = template.active_version
+        started = time.perf_counter()
+        for n in range(rows):
+            await ExecutionLogSink.record(
+                template=template, version=version, status='SUCCESS',
+                input_data={"n": n}, output_data={"n": n}, is_test=True
+            )
+        elapsed = time.perf_counter() - started
+        await ExecutionLogSink.aflush()
+        return elapsed / rows
+
+    samples = [asyncio.run(record()) for _ in range(repeat)]
+    results["logs.buffered_record"] = metric(statistics.median(samples) * 1e6, 'us/call')
+    return results
+
+
+# Baselines ---------------------------------------------------------------------
+
+def environment():
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "created_at": timezone.now().isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "httpx": httpx.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def compare(baseline, current, threshold, suites=SUITES):
+    """
+    Rows of (name, baseline, current, change, verdict) for every metric of
+    the given suites in either run. change is relative, positive when the
+    metric got worse.
+    """
+    rows = []
+    names = sorted(
+        name for name in set(baseline) | set(current) if name.split('.', 1)[0] in suites
+    )
+    for name in names:
+        before, after = baseline.get(name), current.get(name)
+        if before is None or after is None:
+            rows.append((name, before, after, None, 'new' if before is None else 'missing'))
+            continue
+        if not before["value"]:
+            # e.g. an error rate of 0: any growth of a lower-is-better metric regresses
+            worse = after["value"] > 0 and after.get("better") != 'higher'
+            rows.append((name, before, after, None, 'regressed' if worse else 'ok'))
+            continue
+        change = (after["value"] - before["value"]) / before["value"]
+        if after.get("better") == 'higher':
+            change = -change
+        if change > threshold:
+            verdict = 'regressed'
+        elif change < -threshold:
+            verdict = 'improved'
+        else:
+            verdict = 'ok'
+        rows.append((name, before, after, change, verdict))
+    return rows
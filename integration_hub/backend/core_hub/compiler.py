@@ -0,0 +1,222 @@
+"""
+Rule compiler for MappingVersion rules.
+
+Turns the raw rule list stored on a MappingVersion into an ExecutionPlan whose
+path accessors and transform callables are resolved once, instead of being
+re-parsed for every record on every execution. Source paths are JSONPath
+(see jsonpath.py); the plan resolves all of them in one walk of the document.
+Transforms are pipeline expressions (see expressions.py) fused into one
+callable per rule.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+from .conf import hub_setting
+from .engine import TransformationEngine
+from .expressions import ExpressionError, compile_expression
+from .jsonpath import JSONPathError, PathTrie, compile_legacy_path, compile_path
+
+logger = logging.getLogger(__name__)
+
+
+class RuleCompilationError(ValueError):
+    """Raised when a rule list cannot be compiled into a plan."""
+
+
+def _identity(value):
+    return value
+
+
+def _fan_out(transform):
+    """
+    Applies a transform to every match of a multi-valued path.
+    """
+    def transform_each(values):
+        return [transform(value) for value in values]
+    return transform_each
+
+
+def version_key(version):
+    """
+    Identifies a version's rules by id and the digest stored when it was
+    saved, so edited rules never reuse a stale plan, even in processes that
+    did not see the save signal.
+    """
+    return f"{version.pk}:{version.rules_digest}"
+
+
+class CompiledRule:
+    """
+    A single rule with its source accessor and transform already resolved.
+    """
+    __slots__ = ('source_path', 'target_field', 'getter', 'transform')
+
+    def __init__(self, source_path, target_field, getter, transform):
+        self.source_path = source_path
+        self.target_field = target_field
+        self.getter = getter # CompiledPath
+        self.transform = transform
+
+
+class ExecutionPlan:
+    """
+    Prebuilt, immutable list of compiled rules for one MappingVersion.
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        # Rules sharing a path prefix walk it once per document
+        self.paths = PathTrie([rule.getter for rule in self.rules])
+
+    def __len__(self):
+        return len(self.rules)
+
+    def apply(self, data):
+        """
+        Maps one input document into a new output dict.
+        """
+        output = {}
+        for rule, value in zip(self.rules, self.paths.resolve(data)):
+            output[rule.target_field] = rule.transform(value)
+        return output
+
+
+class RuleCompiler:
+    """
+    Compiles rule lists and caches the resulting plans per version key, in an
+    LRU of PLAN_CACHE_SIZE plans.
+    """
+    _plans = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def compile_path(path, strict=False):
+        """
+        Compiles a source path into a CompiledPath. Plain dotted paths
+        ("$.a.b.0.c" or "a.b") keep the original semantics: dict keys first,
+        numeric segments index into lists, anything missing yields None.
+        JSONPath wildcards, slices, filters and '..' resolve to a list of
+        matches. Unparseable paths raise in strict mode and otherwise fall
+        back to the dotted lookup.
+        """
+        try:
+            return compile_path(path)
+        except JSONPathError as e:
+            if strict:
+                raise RuleCompilationError(str(e)) from None
+            return compile_legacy_path(path)
+
+    @staticmethod
+    def compile_transform(transformation_rule, strict=False):
+        """
+        Compiles a transform expression (see expressions.py) into a fused
+        single-argument callable. Unknown functions are a no-op, as in
+        TransformationEngine.apply, unless strict is set; unparseable
+        expressions raise in strict mode and otherwise fall back to the
+        original single-call parse.
+        """
+        if not transformation_rule:
+            return _identity
+
+        try:
+            transform = compile_expression(transformation_rule, strict=strict)
+        except ExpressionError as e:
+            if strict:
+                raise RuleCompilationError(str(e)) from None
+            return RuleCompiler._compile_single_call(transformation_rule)
+        return _identity if transform is None else transform
+
+    @staticmethod
+    def _compile_single_call(transformation_rule):
+        func_name, args = TransformationEngine.parse_rule(transformation_rule)
+        method = getattr(TransformationEngine, f"func_{func_name}", None)
+        if method is None:
+            return _identity
+
+        args = tuple(args)
+
+        def transform(value):
+            try:
+                return method(value, *args)
+            except Exception as e:
+                return f"ERROR: {str(e)}"
+
+        return transform
+
+    @staticmethod
+    def compile(rules, strict=False):
+        """
+        Compiles a list of rule dicts into an ExecutionPlan.
+        With strict=True (used when a version is saved) structural problems
+        and unknown transforms raise RuleCompilationError.
+        """
+        if rules is None:
+            rules = []
+        if not isinstance(rules, list):
+            raise RuleCompilationError("Rules must be a list.")
+
+        compiled = []
+        for position, rule in enumerate(rules, start=1):
+            if not isinstance(rule, dict):
+                raise RuleCompilationError(f"Rule {position} must be an object.")
+
+            source_path = rule.get('source_path', '') or ''
+            target_field = rule.get('target_field', '') or ''
+            transform = rule.get('transform', '') or ''
+
+            if strict:
+                for name, value in (('source_path', source_path), ('target_field', target_field), ('transform', transform)):
+                    if not isinstance(value, str):
+                        raise RuleCompilationError(f"Rule {position}: '{name}' must be a string.")
+                if not target_field:
+                    raise RuleCompilationError(f"Rule {position}: 'target_field' is required.")
+
+            try:
+                getter = RuleCompiler.compile_path(str(source_path), strict=strict)
+                transform = RuleCompiler.compile_transform(str(transform), strict=strict)
+                if not getter.definite and transform is not _identity:
+                    transform = _fan_out(transform)
+                compiled.append(CompiledRule(
+                    source_path=source_path,
+                    target_field=target_field,
+                    getter=getter,
+                    transform=transform,
+                ))
+            except RuleCompilationError as e:
+                raise RuleCompilationError(f"Rule {position}: {e}") from None
+
+        return ExecutionPlan(compiled)
+
+    @classmethod
+    def get_plan(cls, version):
+        """
+        Returns the cached plan for a MappingVersion's current rules,
+        compiling it on first use.
+        """
+        key = version_key(version)
+        with cls._lock:
+            plan = cls._plans.get(key)
+            if plan is not None:
+                cls._plans.move_to_end(key)
+                return plan
+        plan = cls.compile(version.rules)
+        with cls._lock:
+            cls._plans[key] = plan
+            while len(cls._plans) > max(1, hub_setting('PLAN_CACHE_SIZE')):
+                cls._plans.popitem(last=False)
+        logger.debug(f"Compiled execution plan for version {version.pk} ({len(plan)} rules)")
+        return plan
+
+    @classmethod
+    def invalidate(cls, version_id=None):
+        """
+        Drops the cached plan for one version, or all plans if no id is given.
+        """
+        with cls._lock:
+            if version_id is None:
+                cls._plans.clear()
+            else:
+                prefix = f"{version_id}:"
+                for key in [key for key in cls._plans if key.startswith(prefix)]:
+                    del cls._plans[key]
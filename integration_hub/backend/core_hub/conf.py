@@ -0,0 +1,128 @@
+"""
+Runtime settings for the integration hub.
+
+Values come from the INTEGRATION_HUB dict in Django settings, falling back to
+the defaults below.
+"""
+from django.conf import settings
+
+DEFAULTS = {
+    # Compiled execution plans kept per process, keyed by version and rules
+    'PLAN_CACHE_SIZE': 256,
+
+    # Batch execution. The body limit replaces Django's
+    # DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB) for execute-batch, sized for
+    # BATCH_MAX_RECORDS records of a couple of KB
+    'BATCH_MAX_RECORDS': 50000,
+    'BATCH_MAX_BODY_BYTES': 128 * 1024 * 1024,
+    # Records per response chunk / Target request in NDJSON streaming mode
+    'STREAM_SEND_CHUNK_SIZE': 500,
+
+    # Batches of at least OFFLOAD_MIN_RECORDS records are mapped in a process
+    # pool (OFFLOAD_MAX_WORKERS processes, None = one per CPU)
+    'OFFLOAD_ENABLED': True,
+    'OFFLOAD_MIN_RECORDS': 2000,
+    'OFFLOAD_CHUNK_RECORDS': 1000,
+    'OFFLOAD_MAX_WORKERS': None,
+
+    # Pooled HTTP clients (overridable per profile via options["http"])
+    'HTTP_MAX_CONNECTIONS': 100,
+    'HTTP_MAX_KEEPALIVE_CONNECTIONS': 20,
+    'HTTP_KEEPALIVE_EXPIRY': 30.0,
+    'HTTP2': False,
+    # Upstream timeouts in seconds (per profile via options["timeouts"]);
+    # the total budget covers one request including its body
+    'HTTP_CONNECT_TIMEOUT': 5.0,
+    'HTTP_READ_TIMEOUT': 15.0,
+    'HTTP_TOTAL_TIMEOUT': 30.0,
+    # Retries of idempotent Source fetches (per profile via options["retry"])
+    'HTTP_RETRY_ATTEMPTS': 2,
+    'HTTP_RETRY_BACKOFF_MS': 200,
+    'HTTP_RETRY_MAX_BACKOFF_MS': 5000,
+    # Hedged Source GETs (opt in per profile via options["hedge"])
+    'HEDGE_MIN_DELAY_MS': 10,
+    'HEDGE_MAX_DELAY_MS': 1000,
+    'HEDGE_HISTOGRAM_WINDOW': 1000,
+    # Circuit breaker (per profile via options["breaker"])
+    'BREAKER_ENABLED': True,
+    'BREAKER_FAILURE_THRESHOLD': 5,
+    'BREAKER_RESET_TIMEOUT': 30.0,
+
+    # Source fetch cache (enabled per profile via options["cache"]["ttl"])
+    'FETCH_CACHE_MAX_ENTRIES': 1024,
+    # Share one upstream request among identical concurrent fetches
+    # (per profile: options["coalesce"] = {"enabled": ..., "window_ms": ...})
+    'FETCH_COALESCING': True,
+
+    # Target micro-batching defaults (enabled per profile via options["batch"])
+    'SEND_BATCH_MAX_SIZE': 100,
+    'SEND_BATCH_MAX_LINGER_MS': 50,
+
+    # Upstream limits (per profile via options["limits"]). A concurrency of
+    # 0 leaves profiles without options["limits"] unlimited.
+    'UPSTREAM_MAX_CONCURRENCY': 0,
+    'UPSTREAM_MAX_WAIT_MS': 10000,
+
+    # Background job queue (`manage.py run_workers`)
+    'JOB_WORKER_CONCURRENCY': 4,
+    'JOB_POLL_INTERVAL': 1.0,
+    'JOB_LEASE_SECONDS': 300,
+    'JOB_MAX_ATTEMPTS': 3,
+    'JOB_RETRY_BACKOFF_SECONDS': 5,
+
+    # Execution stats rollups: refreshed by the log sink thread at most every
+    # STATS_REFRESH_INTERVAL seconds per process, leaving logs younger than
+    # STATS_ROLLUP_LAG seconds (longer than any buffered write takes) for the
+    # next refresh. STATS_DEFAULT_WINDOW is the default ?window=.
+    'STATS_REFRESH_INTERVAL': 10.0,
+    'STATS_ROLLUP_LAG': 30,
+    'STATS_DEFAULT_WINDOW': 3600,
+
+    # AI auto-mapping suggestions cache (0 entries disables it; TTL in
+    # seconds, 0 = no expiry)
+    'AUTOMAP_CACHE_MAX_ENTRIES': 1000,
+    'AUTOMAP_CACHE_TTL': 30 * 24 * 3600,
+    # Seconds to wait for the LLM before falling back to the offline
+    # matcher, and the lowest similarity (0-1) it suggests a mapping for
+    'AUTOMAP_LLM_TIMEOUT': 20.0,
+    'AUTOMAP_FUZZY_MIN_SIMILARITY': 0.3,
+    # Best-scoring sources each target competes for in the offline
+    # assignment (0 = all of them: exact, but cubic on large schemas)
+    'AUTOMAP_FUZZY_CANDIDATES': 25,
+
+    # Memoized results per transform expression and process (0 disables it);
+    # only pure expressions with an @expensive stage are memoized
+    'TRANSFORM_MEMO_SIZE': 1024,
+
+    # Template cache (0 disables it). Entries expire after TEMPLATE_CACHE_TTL
+    # seconds (0 = never), bounding how long other workers serve a template
+    # edited elsewhere. TEMPLATE_CACHE_INVALIDATION names a Django cache alias
+    # shared by all workers (e.g. 'default' on Redis) for immediate
+    # invalidation.
+    'TEMPLATE_CACHE_SIZE': 512,
+    'TEMPLATE_CACHE_TTL': 5.0,
+    'TEMPLATE_CACHE_INVALIDATION': None,
+    'TEMPLATE_CACHE_SYNC_INTERVAL': 1.0,
+
+    # Buffered ExecutionLog writes. The buffer is full at LOG_BUFFER_MAX_ENTRIES
+    # entries or LOG_BUFFER_MAX_BYTES of (approximate) payload JSON, 0 = no
+    # byte limit. LOG_BACKPRESSURE then applies: 'sync' writes the entry
+    # inline, 'drop' discards it.
+    'LOG_BUFFER_ENABLED': True,
+    'LOG_BUFFER_MAX_ENTRIES': 10000,
+    'LOG_BUFFER_MAX_BYTES': 64 * 1024 * 1024,
+    'LOG_FLUSH_BATCH_SIZE': 500,
+    'LOG_FLUSH_INTERVAL': 1.0,
+    'LOG_BACKPRESSURE': 'sync',
+    'LOG_SYNC_ERRORS': True,
+    # Per-payload cap for stored log payloads (0 = unlimited), overridable
+    # per template with MappingTemplate.log_payload_limit
+    'LOG_PAYLOAD_MAX_BYTES': 256 * 1024,
+}
+
+
+def hub_setting(name):
+    """
+    Returns the configured value for an INTEGRATION_HUB setting.
+    """
+    return getattr(settings, 'INTEGRATION_HUB', {}).get(name, DEFAULTS[name])
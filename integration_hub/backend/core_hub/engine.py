@@ -1,7 +1,30 @@
 import datetime
+import functools
 from decimal import Decimal
 import re
 
+
+def pure(func):
+    """
+    Marks a transform whose result depends only on (value, args), so it can
+    be constant-folded and memoized (see memo.py). Unmarked functions are
+    treated as impure.
+    """
+    func.pure = True
+    return func
+
+
+def expensive(func):
+    """
+    Marks a pure transform costly enough (date parsing, regexes) that
+    memoizing its results beats recomputing them. Pipelines of cheap pure
+    stages such as UPPERCASE or TRIM run directly: a memo lookup costs
+    about as much.
+    """
+    func.expensive = True
+    return pure(func)
+
+
 class TransformationEngine:
     """
     Engine to apply transformations to data.
@@ -11,48 +34,52 @@ class TransformationEngine:
     def apply(value, transformation_rule):
         """
         Apply a transformation rule to a value.
-        rule format: "FUNCTION_NAME" or "FUNCTION_NAME(arg1, arg2)"
+        rule format: "FUNCTION_NAME", "FUNCTION_NAME(arg1, arg2)" or a
+        pipeline such as "TRIM | UPPERCASE | DEFAULT(N/A)"
         """
         if not transformation_rule:
             return value
+        return _compiled_transform(transformation_rule)(value)
 
-        # Simple parsing for function calls with arguments e.g. DATE_FORMAT(%Y-%m-%d)
-        # This is a basic implementation. A proper parser would be better for complex cases.
+    @staticmethod
+    def parse_rule(transformation_rule):
+        """
+        Split a single-call rule string into (FUNCTION_NAME, [args]).
+        Kept as the lenient fallback for rules expressions.py cannot parse.
+        """
         func_name = transformation_rule.split('(')[0].strip().upper()
         args = []
         if '(' in transformation_rule and transformation_rule.endswith(')'):
             args_str = transformation_rule[transformation_rule.index('(')+1:-1]
             if args_str:
                 args = [arg.strip() for arg in args_str.split(',')]
-
-        method = getattr(TransformationEngine, f"func_{func_name}", None)
-        if method:
-            try:
-                return method(value, *args)
-            except Exception as e:
-                return f"ERROR: {str(e)}"
-        return value
+        return func_name, args
 
     # String Functions
     @staticmethod
+    @pure
     def func_UPPERCASE(value, *args):
         return str(value).upper() if value else value
 
     @staticmethod
+    @pure
     def func_LOWERCASE(value, *args):
         return str(value).lower() if value else value
 
     @staticmethod
+    @pure
     def func_TRIM(value, *args):
         return str(value).strip() if value else value
 
     @staticmethod
+    @expensive
     def func_REMOVE_PUNCTUATION(value, *args):
         if not value: return value
         return re.sub(r'[^\w\s]', '', str(value))
 
     # Numeric Functions
     @staticmethod
+    @pure
     def func_ROUND(value, *args):
         try:
             return round(float(value), int(args[0]) if args else 0)
@@ -61,6 +88,7 @@ class TransformationEngine:
 
     # Date Functions
     @staticmethod
+    @expensive
     def func_DATE_FORMAT(value, *args):
         # Assumes value is ISO format string or datetime object
         pattern = args[0] if args else "%Y-%m-%d"
@@ -75,5 +103,13 @@ class TransformationEngine:
 
     # Logic
     @staticmethod
+    @pure
     def func_DEFAULT(value, *args):
         return value if value else (args[0] if args else None)
+
+
+@functools.lru_cache(maxsize=256)
+def _compiled_transform(transformation_rule):
+    # Imported here: the compiler builds on this module
+    from .compiler import RuleCompiler
+    return RuleCompiler.compile_transform(transformation_rule)
@@ -0,0 +1,357 @@
+"""
+Transform expression parser and compiler.
+
+Grammar:
+    pipeline := call ('|' call)*
+    call     := NAME ['(' [arg (',' arg)*] ')']
+    arg      := 'quoted' | "quoted" | NAME '(' ... ')' | bare text
+
+    TRIM | UPPERCASE | DEFAULT(N/A)
+    DEFAULT('a, b')                 quotes keep commas and spaces
+    DEFAULT(UPPERCASE('n/a'))       nested call: first argument is its input
+
+Stages run left to right, each receiving the previous result; an exception
+in any stage makes the whole expression return "ERROR: <message>", as a
+single failing function did before. Bare arguments are stripped text, as
+with the original comma split, and outside strict mode a nested call to an
+unknown function stays literal text (DEFAULT(f(x)) falls back to "f(x)").
+Existing single-call rules keep their results, with three exceptions:
+quoted arguments lose their quotes (DEFAULT('') now yields '' rather than
+"''"), nested calls to known functions run (DEFAULT(UPPERCASE(n/a)) yields
+"N/A"), and text after the closing parenthesis no longer discards the
+arguments (the original parser ignored them in "DEFAULT(N/A) ").
+
+An expression parses once into an AST (Pipeline of Call / Literal nodes) and
+compiles into one callable: nested calls are constant-folded, constant
+arguments are converted up front (e.g. ROUND's digit count) and stages that
+cannot change the value are dropped. Expressions made only of pure
+functions, at least one of them marked @expensive, are memoized by value
+(see memo.py).
+"""
+import re
+
+from .engine import TransformationEngine
+from .memo import TransformMemo
+
+_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+# Stages for which f(f(x)) == f(x): repeats collapse into one
+_IDEMPOTENT = frozenset({'UPPERCASE', 'LOWERCASE', 'TRIM', 'REMOVE_PUNCTUATION', 'DEFAULT'})
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed or compiled."""
+
+
+# AST -------------------------------------------------------------------------
+
+class Literal:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f"Literal({self.value!r})"
+
+
+class Call:
+    __slots__ = ('name', 'args', 'source')
+
+    def __init__(self, name, args=(), source=None):
+        self.name = name
+        self.args = tuple(args)
+        self.source = source # Text of a nested call, kept if it cannot run
+
+    def __repr__(self):
+        return f"Call({self.name!r}, {list(self.args)!r})"
+
+
+class Pipeline:
+    __slots__ = ('calls',)
+
+    def __init__(self, calls):
+        self.calls = tuple(calls)
+
+    def __repr__(self):
+        return f"Pipeline({list(self.calls)!r})"
+
+
+# Parser ----------------------------------------------------------------------
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message):
+        return ExpressionError(f"{message} at position {self.pos} in '{self.text}'")
+
+    def skip_spaces(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def peek(self):
+        self.skip_spaces()
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def parse(self):
+        calls = [self.call()]
+        while self.peek() == '|':
+            self.pos += 1
+            calls.append(self.call())
+        if self.peek():
+            raise self.error(f"Unexpected '{self.peek()}'")
+        return Pipeline(calls)
+
+    def call(self):
+        self.skip_spaces()
+        match = _NAME.match(self.text, self.pos)
+        if not match:
+            raise self.error("Expected a function name")
+        self.pos = match.end()
+        args = []
+        if self.peek() == '(':
+            self.pos += 1
+            # "F()" has no arguments, "F( )" one empty argument, as before
+            if self.text[self.pos:self.pos + 1] == ')':
+                self.pos += 1
+            else:
+                while True:
+                    args.append(self.arg())
+                    char = self.peek()
+                    self.pos += 1
+                    if char == ')':
+                        break
+                    if char != ',':
+                        raise self.error("Expected ',' or ')'")
+        return Call(match.group().upper(), args)
+
+    def arg(self):
+        char = self.peek()
+        if char in ('"', "'"):
+            return Literal(self.quoted(char))
+
+        # NAME(...) followed by ',' or ')' is a nested call, anything else is text
+        start = self.pos
+        match = _NAME.match(self.text, start)
+        if match and self.text[match.end():].lstrip().startswith('('):
+            try:
+                call = self.call()
+                if self.peek() in (',', ')'):
+                    call.source = self.text[start:self.pos].strip()
+                    return call
+            except ExpressionError:
+                pass
+            self.pos = start
+        return Literal(self.bare())
+
+    def quoted(self, quote):
+        self.pos += 1
+        chars = []
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char == '\\' and self.pos + 1 < len(self.text):
+                chars.append(self.text[self.pos + 1])
+                self.pos += 2
+                continue
+            self.pos += 1
+            if char == quote:
+                return ''.join(chars)
+            chars.append(char)
+        raise self.error("Unterminated string")
+
+    def bare(self):
+        # Up to the next top-level ',' or ')'; balanced parentheses are kept
+        start, depth = self.pos, 0
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                if depth == 0:
+                    break
+                depth -= 1
+            elif char == ',' and depth == 0:
+                break
+            self.pos += 1
+        if self.pos >= len(self.text):
+            raise self.error("Unclosed '('")
+        return self.text[start:self.pos].strip()
+
+
+def parse_expression(text):
+    """
+    Parses a transform expression into a Pipeline; raises ExpressionError.
+    """
+    return _Parser(text).parse()
+
+
+# Compiler --------------------------------------------------------------------
+
+def _round_stage(args, strict):
+    try:
+        digits = int(args[0]) if args else 0
+    except (TypeError, ValueError):
+        if strict:
+            raise ExpressionError(f"ROUND expects an integer digit count, got '{args[0]}'")
+        # func_ROUND swallows the error and returns the value untouched
+        return None
+
+    def round_value(value):
+        try:
+            return round(float(value), digits)
+        except Exception:
+            return value
+    return round_value
+
+
+def _default_stage(args, strict):
+    fallback = args[0] if args else None
+
+    def default_value(value):
+        return value if value else fallback
+    return default_value
+
+
+def _remove_punctuation_stage(args, strict):
+    pattern = re.compile(r'[^\w\s]')
+
+    def remove_punctuation(value):
+        if not value:
+            return value
+        return pattern.sub('', str(value))
+    return remove_punctuation
+
+
+# Functions with constant arguments converted at compile time; the rest call
+# TransformationEngine.func_<NAME> directly
+_SPECIALIZED = {
+    'ROUND': _round_stage,
+    'DEFAULT': _default_stage,
+    'REMOVE_PUNCTUATION': _remove_punctuation_stage,
+}
+
+
+class _Stage:
+    __slots__ = ('name', 'args', 'func', 'pure', 'expensive')
+
+    def __init__(self, name, args, func, pure, expensive=False):
+        self.name = name
+        self.args = args
+        self.func = func
+        self.pure = pure
+        self.expensive = expensive
+
+
+def _fold(node, strict):
+    """
+    Evaluates an argument to a constant: nested calls run at compile time.
+    """
+    if isinstance(node, Literal):
+        return node.value
+    if not strict and node.source is not None and not hasattr(TransformationEngine, f"func_{node.name}"):
+        return node.source
+    args = [_fold(arg, strict) for arg in node.args]
+    stage = _compile_call(Call(node.name), args[1:], strict)
+    value = args[0] if args else None
+    if stage is None:
+        return value
+    if not stage.pure and strict:
+        raise ExpressionError(f"Impure function '{node.name}' cannot be used as an argument")
+    try:
+        return stage.func(value)
+    except Exception as e:
+        return f"ERROR: {str(e)}"
+
+
+def _compile_call(call, args, strict):
+    method = getattr(TransformationEngine, f"func_{call.name}", None)
+    if method is None:
+        if strict:
+            raise ExpressionError(f"Unknown transform function: '{call.name}'")
+        return None
+
+    args = tuple(args)
+    builder = _SPECIALIZED.get(call.name)
+    if builder is not None:
+        func = builder(args, strict)
+        if func is None:
+            return None
+    elif args:
+        def func(value, method=method, args=args):
+            return method(value, *args)
+    else:
+        func = method
+    return _Stage(call.name, args, func, getattr(method, 'pure', False), getattr(method, 'expensive', False))
+
+
+def _optimize(stages):
+    """
+    Drops stages that cannot change the value reaching them.
+    """
+    kept = []
+    for stage in stages:
+        previous = kept[-1] if kept else None
+        if previous is not None:
+            if stage.name in _IDEMPOTENT and stage.name == previous.name and stage.args == previous.args:
+                continue
+            # After DEFAULT(<truthy constant>) the value is never falsy
+            if stage.name == 'DEFAULT' and previous.name == 'DEFAULT' and previous.args and previous.args[0]:
+                continue
+        kept.append(stage)
+    return kept
+
+
+def _fuse(funcs):
+    """
+    Chains stage callables into one callable with a single error boundary.
+    """
+    if len(funcs) == 1:
+        first, = funcs
+
+        def fused(value):
+            try:
+                return first(value)
+            except Exception as e:
+                return f"ERROR: {str(e)}"
+    elif len(funcs) == 2:
+        first, second = funcs
+
+        def fused(value):
+            try:
+                return second(first(value))
+            except Exception as e:
+                return f"ERROR: {str(e)}"
+    else:
+        def fused(value):
+            try:
+                for func in funcs:
+                    value = func(value)
+                return value
+            except Exception as e:
+                return f"ERROR: {str(e)}"
+    return fused
+
+
+def compile_expression(expression, strict=False):
+    """
+    Compiles an expression string (or parsed Pipeline) into a one-argument
+    callable, or None when no stage can change the value. Unknown functions
+    are dropped, unless strict is set.
+    """
+    pipeline = expression if isinstance(expression, Pipeline) else parse_expression(expression)
+    stages = []
+    for call in pipeline.calls:
+        args = [_fold(arg, strict) for arg in call.args]
+        stage = _compile_call(call, args, strict)
+        if stage is not None:
+            stages.append(stage)
+    stages = _optimize(stages)
+    if not stages:
+        return None
+    fused = _fuse(tuple(stage.func for stage in stages))
+    # Cheap stages run faster than a memo lookup
+    if all(stage.pure for stage in stages) and any(stage.expensive for stage in stages):
+        fused = TransformMemo.wrap(fused)
+    return fused
@@ -0,0 +1,103 @@
+"""
+Optional TTL cache for Source fetches.
+
+Enabled per profile with options["cache"] = {"ttl": seconds}. Entries are
+keyed by profile, resolved URL and auth identity, bounded by an LRU of
+FETCH_CACHE_MAX_ENTRIES. Once an entry expires it is revalidated with
+If-None-Match / If-Modified-Since when the upstream sent an ETag or
+Last-Modified, so unchanged documents cost a 304 instead of a full body.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from .conf import hub_setting
+
+
+class CachedResponse:
+    __slots__ = ('payload', 'etag', 'last_modified', 'expires_at')
+
+    def __init__(self, payload, etag, last_modified, expires_at):
+        self.payload = payload
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+    def validators(self):
+        """
+        Conditional request headers for revalidating this entry.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FetchCache:
+    """
+    Process-wide LRU of fetched Source payloads. Cached payloads are shared
+    between executions and must be treated as read-only.
+    """
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+    revalidated = 0
+
+    @staticmethod
+    def ttl_for(profile):
+        """
+        Returns the profile's cache TTL in seconds, or None if caching is off.
+        """
+        options = (getattr(profile, 'options', None) or {}).get('cache') or {}
+        ttl = options.get('ttl')
+        return float(ttl) if ttl else None
+
+    @classmethod
+    def get(cls, key):
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                cls._entries.move_to_end(key)
+            return entry
+
+    @classmethod
+    def store(cls, key, payload, ttl, etag=None, last_modified=None):
+        entry = CachedResponse(payload, etag, last_modified, time.monotonic() + ttl)
+        with cls._lock:
+            cls._entries[key] = entry
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > hub_setting('FETCH_CACHE_MAX_ENTRIES'):
+                cls._entries.popitem(last=False)
+        return entry
+
+    @classmethod
+    def refresh(cls, entry, ttl):
+        entry.expires_at = time.monotonic() + ttl
+
+    @classmethod
+    def clear(cls, profile_id=None):
+        with cls._lock:
+            if profile_id is None:
+                cls._entries.clear()
+            else:
+                for key in [key for key in cls._entries if key[0] == profile_id]:
+                    del cls._entries[key]
+
+    @classmethod
+    def stats(cls):
+        served = cls.hits + cls.revalidated
+        lookups = served + cls.misses
+        return {
+            "size": len(cls._entries),
+            "max_size": hub_setting('FETCH_CACHE_MAX_ENTRIES'),
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "revalidated": cls.revalidated,
+            "hit_rate": round(served / lookups, 4) if lookups else None,
+        }
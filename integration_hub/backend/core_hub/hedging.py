@@ -0,0 +1,199 @@
+"""
+Hedged Source fetches.
+
+Opt in per profile with options["hedge"]:
+    percentile     latency percentile used as the hedge delay (default 95)
+    min_delay_ms   lower bound for the delay
+    max_delay_ms   upper bound, also used until min_samples are observed
+    min_samples    observations needed before the percentile is trusted
+
+If the first GET has not answered after the delay, an identical second one
+is fired; the first response wins and the other request is cancelled. The
+hedge needs a slot of its own under the profile's limits (limits.py) and is
+skipped when none is free, so hedging never exceeds them. The delay follows a
+per-profile latency histogram whose counts decay, so it tracks the upstream's
+recent behaviour; cancelled requests are recorded with the time they had run
+(a lower bound), so slow responses still pull the percentile up.
+"""
+import asyncio
+import math
+import threading
+import time
+
+from .conf import hub_setting
+from .limits import UpstreamLimiter
+
+# Log-spaced latency buckets from 1ms up to ~2 minutes
+_BUCKET_GROWTH = 1.2
+_BUCKET_COUNT = 65
+
+
+def _bucket_upper(index):
+    return 0.001 * _BUCKET_GROWTH ** index
+
+
+class LatencyHistogram:
+    """
+    Decaying log-bucketed histogram of response times in seconds.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.counts = [0.0] * _BUCKET_COUNT
+        self.total = 0.0
+
+    def observe(self, seconds):
+        if seconds <= 0.001:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(seconds / 0.001, _BUCKET_GROWTH))), _BUCKET_COUNT - 1)
+        self.counts[index] += 1
+        self.total += 1
+        # Halve every count once the window fills so old samples fade out
+        if self.total >= 2 * self.window:
+            self.counts = [count / 2 for count in self.counts]
+            self.total /= 2
+
+    def percentile(self, q):
+        if not self.total:
+            return None
+        rank = self.total * q / 100.0
+        seen = 0.0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return _bucket_upper(index)
+        return _bucket_upper(_BUCKET_COUNT - 1)
+
+
+class Hedger:
+    """
+    Per-profile latency histograms and hedged execution of Source GETs.
+    """
+    _histograms = {}
+    _lock = threading.Lock()
+    hedges_fired = 0
+    hedges_won = 0
+    hedges_skipped = 0
+
+    @staticmethod
+    def options_for(profile):
+        """
+        Returns the profile's hedge options, or None when hedging is off.
+        """
+        options = (getattr(profile, 'options', None) or {}).get('hedge')
+        if not options or not options.get('enabled', True):
+            return None
+        return {
+            'percentile': float(options.get('percentile', 95)),
+            'min_delay': options.get('min_delay_ms', hub_setting('HEDGE_MIN_DELAY_MS')) / 1000.0,
+            'max_delay': options.get('max_delay_ms', hub_setting('HEDGE_MAX_DELAY_MS')) / 1000.0,
+            'min_samples': int(options.get('min_samples', 20)),
+        }
+
+    @classmethod
+    def _histogram(cls, profile):
+        with cls._lock:
+            histogram = cls._histograms.get(profile.pk)
+            if histogram is None:
+                histogram = cls._histograms[profile.pk] = LatencyHistogram(hub_setting('HEDGE_HISTOGRAM_WINDOW'))
+            return histogram
+
+    @classmethod
+    def observe(cls, profile, seconds):
+        histogram = cls._histogram(profile)
+        with cls._lock:
+            histogram.observe(seconds)
+
+    @classmethod
+    def delay_for(cls, profile, options):
+        histogram = cls._histogram(profile)
+        with cls._lock:
+            if histogram.total < options['min_samples']:
+                return options['max_delay']
+            delay = histogram.percentile(options['percentile'])
+        return min(max(delay, options['min_delay']), options['max_delay'])
+
+    @classmethod
+    def wrap(cls, profile, send):
+        """
+        Returns send itself when hedging is off for the profile, otherwise a
+        hedged equivalent of it.
+        """
+        options = cls.options_for(profile)
+        if options is None:
+            return send
+        return lambda: cls.hedged(profile, send, options)
+
+    @classmethod
+    async def _timed(cls, profile, send):
+        started = time.monotonic()
+        try:
+            response = await send()
+        except asyncio.CancelledError:
+            # Censored: the response would have taken at least this long
+            cls.observe(profile, time.monotonic() - started)
+            raise
+        cls.observe(profile, time.monotonic() - started)
+        return response
+
+    @classmethod
+    async def hedged(cls, profile, send, options):
+        """
+        Awaits send(), firing a second send() if the first is still pending
+        after the hedge delay. The first successful response is returned and
+        the other attempt cancelled; an error is raised only if both fail.
+        """
+        primary = asyncio.ensure_future(cls._timed(profile, send))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=cls.delay_for(profile, options))
+            if done:
+                return primary.result()
+
+            # The primary holds the caller's limiter slot; the hedge needs its own
+            release = await UpstreamLimiter.try_acquire(profile)
+            if release is None:
+                cls.hedges_skipped += 1
+                return await primary
+
+            cls.hedges_fired += 1
+            hedge = asyncio.ensure_future(cls._timed(profile, send))
+            # Released even if the hedge is cancelled before it starts
+            hedge.add_done_callback(lambda task: release())
+            pending.add(hedge)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    if winner is hedge:
+                        cls.hedges_won += 1
+                    return winner.result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            profiles = {
+                str(pk): {
+                    "samples": round(histogram.total),
+                    "p50_ms": _ms(histogram.percentile(50)),
+                    "p95_ms": _ms(histogram.percentile(95)),
+                    "p99_ms": _ms(histogram.percentile(99)),
+                }
+                for pk, histogram in cls._histograms.items()
+            }
+        return {
+            "hedges_fired": cls.hedges_fired,
+            "hedges_won": cls.hedges_won,
+            "hedges_skipped": cls.hedges_skipped,
+            "profiles": profiles,
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
@@ -0,0 +1,202 @@
+"""
+Long-lived, pooled httpx clients per IntegrationProfile.
+
+Each profile gets one AsyncClient per event loop, so keep-alive connections
+to the same upstream are reused across executions instead of paying a new
+TCP/TLS handshake every time. A client is rebuilt when the profile's
+api_url, auth_config or options change.
+
+Pooling across requests needs a loop that outlives them (any ASGI server,
+run_workers; see lifespan.py). Under WSGI each request has its own loop,
+and its clients are closed when the request ends.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+import weakref
+
+import httpx
+
+from .conf import hub_setting
+from .lifespan import on_loop_release, on_shutdown
+from .resilience import timeout_for
+
+logger = logging.getLogger(__name__)
+
+# Old clients are closed after this delay so in-flight requests can finish
+STALE_CLIENT_GRACE_SECONDS = 30
+
+
+def resolve_secret(value):
+    """
+    Resolves a secret value.
+    If value starts with 'env:', reads from os.environ.
+    """
+    if value and isinstance(value, str) and value.startswith('env:'):
+        env_var = value.split(':', 1)[1]
+        return os.getenv(env_var, '')
+    return value
+
+
+def build_auth_headers(auth):
+    """
+    Builds the request headers for a profile's auth_config.
+    """
+    headers = {}
+    if auth:
+        if auth.get('type') == 'Bearer':
+            token = resolve_secret(auth.get('token'))
+            headers['Authorization'] = f"Bearer {token}"
+        elif auth.get('type') == 'Basic':
+            pass
+        elif auth.get('type') == 'ApiKey':
+            key_name = auth.get('key_name', 'X-API-Key')
+            key_value = resolve_secret(auth.get('value'))
+            headers[key_name] = key_value
+    return headers
+
+
+def _digest(profile, name, compute):
+    # Computed once per loaded profile: a changed profile is a new instance
+    # (see template_cache.py), or this one after save() drops the digests
+    digests = profile.__dict__.setdefault('_digests', {})
+    if name not in digests:
+        digests[name] = compute(profile)
+    return digests[name]
+
+
+def _auth_identity(profile):
+    raw = json.dumps(profile.auth_config or {}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _profile_fingerprint(profile):
+    raw = json.dumps(
+        [profile.api_url, profile.auth_config, getattr(profile, 'options', None)],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def auth_identity(profile):
+    """
+    Stable digest of a profile's auth_config, used to key cached responses.
+    """
+    return _digest(profile, 'auth_identity', _auth_identity)
+
+
+def profile_fingerprint(profile):
+    """
+    Identifies the parts of a profile that require a new client when changed.
+    """
+    return _digest(profile, 'fingerprint', _profile_fingerprint)
+
+
+class PooledClient:
+    """
+    A pooled AsyncClient together with the profile state it was built from.
+    """
+    __slots__ = ('client', 'fingerprint')
+
+    def __init__(self, client, fingerprint):
+        self.client = client
+        self.fingerprint = fingerprint
+
+
+class ClientRegistry:
+    """
+    Registry of pooled clients, keyed by event loop and profile id.
+    """
+    _pools = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+    _http2_available = importlib.util.find_spec('h2') is not None
+    _transport = None
+
+    @classmethod
+    def set_transport(cls, transport):
+        """
+        Routes clients built from now on through transport, e.g. an
+        httpx.MockTransport standing in for upstreams in benchmarks. None
+        restores real network transports.
+        """
+        with cls._lock:
+            cls._transport = transport
+
+    @classmethod
+    def client_options(cls, profile):
+        """
+        Pool settings for a profile: INTEGRATION_HUB defaults overridden by
+        the profile's options["http"] and options["timeouts"] blocks.
+        """
+        overrides = (getattr(profile, 'options', None) or {}).get('http', {})
+        http2 = overrides.get('http2', hub_setting('HTTP2'))
+        if http2 and not cls._http2_available:
+            logger.warning(f"HTTP/2 requested for profile {profile.pk} but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+        return {
+            'limits': httpx.Limits(
+                max_connections=overrides.get('max_connections', hub_setting('HTTP_MAX_CONNECTIONS')),
+                max_keepalive_connections=overrides.get('max_keepalive_connections', hub_setting('HTTP_MAX_KEEPALIVE_CONNECTIONS')),
+                keepalive_expiry=overrides.get('keepalive_expiry', hub_setting('HTTP_KEEPALIVE_EXPIRY')),
+            ),
+            'http2': bool(http2),
+            'timeout': timeout_for(profile),
+        }
+
+    @classmethod
+    def _build(cls, profile, fingerprint):
+        options = cls.client_options(profile)
+        if cls._transport is not None:
+            options['transport'] = cls._transport
+        client = httpx.AsyncClient(
+            verify=False,
+            headers=build_auth_headers(profile.auth_config),
+            **options
+        )
+        logger.info(f"Opened pooled HTTP client for profile {profile.pk}")
+        return PooledClient(client, fingerprint)
+
+    @classmethod
+    def get_client(cls, profile):
+        """
+        Returns the pooled AsyncClient for a profile on the running loop,
+        building or rebuilding it as needed. Auth headers are preset on it.
+        """
+        loop = asyncio.get_running_loop()
+        fingerprint = profile_fingerprint(profile)
+
+        with cls._lock:
+            clients = cls._pools.get(loop)
+            if clients is None:
+                clients = cls._pools[loop] = {}
+            entry = clients.get(profile.pk)
+            if entry is not None and entry.fingerprint == fingerprint:
+                return entry.client
+            stale = entry
+            entry = clients[profile.pk] = cls._build(profile, fingerprint)
+
+        if stale is not None:
+            logger.info(f"Profile {profile.pk} changed; rebuilding pooled HTTP client")
+            loop.call_later(STALE_CLIENT_GRACE_SECONDS, lambda: loop.create_task(stale.client.aclose()))
+        return entry.client
+
+    @classmethod
+    async def aclose_all(cls):
+        """
+        Closes every client owned by the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            clients = cls._pools.pop(loop, {})
+        for entry in clients.values():
+            await entry.client.aclose()
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled HTTP client(s)")
+
+
+on_shutdown(ClientRegistry.aclose_all)
+on_loop_release(ClientRegistry.aclose_all)
@@ -0,0 +1,138 @@
+"""
+Database-backed queue of background executions (ExecutionJob).
+
+Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED where the database
+supports it (PostgreSQL, MySQL 8), and with a conditional UPDATE on the
+candidate row elsewhere (SQLite), so concurrent workers never run the same
+job twice. A claim holds a lease, renewed by the worker while the job runs
+(renew); RUNNING jobs whose worker died are picked up again once the lease
+expires, or marked ERROR if their attempts are used up. Failures a retry
+cannot fix (fail(..., retryable=False)) end the job at once.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .conf import hub_setting
+from .models import ExecutionJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Enqueue, claim and settle ExecutionJobs.
+    """
+
+    @staticmethod
+    def enqueue(template, payload):
+        return ExecutionJob.objects.create(
+            template=template,
+            payload=payload,
+            max_attempts=hub_setting('JOB_MAX_ATTEMPTS'),
+        )
+
+    @staticmethod
+    def _claimable(now):
+        return ExecutionJob.objects.filter(
+            Q(status='PENDING', available_at__lte=now) |
+            Q(status='RUNNING', lease_expires_at__lt=now, attempts__lt=F('max_attempts'))
+        )
+
+    @staticmethod
+    def reap(now):
+        """
+        Marks as ERROR the RUNNING jobs whose lease expired with no attempts
+        left, e.g. jobs that keep crashing their worker.
+        """
+        reaped = ExecutionJob.objects.filter(
+            status='RUNNING', lease_expires_at__lt=now, attempts__gte=F('max_attempts')
+        ).update(
+            status='ERROR',
+            error_message='Lease expired on the last attempt (worker lost)',
+            finished_at=now,
+            lease_expires_at=None,
+        )
+        if reaped:
+            logger.error(f"Marked {reaped} job(s) as ERROR after their last lease expired")
+        return reaped
+
+    @classmethod
+    def claim(cls, worker_id):
+        """
+        Claims the oldest available job for worker_id, or returns None.
+        """
+        now = timezone.now()
+        cls.reap(now)
+        claim = {
+            'status': 'RUNNING',
+            'locked_by': worker_id,
+            'lease_expires_at': now + timedelta(seconds=hub_setting('JOB_LEASE_SECONDS')),
+            'started_at': now,
+            'attempts': F('attempts') + 1,
+        }
+
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                job = (
+                    cls._claimable(now)
+                    .select_for_update(skip_locked=True)
+                    .order_by('available_at')
+                    .only('id')
+                    .first()
+                )
+                if job is None:
+                    return None
+                ExecutionJob.objects.filter(pk=job.pk).update(**claim)
+        else:
+            # No row locks: the UPDATE re-checks claimability, so only one
+            # worker wins a given row; losers move on to the next candidate
+            candidates = cls._claimable(now).order_by('available_at').values_list('pk', flat=True)[:10]
+            for pk in candidates:
+                if cls._claimable(now).filter(pk=pk).update(**claim):
+                    job = ExecutionJob(pk=pk)
+                    break
+            else:
+                return None
+
+        return ExecutionJob.objects.select_related('template').get(pk=job.pk)
+
+    @staticmethod
+    def renew(job):
+        """
+        Extends the lease of a job still held by its worker. Returns False
+        once the lease is lost (expired and claimed elsewhere).
+        """
+        return bool(ExecutionJob.objects.filter(pk=job.pk, locked_by=job.locked_by, status='RUNNING').update(
+            lease_expires_at=timezone.now() + timedelta(seconds=hub_setting('JOB_LEASE_SECONDS'))
+        ))
+
+    @staticmethod
+    def complete(job, result):
+        ExecutionJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status='SUCCESS',
+            result=result,
+            error_message=None,
+            finished_at=timezone.now(),
+            lease_expires_at=None,
+        )
+
+    @staticmethod
+    def fail(job, error_message, retryable=True):
+        """
+        Schedules a retry with jittered exponential backoff, or marks the job
+        as ERROR once its attempts are used up or the error is not retryable.
+        """
+        now = timezone.now()
+        update = {'error_message': error_message, 'lease_expires_at': None}
+        if retryable and job.attempts < job.max_attempts:
+            backoff = hub_setting('JOB_RETRY_BACKOFF_SECONDS') * 2 ** (job.attempts - 1)
+            update.update(status='PENDING', available_at=now + timedelta(seconds=random.uniform(backoff / 2, backoff)))
+            logger.warning(f"Job {job.pk} failed (attempt {job.attempts}/{job.max_attempts}), will retry: {error_message}")
+        else:
+            update.update(status='ERROR', finished_at=now)
+        ExecutionJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**update)
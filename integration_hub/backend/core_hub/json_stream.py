@@ -0,0 +1,248 @@
+"""
+Incremental extraction of records from a JSON array inside a larger document.
+
+JSONArrayStreamParser is fed the response body chunk by chunk and returns the
+elements of the array found at a configured path as soon as each one is
+complete, so large upstream feeds can be mapped without buffering or parsing
+the whole document. Only the current element (plus any partially received
+bytes) is held in memory.
+"""
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r'\s*')
+# Body of a JSON string after its opening quote, up to and including the closing quote
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r'[\s,\]}]')
+
+
+def parse_records_path(path):
+    """
+    Splits "$.data.items" / "data.0.items" into segments; numeric segments
+    index into arrays. "" and "$" mean the document itself is the array.
+    """
+    if not path or path in ('$', '$.'):
+        return []
+    if path.startswith('$.'):
+        path = path[2:]
+    return [int(part) if part.isdigit() else part for part in path.split('.')]
+
+
+class JSONArrayStreamParser:
+    """
+    Push parser: feed() text or bytes, get back the array elements completed
+    so far. close() must be called once the input is exhausted.
+    """
+
+    def __init__(self, path):
+        self.segments = parse_records_path(path) if isinstance(path, str) else list(path)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._depth = 0            # Path segments matched so far
+        self._state = 'value'      # What the parser expects next
+        self._index = 0            # Element index while seeking an array segment
+        self._scan = None          # (start, resume_pos, nesting) of a value being scanned
+        self.found = False         # Target array reached
+        self.done = False
+
+    # Input
+
+    def feed(self, data):
+        if isinstance(data, bytes):
+            data = self._decoder.decode(data)
+        if self.done or not data:
+            return []
+        self._buf = self._buf[self._pos:] + data
+        self._shift(self._pos)
+        self._pos = 0
+        return self._run(final=False)
+
+    def close(self):
+        tail = self._decoder.decode(b'', final=True)
+        items = []
+        if not self.done:
+            self._buf = self._buf[self._pos:] + tail
+            self._shift(self._pos)
+            self._pos = 0
+            items = self._run(final=True)
+        if not self.done:
+            raise ValueError("Unexpected end of JSON document")
+        return items
+
+    def _shift(self, offset):
+        if self._scan is not None and offset:
+            start, resume, nesting = self._scan
+            self._scan = (start - offset, resume - offset, nesting)
+
+    # Parsing
+
+    def _skip_ws(self):
+        self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+        return self._pos < len(self._buf)
+
+    def _expect(self, chars):
+        char = self._buf[self._pos]
+        if char not in chars:
+            raise ValueError(f"Invalid JSON: unexpected '{char}' while expecting {' or '.join(chars)}")
+        self._pos += 1
+        return char
+
+    def _value_end(self, final):
+        """
+        Returns the end offset of the value starting at self._pos, or None if
+        more input is needed. Scanning of containers resumes where it stopped.
+        """
+        buf = self._buf
+        if self._scan is None:
+            self._scan = (self._pos, self._pos, 0)
+        start, i, nesting = self._scan
+        first = buf[start]
+
+        if first == '"':
+            match = _STRING_END.match(buf, start + 1)
+            return match.end() if match else None
+
+        if first in '[{':
+            while True:
+                match = _STRUCTURAL.search(buf, i)
+                if match is None:
+                    self._scan = (start, len(buf), nesting)
+                    return None
+                char = match.group()
+                if char == '"':
+                    string = _STRING_END.match(buf, match.end())
+                    if string is None:
+                        self._scan = (start, match.start(), nesting)
+                        return None
+                    i = string.end()
+                elif char in '[{':
+                    nesting += 1
+                    i = match.end()
+                else:
+                    nesting -= 1
+                    i = match.end()
+                    if nesting == 0:
+                        return i
+
+        match = _SCALAR_END.search(buf, start)
+        if match:
+            return match.start()
+        return len(buf) if final else None
+
+    def _take_value(self, final):
+        end = self._value_end(final)
+        if end is None:
+            return None
+        start = self._scan[0]
+        self._scan = None
+        self._pos = end
+        return start, end
+
+    def _run(self, final):
+        items = []
+        while not self.done and self._skip_ws():
+            state = self._state
+
+            if state == 'value':
+                # Start of the value for the next path segment (or the array)
+                if self._depth == len(self.segments):
+                    self._expect('[')
+                    self.found = True
+                    self._state = 'item'
+                elif isinstance(self.segments[self._depth], int):
+                    self._expect('[')
+                    self._index = 0
+                    self._state = 'element'
+                else:
+                    self._expect('{')
+                    self._state = 'key'
+
+            elif state == 'key':
+                if self._buf[self._pos] == '}':
+                    self.done = True  # Path not present
+                    break
+                self._expect('"')
+                match = _STRING_END.match(self._buf, self._pos)
+                if match is None:
+                    self._pos -= 1
+                    break
+                self._key = json.loads(self._buf[self._pos - 1:match.end()])
+                self._pos = match.end()
+                self._state = 'colon'
+
+            elif state == 'colon':
+                self._expect(':')
+                if self._key == self.segments[self._depth]:
+                    self._depth += 1
+                    self._state = 'value'
+                else:
+                    self._state = 'skip_member'
+
+            elif state == 'skip_member':
+                if self._take_value(final) is None:
+                    break
+                self._state = 'after_member'
+
+            elif state == 'after_member':
+                if self._expect(',}') == '}':
+                    self.done = True
+                    break
+                self._state = 'key'
+
+            elif state == 'element':
+                if self._buf[self._pos] == ']':
+                    self.done = True  # Index out of range
+                    break
+                if self._index == self.segments[self._depth]:
+                    self._depth += 1
+                    self._state = 'value'
+                    continue
+                if self._take_value(final) is None:
+                    break
+                self._index += 1
+                self._state = 'after_element'
+
+            elif state == 'after_element':
+                if self._expect(',]') == ']':
+                    self.done = True
+                    break
+                self._state = 'element'
+
+            elif state == 'item':
+                if self._buf[self._pos] == ']' and self._scan is None:
+                    self._pos += 1
+                    self.done = True
+                    break
+                span = self._take_value(final)
+                if span is None:
+                    break
+                items.append(json.loads(self._buf[span[0]:span[1]]))
+                self._state = 'after_item'
+
+            elif state == 'after_item':
+                if self._expect(',]') == ']':
+                    self.done = True
+                    break
+                self._state = 'item'
+
+        return items
+
+
+async def aiter_array_items(byte_chunks, path):
+    """
+    Yields the elements of the array at path from an async iterator of bytes.
+    """
+    parser = JSONArrayStreamParser(path)
+    async for chunk in byte_chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            break
+    if not parser.done:
+        for item in parser.close():
+            yield item
+    if not parser.found:
+        raise ValueError(f"No JSON array found at '{path or '$'}'")
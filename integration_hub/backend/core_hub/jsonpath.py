@@ -0,0 +1,531 @@
+"""
+JSONPath compiler for rule source paths.
+
+Supported syntax:
+    $.a.b / a.b / $.a.0.b   legacy dotted paths (numeric segments index lists)
+    $['a'] / $["a b"]       bracketed names, unions: $['a','b']
+    $.a[0] / $.a[-1]        indexes, unions: $.a[0,2]
+    $.a[1:5:2]              slices
+    $.a[*] / $.a.*          wildcards
+    $..name / $..[0]        recursive descent
+    $.a[?(@.x > 1 && @.y == 'z')]
+                            filters (==, !=, <, <=, >, >=, existence; && / ||)
+
+A path compiles once into a CompiledPath of steps. Definite paths (no
+wildcard, slice, union, filter or descent) resolve to a single value or None;
+other paths fan out and resolve to a list of every match.
+
+PathTrie merges the steps of many paths, so rules sharing a prefix (e.g.
+$.estabelecimento.*) walk that prefix once per document.
+"""
+import re
+
+_MISSING = object()
+
+
+class JSONPathError(ValueError):
+    """Raised for paths that cannot be parsed."""
+
+
+# Steps -----------------------------------------------------------------------
+
+class _Step:
+    __slots__ = ('key',)
+    definite = True
+
+    def one(self, value):
+        for match in self.select(value):
+            return match
+        return _MISSING
+
+    def many(self, values):
+        return [match for value in values for match in self.select(value)]
+
+
+class _Key(_Step):
+    """
+    Dotted segment: dict key first, then (for digit segments) list index,
+    exactly like the original per-call lookup.
+    """
+    __slots__ = ('name', 'index')
+
+    def __init__(self, name, allow_index=True):
+        self.name = name
+        self.index = int(name) if allow_index and name.isdigit() else None
+        self.key = ('key', name, self.index)
+
+    def one(self, value):
+        if isinstance(value, dict):
+            if self.name in value:
+                return value[self.name]
+        elif self.index is not None and isinstance(value, list) and self.index < len(value):
+            return value[self.index]
+        return _MISSING
+
+    def select(self, value):
+        match = self.one(value)
+        return () if match is _MISSING else (match,)
+
+
+class _Names(_Step):
+    __slots__ = ('names', 'definite')
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.key = ('names',) + self.names
+        self.definite = len(self.names) == 1
+
+    def select(self, value):
+        if isinstance(value, dict):
+            return [value[name] for name in self.names if name in value]
+        return ()
+
+
+class _Indexes(_Step):
+    __slots__ = ('indexes', 'definite')
+
+    def __init__(self, indexes):
+        self.indexes = tuple(indexes)
+        self.key = ('indexes',) + self.indexes
+        self.definite = len(self.indexes) == 1
+
+    def select(self, value):
+        if isinstance(value, list):
+            size = len(value)
+            return [value[i] for i in self.indexes if -size <= i < size]
+        return ()
+
+
+class _Slice(_Step):
+    __slots__ = ('slice',)
+    definite = False
+
+    def __init__(self, start, stop, step):
+        if step == 0:
+            raise JSONPathError("Slice step cannot be zero")
+        self.slice = slice(start, stop, step)
+        self.key = ('slice', start, stop, step)
+
+    def select(self, value):
+        return value[self.slice] if isinstance(value, list) else ()
+
+
+class _Wildcard(_Step):
+    __slots__ = ()
+    definite = False
+
+    def __init__(self):
+        self.key = ('*',)
+
+    def select(self, value):
+        if isinstance(value, dict):
+            return list(value.values())
+        if isinstance(value, list):
+            return value
+        return ()
+
+
+class _Descendants(_Step):
+    """
+    The '..' operator: the value itself and everything nested in it.
+    """
+    __slots__ = ()
+    definite = False
+
+    def __init__(self):
+        self.key = ('..',)
+
+    def select(self, value):
+        found = []
+        stack = [value]
+        while stack:
+            current = stack.pop()
+            found.append(current)
+            if isinstance(current, dict):
+                stack.extend(reversed(list(current.values())))
+            elif isinstance(current, list):
+                stack.extend(reversed(current))
+        return found
+
+
+class _Filter(_Step):
+    __slots__ = ('predicate',)
+    definite = False
+
+    def __init__(self, source, predicate):
+        self.key = ('filter', source)
+        self.predicate = predicate
+
+    def select(self, value):
+        if isinstance(value, list):
+            return [item for item in value if self.predicate(item)]
+        if isinstance(value, dict):
+            return [item for item in value.values() if self.predicate(item)]
+        return ()
+
+
+# Filter expressions ------------------------------------------------------------
+
+_FILTER_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<path>@(?:\.[^\s.\[\]=!<>&|)]+|\[[^\]]*\])*)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<literal>true|false|null)
+      | (?P<op>==|!=|<=|>=|<|>|&&|\|\|)
+    )""", re.VERBOSE)
+
+_COMPARATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+def _tokenize_filter(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _FILTER_TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise JSONPathError(f"Invalid filter expression: '{expression}'")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+def _filter_operand(kind, text):
+    if kind == 'path':
+        path = compile_path('$' + text[1:])
+        return lambda item: path.resolve(item, missing=_MISSING)
+    if kind == 'string':
+        value = re.sub(r'\\(.)', r'\1', text[1:-1])
+    elif kind == 'number':
+        value = float(text) if any(c in text for c in '.eE') else int(text)
+    elif kind == 'literal':
+        value = {'true': True, 'false': False, 'null': None}[text]
+    else:
+        raise JSONPathError(f"Unexpected '{text}' in filter")
+    return lambda item: value
+
+
+def _compile_comparison(tokens):
+    if len(tokens) == 1:
+        kind, text = tokens[0]
+        if kind != 'path':
+            raise JSONPathError(f"Filter condition must start with @: '{text}'")
+        operand = _filter_operand(kind, text)
+        return lambda item: operand(item) is not _MISSING
+
+    if len(tokens) != 3 or tokens[1][0] != 'op' or tokens[1][1] not in _COMPARATORS:
+        raise JSONPathError("Filter conditions must look like '@.field <op> value'")
+    left = _filter_operand(*tokens[0])
+    right = _filter_operand(*tokens[2])
+    compare = _COMPARATORS[tokens[1][1]]
+
+    def comparison(item):
+        a, b = left(item), right(item)
+        if a is _MISSING or b is _MISSING:
+            return False
+        try:
+            return bool(compare(a, b))
+        except TypeError:
+            return False
+
+    return comparison
+
+
+def _split_tokens(tokens, operator):
+    groups = [[]]
+    for token in tokens:
+        if token == ('op', operator):
+            groups.append([])
+        else:
+            groups[-1].append(token)
+    return groups
+
+
+def _compile_filter(expression):
+    """
+    Compiles '@.a > 1 && @.b' style expressions; && binds tighter than ||.
+    """
+    tokens = _tokenize_filter(expression)
+    alternatives = [
+        [_compile_comparison(group) for group in _split_tokens(alternative, '&&')]
+        for alternative in _split_tokens(tokens, '||')
+    ]
+    return lambda item: any(all(cond(item) for cond in conds) for conds in alternatives)
+
+
+# Parser ------------------------------------------------------------------------
+
+_NAME = re.compile(r"[^.\[\]]+")
+
+
+def _split_union(text):
+    parts = []
+    current = ''
+    quote = None
+    for char in text:
+        if quote:
+            current += char
+            if char == quote:
+                quote = None
+        elif char in '\'"':
+            quote = char
+            current += char
+        elif char == ',':
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    parts.append(current.strip())
+    return parts
+
+
+def _parse_int(text):
+    try:
+        return int(text) if text.strip() else None
+    except ValueError:
+        raise JSONPathError(f"Invalid index '{text}'") from None
+
+
+def _parse_bracket(content):
+    content = content.strip()
+    if content == '*':
+        return _Wildcard()
+    if content.startswith('?'):
+        expression = content[1:].strip()
+        if not (expression.startswith('(') and expression.endswith(')')):
+            raise JSONPathError(f"Filter must be written as ?(...): '{content}'")
+        return _Filter(expression, _compile_filter(expression[1:-1]))
+    if ':' in content:
+        parts = content.split(':')
+        if len(parts) > 3:
+            raise JSONPathError(f"Invalid slice '{content}'")
+        parts += [''] * (3 - len(parts))
+        return _Slice(*(_parse_int(part) for part in parts))
+
+    items = _split_union(content)
+    if all(len(item) >= 2 and item[0] == item[-1] and item[0] in '\'"' for item in items):
+        return _Names(item[1:-1] for item in items)
+    return _Indexes(_parse_int(item) for item in items)
+
+
+def _parse_bracket_at(path, position):
+    """
+    Returns (content, end) for the bracket starting at path[position].
+    """
+    quote = None
+    depth = 0
+    for end in range(position, len(path)):
+        char = path[end]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '\'"':
+            quote = char
+        elif char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+            if depth == 0:
+                return path[position + 1:end], end + 1
+    raise JSONPathError(f"Unclosed '[' in path '{path}'")
+
+
+def is_legacy_path(path):
+    """
+    True for plain dotted paths, which keep the original lookup semantics.
+    """
+    return '[' not in path and '*' not in path and '..' not in path and path != '$'
+
+
+def _parse(path):
+    if is_legacy_path(path):
+        if path.startswith('$.'):
+            path = path[2:]
+        return [_Key(part) for part in path.split('.')]
+
+    if path.startswith('$'):
+        position = 1
+    else:
+        position = 0
+        path = '.' + path if not path.startswith(('.', '[')) else path
+
+    steps = []
+    while position < len(path):
+        char = path[position]
+        if path.startswith('..', position):
+            steps.append(_Descendants())
+            position += 2
+            if position < len(path) and path[position] == '[':
+                continue
+            match = _NAME.match(path, position)
+            if not match:
+                raise JSONPathError(f"Expected a name after '..' in '{path}'")
+            name = match.group()
+            steps.append(_Wildcard() if name == '*' else _Key(name, allow_index=False))
+            position = match.end()
+        elif char == '.':
+            match = _NAME.match(path, position + 1)
+            if not match:
+                raise JSONPathError(f"Expected a name after '.' in '{path}'")
+            name = match.group()
+            steps.append(_Wildcard() if name == '*' else _Key(name))
+            position = match.end()
+        elif char == '[':
+            content, position = _parse_bracket_at(path, position)
+            steps.append(_parse_bracket(content))
+        else:
+            raise JSONPathError(f"Unexpected '{char}' at position {position} in '{path}'")
+    return steps
+
+
+class CompiledPath:
+    """
+    A parsed path: its steps and whether it resolves to a single value.
+    """
+    __slots__ = ('source', 'steps', 'definite')
+
+    def __init__(self, source, steps):
+        self.source = source
+        self.steps = tuple(steps)
+        self.definite = all(step.definite for step in self.steps)
+
+    def resolve(self, data, missing=None):
+        """
+        Definite paths: the value or `missing`. Others: a list of matches.
+        """
+        if self.definite:
+            current = data
+            for step in self.steps:
+                current = step.one(current)
+                if current is _MISSING:
+                    return missing
+            return current
+        values = [data]
+        for step in self.steps:
+            values = step.many(values) if not step.definite else [
+                match for match in map(step.one, values) if match is not _MISSING
+            ]
+            if not values:
+                break
+        return values
+
+    def __call__(self, data):
+        return self.resolve(data)
+
+
+def compile_path(path):
+    """
+    Compiles a source path; raises JSONPathError when it cannot be parsed.
+    """
+    return CompiledPath(path, _parse(path))
+
+
+def compile_legacy_path(path):
+    """
+    Compiles any string with the original dotted semantics (never raises).
+    """
+    if path.startswith('$.'):
+        path = path[2:]
+    return CompiledPath(path, [_Key(part) for part in path.split('.')])
+
+
+# Shared-prefix resolution -----------------------------------------------------
+
+class _TrieNode:
+    __slots__ = ('step', 'children', 'terminals')
+
+    def __init__(self, step=None):
+        self.step = step
+        self.children = {}
+        self.terminals = []
+
+
+class PathTrie:
+    """
+    Resolves many compiled paths against one document, walking each shared
+    prefix once.
+    """
+
+    def __init__(self, paths):
+        self.root = _TrieNode()
+        self.size = len(paths)
+        self.indefinite = tuple(i for i, path in enumerate(paths) if not path.definite)
+        for position, path in enumerate(paths):
+            node = self.root
+            for step in path.steps:
+                child = node.children.get(step.key)
+                if child is None:
+                    child = node.children[step.key] = _TrieNode(step)
+                node = child
+            node.terminals.append(position)
+        self._freeze(self.root)
+
+    def _freeze(self, node):
+        node.children = tuple(node.children.values())
+        node.terminals = tuple(node.terminals)
+        for child in node.children:
+            self._freeze(child)
+
+    def resolve(self, data):
+        """
+        Returns the resolved value of every path, in construction order.
+        """
+        out = [None] * self.size
+        for position in self.indefinite:
+            out[position] = []
+        self._walk_one(self.root, data, out)
+        return out
+
+    def _walk_one(self, node, value, out):
+        # Single-value mode: every step so far was definite. Iterative, with
+        # the dotted-key lookup inlined, as this is the hot path of mapping
+        stack = [(node, value)]
+        while stack:
+            node, value = stack.pop()
+            for position in node.terminals:
+                out[position] = value
+            for child in node.children:
+                step = child.step
+                if step.__class__ is _Key:
+                    if isinstance(value, dict):
+                        if step.name not in value:
+                            continue
+                        match = value[step.name]
+                    elif step.index is not None and isinstance(value, list) and step.index < len(value):
+                        match = value[step.index]
+                    else:
+                        continue
+                    if child.children:
+                        stack.append((child, match))
+                    else:
+                        for position in child.terminals:
+                            out[position] = match
+                elif step.definite:
+                    match = step.one(value)
+                    if match is not _MISSING:
+                        stack.append((child, match))
+                else:
+                    matches = step.many((value,))
+                    if matches:
+                        self._walk_many(child, matches, out)
+
+    def _walk_many(self, node, values, out):
+        for position in node.terminals:
+            out[position] = values
+        for child in node.children:
+            step = child.step
+            if step.definite:
+                matches = [match for match in map(step.one, values) if match is not _MISSING]
+            else:
+                matches = step.many(values)
+            if matches:
+                self._walk_many(child, matches, out)
@@ -0,0 +1,136 @@
+"""
+ASGI lifespan support.
+
+Django's ASGI handler only serves HTTP, so long-lived resources such as pooled
+HTTP clients register shutdown hooks here and the ASGI app in backend/asgi.py
+is wrapped with LifespanMiddleware to run them.
+
+Per-loop resources (pooled clients, pending target batches) outlive a
+request on every loop except the ones Django creates per request: under
+WSGI, async views run through async_to_sync, which gives each call a fresh
+loop that is discarded afterwards. Views decorated with @releases_loop run
+the on_loop_release hooks before returning on such a loop only, so those
+resources are closed instead of leaked. ASGI servers serve every request on
+one shared loop, with or without lifespan, and nothing is released there;
+the shutdown hooks only run with lifespan (or in run_workers, which marks
+its loop persistent).
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import weakref
+
+from asgiref.sync import AsyncToSync
+
+logger = logging.getLogger(__name__)
+
+_shutdown_hooks = []
+_loop_release_hooks = []
+_persistent_loops = weakref.WeakSet()
+
+
+def on_shutdown(hook):
+    """
+    Registers a sync or async callable to run on server shutdown.
+    Can be used as a decorator.
+    """
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+    return hook
+
+
+def on_loop_release(hook):
+    """
+    Registers a sync or async callable releasing the running loop's
+    resources when a request on a short-lived loop ends.
+    """
+    if hook not in _loop_release_hooks:
+        _loop_release_hooks.append(hook)
+    return hook
+
+
+def mark_persistent_loop():
+    """
+    Declares the running loop long-lived: its per-loop resources are kept
+    across requests and released by the shutdown hooks.
+    """
+    _persistent_loops.add(asyncio.get_running_loop())
+
+
+def is_request_loop():
+    """
+    True when the running loop was created by async_to_sync for a single
+    call (how Django runs async views under WSGI) and was not declared
+    persistent.
+    """
+    loop = asyncio.get_running_loop()
+    # async_to_sync registers the loops it creates while they run
+    return loop not in _persistent_loops and loop in AsyncToSync.loop_thread_executors
+
+
+def is_persistent_loop():
+    return not is_request_loop()
+
+
+async def _run_hooks(hooks):
+    for hook in reversed(hooks):
+        try:
+            result = hook()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Hook {hook!r} failed: {e}", exc_info=True)
+
+
+async def release_loop():
+    """
+    Runs the loop release hooks when the running loop is a per-request one.
+    """
+    if is_request_loop():
+        await _run_hooks(_loop_release_hooks)
+
+
+def releases_loop(view):
+    """
+    Decorator for async views: releases the per-loop resources the view
+    opened when it runs on a per-request loop.
+    """
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await view(*args, **kwargs)
+        finally:
+            await release_loop()
+    return wrapper
+
+
+async def run_shutdown_hooks():
+    """
+    Runs hooks in reverse registration order (like atexit), so components
+    that drain work run before the clients they depend on are closed.
+    """
+    await _run_hooks(_shutdown_hooks)
+
+
+class LifespanMiddleware:
+    """
+    Answers ASGI lifespan events and forwards everything else to the app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                mark_persistent_loop()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await run_shutdown_hooks()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
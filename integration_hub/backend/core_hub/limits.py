@@ -0,0 +1,278 @@
+"""
+Per-profile concurrency limits and token-bucket rate limiting for upstream
+calls.
+
+Configured per IntegrationProfile with options["limits"]:
+    max_concurrency  concurrent requests allowed to the upstream
+    rate_per_sec     sustained request rate (token bucket)
+    burst            bucket size (defaults to rate_per_sec)
+    max_wait_ms      how long a caller may queue before failing
+    adaptive         honour Retry-After and back off the rate on 429/503
+
+Callers queue for a slot instead of bursting into the upstream; only when
+the wait would exceed max_wait_ms does the call fail.
+
+Limiter state is per event loop (asyncio primitives cannot be shared across
+loops), so limits hold across requests only on a shared loop (ASGI,
+run_workers; see lifespan.py). Under WSGI each request runs on its own loop
+and gets a fresh limiter; serve through ASGI when limits matter.
+"""
+import asyncio
+import email.utils
+import json
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+from .conf import hub_setting
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations: reserve() returns how long the
+    caller must wait for its token, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now):
+        wait = self.delay(now)
+        self.tokens -= 1
+        return wait
+
+
+class ProfileLimiter:
+    """
+    Semaphore, token bucket and throttle state for one profile on one loop.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.semaphore = asyncio.Semaphore(options['max_concurrency']) if options['max_concurrency'] else None
+        self.bucket = TokenBucket(options['rate_per_sec'], options['burst']) if options['rate_per_sec'] else None
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.options['max_wait']
+        self.waiting += 1
+        try:
+            # Upstream asked us to back off (Retry-After)
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                if time.monotonic() + pause > deadline:
+                    raise asyncio.TimeoutError()
+                await asyncio.sleep(pause)
+
+            if self.bucket is not None:
+                now = time.monotonic()
+                if now + self.bucket.delay(now) > deadline:
+                    raise asyncio.TimeoutError()
+                wait = self.bucket.reserve(now)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            if self.semaphore is not None:
+                await asyncio.wait_for(self.semaphore.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.in_flight += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    async def try_acquire(self):
+        """
+        Takes a slot only if one is free right now (no pause, token and
+        concurrency available). Returns False instead of queueing.
+        """
+        now = time.monotonic()
+        if self.paused_until > now:
+            return False
+        if self.semaphore is not None and self.semaphore.locked():
+            return False
+        if self.bucket is not None:
+            if self.bucket.delay(now) > 0:
+                return False
+            self.bucket.reserve(now)
+        if self.semaphore is not None:
+            # Not locked, so this returns without suspending
+            await self.semaphore.acquire()
+        self.acquired += 1
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+    def observe(self, status_code, retry_after=None):
+        """
+        Adapts to upstream throttling: pause for Retry-After and halve the
+        rate on 429/503, then recover gradually on successful responses.
+        """
+        if not self.options['adaptive']:
+            return
+        if status_code in THROTTLE_STATUSES:
+            self.throttled += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            if self.bucket is not None:
+                self.bucket.rate = max(self.bucket.rate / 2, self.options['rate_per_sec'] / 20)
+        elif self.bucket is not None and self.bucket.rate < self.options['rate_per_sec']:
+            self.bucket.rate = min(self.options['rate_per_sec'], self.bucket.rate + self.options['rate_per_sec'] * 0.05)
+
+    def stats(self):
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "throttled": self.throttled,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "rate_per_sec": self.bucket.rate if self.bucket is not None else None,
+        }
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header (delta-seconds or HTTP-date) into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class UpstreamLimiter:
+    """
+    Registry of ProfileLimiters, keyed by event loop and profile id.
+    """
+    _limiters = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def options_for(profile):
+        """
+        Returns normalised limit options for a profile, or None if unlimited.
+        """
+        options = (getattr(profile, 'options', None) or {}).get('limits') or {}
+        max_concurrency = options.get('max_concurrency', hub_setting('UPSTREAM_MAX_CONCURRENCY'))
+        rate = options.get('rate_per_sec')
+        if not max_concurrency and not rate:
+            return None
+        return {
+            'max_concurrency': int(max_concurrency or 0),
+            'rate_per_sec': float(rate or 0),
+            'burst': float(options.get('burst') or rate or 1),
+            'max_wait': options.get('max_wait_ms', hub_setting('UPSTREAM_MAX_WAIT_MS')) / 1000.0,
+            'adaptive': options.get('adaptive', True),
+        }
+
+    @classmethod
+    def _limiter_for(cls, profile, options):
+        loop = asyncio.get_running_loop()
+        fingerprint = json.dumps(options, sort_keys=True)
+        with cls._lock:
+            limiters = cls._limiters.get(loop)
+            if limiters is None:
+                limiters = cls._limiters[loop] = {}
+            entry = limiters.get(profile.pk)
+            if entry is None or entry[0] != fingerprint:
+                entry = limiters[profile.pk] = (fingerprint, ProfileLimiter(options))
+        return entry[1]
+
+    @classmethod
+    @asynccontextmanager
+    async def slot(cls, profile):
+        """
+        Holds one upstream slot for the profile while the block runs. Yields
+        an observe(response) callback used to adapt to throttling responses.
+        """
+        options = cls.options_for(profile)
+        if options is None:
+            yield _ignore_response
+            return
+
+        limiter = cls._limiter_for(profile, options)
+        try:
+            await limiter.acquire()
+        except asyncio.TimeoutError:
+            raise ValueError(
+                f"Upstream queue timeout: profile '{profile.name}' is at its concurrency/rate limit"
+            ) from None
+
+        def observe(response):
+            limiter.observe(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+
+        try:
+            yield observe
+        finally:
+            limiter.release()
+
+    @classmethod
+    async def try_acquire(cls, profile):
+        """
+        Takes a slot for an optional extra request (a hedge) without
+        queueing. Returns the release callback, or None when the profile is
+        at its limit.
+        """
+        options = cls.options_for(profile)
+        if options is None:
+            return _release_nothing
+        limiter = cls._limiter_for(profile, options)
+        if not await limiter.try_acquire():
+            return None
+        return limiter.release
+
+    @classmethod
+    def stats(cls):
+        stats = {}
+        for limiters in list(cls._limiters.values()):
+            for profile_id, (_, limiter) in list(limiters.items()):
+                stats[str(profile_id)] = limiter.stats()
+        return stats
+
+
+def _ignore_response(response):
+    pass
+
+
+def _release_nothing():
+    pass
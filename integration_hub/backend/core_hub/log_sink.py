@@ -0,0 +1,222 @@
+"""
+Write-behind persistence for ExecutionLog rows.
+
+Execute views hand their log entries to ExecutionLogSink instead of awaiting
+an INSERT. Entries are buffered in memory and written by a background thread
+with bulk_create, whenever LOG_FLUSH_BATCH_SIZE entries are waiting or every
+LOG_FLUSH_INTERVAL seconds. The buffer is bounded by entry count
+(LOG_BUFFER_MAX_ENTRIES) and by the approximate size of the payloads it holds
+(LOG_BUFFER_MAX_BYTES), since batch and stream entries carry whole record
+lists; when it is full, LOG_BACKPRESSURE decides between writing inline
+('sync') and dropping the entry ('drop'). A batch that fails to write is
+retried once before being counted as lost. Pending entries are flushed on
+shutdown. After each flush the background thread also refreshes the
+execution stats rollups (rate-limited, see stats.py).
+
+Payloads are not stored inline: the writer encodes them into compressed,
+content-addressed PayloadBlob rows (capped per template by
+MappingTemplate.log_payload_limit or LOG_PAYLOAD_MAX_BYTES), so the encoding
+cost is paid off the event loop.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .conf import hub_setting
+from .lifespan import on_shutdown
+from .models import ExecutionLog, PayloadBlob
+from .stats import ExecutionStats
+
+logger = logging.getLogger(__name__)
+
+# Records encoded to estimate a list payload
+SIZE_SAMPLE = 8
+
+
+def approx_size(payload):
+    """
+    Approximate JSON size of a payload. Lists are estimated from a few
+    evenly spaced records, so the cost stays flat for large batches.
+    """
+    if payload is None:
+        return 0
+    try:
+        if isinstance(payload, list) and len(payload) > SIZE_SAMPLE:
+            step = len(payload) // SIZE_SAMPLE
+            sample = payload[::step][:SIZE_SAMPLE]
+            return len(json.dumps(sample, default=str)) * len(payload) // len(sample)
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ExecutionLogSink:
+    """
+    Bounded in-memory buffer of ExecutionLog instances with a flusher thread.
+    """
+    _buffer = deque()
+    _buffered_bytes = 0
+    _condition = threading.Condition()
+    _flush_lock = threading.Lock()
+    _thread = None
+    _pid = None
+    written = 0
+    dropped = 0
+    failed = 0
+
+    @classmethod
+    async def record(cls, **fields):
+        """
+        Records one execution log. Returns once the entry is buffered (or
+        written, when buffering is off or the entry must be synchronous).
+        """
+        if 'timestamp' not in fields:
+            fields['timestamp'] = timezone.now()
+        payloads = (fields.pop('input_data', None), fields.pop('output_data', None))
+
+        entry = ExecutionLog(**fields)
+        entry._pending_payloads = payloads
+        entry._approx_bytes = sum(approx_size(payload) for payload in payloads)
+
+        if not hub_setting('LOG_BUFFER_ENABLED') or (
+            fields.get('status') == 'ERROR' and hub_setting('LOG_SYNC_ERRORS')
+        ):
+            await sync_to_async(cls._write)([entry])
+            return
+
+        if cls._enqueue(entry):
+            return
+
+        if hub_setting('LOG_BACKPRESSURE') == 'drop':
+            cls.dropped += 1
+            logger.warning(f"Execution log buffer full; dropped log for template {entry.template_id}")
+            return
+        await sync_to_async(cls._write)([entry])
+
+    @staticmethod
+    def _payload_limit(entry):
+        template = entry.template if entry.template_id else None
+        if template is not None and template.log_payload_limit is not None:
+            return template.log_payload_limit
+        return hub_setting('LOG_PAYLOAD_MAX_BYTES')
+
+    @classmethod
+    def _write(cls, entries):
+        """
+        Stores the entries' payload blobs (deduplicated) and then the entries,
+        with the payload sizes filled in.
+        """
+        blobs = {}
+        for entry in entries:
+            input_data, output_data = getattr(entry, '_pending_payloads', (None, None))
+            limit = cls._payload_limit(entry)
+            if input_data is not None:
+                blob = PayloadBlob.from_payload(input_data, limit)
+                blobs[blob.digest] = blob
+                entry.input_blob_id = blob.digest
+                entry.input_size = blob.payload_size
+            if output_data is not None:
+                blob = PayloadBlob.from_payload(output_data, limit)
+                blobs[blob.digest] = blob
+                entry.output_blob_id = blob.digest
+                entry.output_size = blob.payload_size
+
+        if blobs:
+            PayloadBlob.objects.bulk_create(blobs.values(), ignore_conflicts=True)
+        ExecutionLog.objects.bulk_create(entries, batch_size=hub_setting('LOG_FLUSH_BATCH_SIZE'))
+
+    @classmethod
+    def _enqueue(cls, entry):
+        with cls._condition:
+            if len(cls._buffer) >= hub_setting('LOG_BUFFER_MAX_ENTRIES'):
+                return False
+            max_bytes = hub_setting('LOG_BUFFER_MAX_BYTES')
+            # An oversized entry still gets in when the buffer is empty
+            if max_bytes and cls._buffer and cls._buffered_bytes + entry._approx_bytes > max_bytes:
+                return False
+            cls._ensure_thread()
+            cls._buffer.append(entry)
+            cls._buffered_bytes += entry._approx_bytes
+            if len(cls._buffer) >= hub_setting('LOG_FLUSH_BATCH_SIZE'):
+                cls._condition.notify()
+        return True
+
+    @classmethod
+    def _ensure_thread(cls):
+        # Restart after fork: threads do not survive into child workers
+        if cls._thread is None or not cls._thread.is_alive() or cls._pid != os.getpid():
+            cls._pid = os.getpid()
+            cls._thread = threading.Thread(target=cls._run, name='execution-log-sink', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            with cls._condition:
+                if len(cls._buffer) < hub_setting('LOG_FLUSH_BATCH_SIZE'):
+                    cls._condition.wait(timeout=hub_setting('LOG_FLUSH_INTERVAL'))
+            cls.flush()
+            try:
+                ExecutionStats.refresh()
+            except Exception as e:
+                logger.warning(f"Execution stats refresh failed: {e}")
+
+    @classmethod
+    def _take(cls, limit):
+        with cls._condition:
+            count = min(limit, len(cls._buffer))
+            batch = [cls._buffer.popleft() for _ in range(count)]
+            cls._buffered_bytes -= sum(entry._approx_bytes for entry in batch)
+            return batch
+
+    @classmethod
+    def flush(cls):
+        """
+        Writes every buffered entry. Safe to call from any thread.
+        """
+        batch_size = hub_setting('LOG_FLUSH_BATCH_SIZE')
+        with cls._flush_lock:
+            close_old_connections()
+            while True:
+                batch = cls._take(batch_size)
+                if not batch:
+                    break
+                try:
+                    cls._write(batch)
+                except Exception as e:
+                    logger.warning(f"Failed to write {len(batch)} buffered execution logs, retrying: {e}")
+                    # A dropped connection is the usual cause
+                    close_old_connections()
+                    try:
+                        cls._write(batch)
+                    except Exception as e:
+                        cls.failed += len(batch)
+                        logger.error(f"Lost {len(batch)} buffered execution logs after a retry: {e}", exc_info=True)
+                        continue
+                cls.written += len(batch)
+
+    @classmethod
+    async def aflush(cls):
+        await asyncio.to_thread(cls.flush)
+
+    @classmethod
+    def stats(cls):
+        return {
+            "pending": len(cls._buffer),
+            "pending_bytes": cls._buffered_bytes,
+            "written": cls.written,
+            "dropped": cls.dropped,
+            "failed": cls.failed,
+        }
+
+
+on_shutdown(ExecutionLogSink.aflush)
+atexit.register(ExecutionLogSink.flush)
@@ -0,0 +1,124 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from core_hub import benchmarks
+import asyncio
+import json
+import logging
+import os
+import tempfile
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the mapping engine and execute pipeline, optionally against a saved baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suite', action='append', choices=benchmarks.SUITES,
+                            help='Suite to run (repeatable); all suites by default')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='Compare with a saved results file; fails on regressions')
+        parser.add_argument('--threshold', type=float, default=0.10,
+                            help='Relative change counted as a regression (default 0.10)')
+        parser.add_argument('--quick', action='store_true',
+                            help='Smaller inputs and fewer repeats, for smoke runs')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests sent by the pipeline suite')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='Concurrent requests in the pipeline suite')
+        parser.add_argument('--upstream-latency-ms', type=float, default=0.0,
+                            help='Simulated latency of the stand-in Source/Target')
+
+    def handle(self, *args, **options):
+        suites = options['suite'] or list(benchmarks.SUITES)
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], 'r', encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+
+        scale, repeat = (0.1, 3) if options['quick'] else (1.0, 5)
+        requests = max(20, options['requests'] // 5) if options['quick'] else options['requests']
+
+        # Per-request INFO logs would dominate the timings and the output
+        logging.disable(logging.INFO)
+        try:
+            metrics = {}
+            if 'engine' in suites:
+                self.stdout.write("Running engine suite...")
+                metrics.update(benchmarks.run_engine(scale, repeat))
+            if 'paths' in suites:
+                self.stdout.write("Running paths suite...")
+                metrics.update(benchmarks.run_paths(scale, repeat))
+            if 'pipeline' in suites or 'logs' in suites:
+                metrics.update(self.run_database_suites(suites, options, requests, repeat))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        results = {"environment": benchmarks.environment(), "metrics": metrics}
+        self.print_results(metrics)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if baseline is not None:
+            self.compare(baseline, metrics, options['threshold'], suites)
+
+    def run_database_suites(self, suites, options, requests, repeat):
+        """
+        Runs the suites that write to the database against a throwaway
+        test database (a temporary file on SQLite).
+        """
+        metrics = {}
+        setup_test_environment()
+        settings_dict = connection.settings_dict
+        old_test_name = settings_dict['TEST'].get('NAME')
+        if connection.vendor == 'sqlite':
+            settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            template = benchmarks.create_pipeline_template()
+            if 'pipeline' in suites:
+                self.stdout.write(f"Running pipeline suite ({requests} requests, concurrency {options['concurrency']})...")
+                metrics.update(asyncio.run(benchmarks.run_pipeline(
+                    template, requests, options['concurrency'], options['upstream_latency_ms']
+                )))
+            if 'logs' in suites:
+                self.stdout.write("Running logs suite...")
+                metrics.update(benchmarks.run_logs(template, rows=max(50, requests // 2), repeat=repeat))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            settings_dict['TEST']['NAME'] = old_test_name
+            teardown_test_environment()
+        return metrics
+
+    def print_results(self, metrics):
+        width = max(len(name) for name in metrics) if metrics else 0
+        for name, result in metrics.items():
+            self.stdout.write(f"  {name:<{width}}  {result['value']:>12.3f} {result['unit']}")
+
+    def compare(self, baseline, metrics, threshold, suites):
+        rows = benchmarks.compare(baseline.get('metrics', {}), metrics, threshold, suites)
+        revision = baseline.get('environment', {}).get('git_revision') or 'unknown revision'
+        self.stdout.write(f"\nCompared with baseline ({revision}), threshold {threshold:.0%}:")
+        width = max(len(row[0]) for row in rows) if rows else 0
+        regressions = 0
+        for name, before, after, change, verdict in rows:
+            before_text = f"{before['value']:.3f}" if before else '-'
+            after_text = f"{after['value']:.3f}" if after else '-'
+            change_text = f"{change:+.1%}" if change is not None else ''
+            line = f"  {name:<{width}}  {before_text:>12} -> {after_text:>12}  {change_text:>8}  {verdict}"
+            if verdict == 'regressed':
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            elif verdict == 'improved':
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{regressions} metric(s) regressed beyond {threshold:.0%}")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
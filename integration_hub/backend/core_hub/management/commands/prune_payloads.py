@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from core_hub.models import PayloadBlob
+
+
+class Command(BaseCommand):
+    help = 'Deletes PayloadBlobs no longer referenced by any ExecutionLog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Only delete blobs created at least this many hours ago')
+
+    def handle(self, *args, **options):
+        deleted = PayloadBlob.delete_unreferenced(timedelta(hours=options['min_age']))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced payload blobs"))
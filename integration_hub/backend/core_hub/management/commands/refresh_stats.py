@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core_hub.stats import ExecutionStats
+
+
+class Command(BaseCommand):
+    help = 'Folds new ExecutionLogs into the per-template stats rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop the rollups and refold the whole log table (e.g. after upgrading)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            folded = ExecutionStats.rebuild()
+        else:
+            folded = ExecutionStats.refresh(force=True)
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} execution logs into the stats rollups"))
@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand
+from asgiref.sync import sync_to_async
+from core_hub.conf import hub_setting
+from core_hub.jobs import JobQueue
+from core_hub.lifespan import mark_persistent_loop, run_shutdown_hooks
+from core_hub.metrics import StageTimer
+from core_hub.models import MappingTemplate
+from core_hub.pipeline import execute_template
+from core_hub.resilience import PermanentError
+from core_hub.template_cache import TemplateCache
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Runs async workers that execute queued ExecutionJobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=hub_setting('JOB_WORKER_CONCURRENCY'),
+                            help='Number of jobs executed concurrently by this process')
+        parser.add_argument('--poll-interval', type=float, default=hub_setting('JOB_POLL_INTERVAL'),
+                            help='Seconds an idle worker waits before polling the queue again')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['concurrency'], options['poll_interval'], options['burst']))
+
+    async def run(self, concurrency, poll_interval, burst):
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Pooled clients and batches live as long as the workers
+        mark_persistent_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Starting {concurrency} worker(s) ({prefix})")
+        await asyncio.gather(*[
+            self.worker(f"{prefix}:{n}", poll_interval, burst) for n in range(concurrency)
+        ])
+
+        # Flush buffered logs and batches, close pooled clients
+        await run_shutdown_hooks()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
+
+    def stop(self):
+        if not self.stopping.is_set():
+            self.stdout.write("Stopping after the jobs in progress...")
+            self.stopping.set()
+
+    async def worker(self, worker_id, poll_interval, burst):
+        while not self.stopping.is_set():
+            try:
+                job = await sync_to_async(JobQueue.claim)(worker_id)
+            except Exception as e:
+                # e.g. database briefly unavailable or locked: back off and poll again
+                logger.error(f"Worker {worker_id} failed to claim a job: {e}", exc_info=True)
+                job = None
+            if job is None:
+                if burst:
+                    return
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                # The job's lease expires and another worker picks it up again
+                logger.error(f"Worker {worker_id} failed to settle job {job.pk}: {e}", exc_info=True)
+
+    async def run_job(self, job):
+        timer = StageTimer()
+        heartbeat = asyncio.ensure_future(self.heartbeat(job))
+        try:
+            with timer.stage('template'):
+                template = await TemplateCache.aget(job.template_id)
+            result = await execute_template(template, job.payload, timer)
+        except MappingTemplate.DoesNotExist:
+            await sync_to_async(JobQueue.fail)(job, "Template not found", retryable=False)
+        except PermanentError as e:
+            await sync_to_async(JobQueue.fail)(job, str(e), retryable=False)
+        except Exception as e:
+            await sync_to_async(JobQueue.fail)(job, str(e))
+        else:
+            await sync_to_async(JobQueue.complete)(job, result)
+        finally:
+            heartbeat.cancel()
+
+    async def heartbeat(self, job):
+        """
+        Renews the job's lease while it runs, so long executions are not
+        reclaimed by another worker.
+        """
+        interval = hub_setting('JOB_LEASE_SECONDS') / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await sync_to_async(JobQueue.renew)(job)
+            except Exception as e:
+                logger.warning(f"Failed to renew the lease of job {job.pk}: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Job {job.pk} lost its lease; another worker may run it again")
+                return
@@ -32,7 +32,8 @@ class Command(BaseCommand):
                 'type': adapter.get('type', 'SOURCE'),
                 'api_url': adapter.get('api_url'),
                 'auth_config': adapter.get('auth', {}),
-                'schema': adapter.get('schema', {})
+                'schema': adapter.get('schema', {}),
+                'options': adapter.get('options', {})
             }
 
             # Update or Create
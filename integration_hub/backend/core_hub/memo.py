@@ -0,0 +1,102 @@
+"""
+Per-worker memo of pure transform results.
+
+Columns such as uf, municipio or situacao_cadastral repeat a handful of
+values across a batch. A compiled transform whose stages are all pure
+(marked with @pure in engine.py), with at least one marked @expensive (e.g.
+DATE_FORMAT), is therefore evaluated once per distinct value and served from
+a bounded LRU afterwards.
+
+Each memoized transform has its own LRU of TRANSFORM_MEMO_SIZE entries, so a
+high-cardinality column (e.g. cnpj) cannot evict the entries of the columns
+that do repeat. Once such a memo is full and its hit rate stays below
+_MIN_HIT_RATE, it is dropped and the transform runs directly.
+
+Keys are typed, so 1, 1.0 and True stay apart; unhashable values (lists,
+dicts) bypass the memo. Each process keeps its own memos, including the
+offload pool processes.
+"""
+import functools
+import threading
+import weakref
+
+from .conf import hub_setting
+
+# A full memo is re-evaluated every _CHECK_EVERY lookups
+_CHECK_EVERY = 1024
+_MIN_HIT_RATE = 0.5
+
+
+class TransformMemo:
+    """
+    Wraps pure transforms in bounded functools.lru_cache memos.
+    """
+    _memos = weakref.WeakSet()
+    _lock = threading.Lock()
+    bypassed = 0
+    disabled = 0
+
+    @classmethod
+    def wrap(cls, transform):
+        """
+        Returns transform memoized by value, or unchanged when the memo is
+        disabled (TRANSFORM_MEMO_SIZE = 0).
+        """
+        size = hub_setting('TRANSFORM_MEMO_SIZE')
+        if not size:
+            return transform
+        cached = functools.lru_cache(maxsize=size, typed=True)(transform)
+        with cls._lock:
+            cls._memos.add(cached)
+        state = {"enabled": True, "calls": 0}
+
+        def memoized(value):
+            if not state["enabled"]:
+                return transform(value)
+            state["calls"] += 1
+            if not state["calls"] % _CHECK_EVERY:
+                cls._review(cached, state)
+            try:
+                return cached(value)
+            except TypeError:
+                # Unhashable value; transforms themselves never raise
+                cls.bypassed += 1
+                return transform(value)
+
+        return memoized
+
+    @classmethod
+    def _review(cls, cached, state):
+        info = cached.cache_info()
+        if info.currsize < info.maxsize:
+            return
+        if info.hits < (info.hits + info.misses) * _MIN_HIT_RATE:
+            state["enabled"] = False
+            cached.cache_clear()
+            with cls._lock:
+                cls._memos.discard(cached)
+            cls.disabled += 1
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            for cached in cls._memos:
+                cached.cache_clear()
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            infos = [cached.cache_info() for cached in cls._memos]
+        hits = sum(info.hits for info in infos)
+        misses = sum(info.misses for info in infos)
+        lookups = hits + misses
+        return {
+            "max_size": hub_setting('TRANSFORM_MEMO_SIZE'),
+            "memos": len(infos),
+            "entries": sum(info.currsize for info in infos),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "bypassed": cls.bypassed,
+            "disabled": cls.disabled,
+        }
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0004_alter_mappingtemplate_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integrationprofile',
+            name='options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
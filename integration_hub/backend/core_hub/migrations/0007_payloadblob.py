@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 04:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0006_alter_executionlog_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayloadBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('truncated', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mappingtemplate',
+            name='log_payload_limit',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='input_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core_hub.payloadblob'),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='output_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core_hub.payloadblob'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0007_payloadblob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='executionlog',
+            index=models.Index(fields=['timestamp'], name='log_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='executionlog',
+            index=models.Index(fields=['template', 'timestamp'], name='log_template_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='executionlog',
+            index=models.Index(fields=['status', 'timestamp'], name='log_status_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='executionlog',
+            index=models.Index(fields=['is_test'], name='log_is_test_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-18 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0009_executionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='duration_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='fetch_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='input_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='output_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='send_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='executionlog',
+            name='transform_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ExecutionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateTimeField()),
+                ('latency_bucket', models.SmallIntegerField()),
+                ('executions', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('duration_ms_sum', models.FloatField(default=0)),
+                ('fetch_ms_sum', models.FloatField(default=0)),
+                ('transform_ms_sum', models.FloatField(default=0)),
+                ('send_ms_sum', models.FloatField(default=0)),
+                ('input_bytes_sum', models.BigIntegerField(default=0)),
+                ('output_bytes_sum', models.BigIntegerField(default=0)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='core_hub.mappingtemplate')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period'], name='rollup_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('template', 'period', 'latency_bucket'), name='rollup_unique_bucket')],
+            },
+        ),
+    ]
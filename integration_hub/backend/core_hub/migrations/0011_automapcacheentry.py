@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0010_executionlog_durations_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutoMapCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('prompt_version', models.PositiveIntegerField()),
+                ('suggestions', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='automap_last_used_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 05:05
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def folded_until_from_log_id(apps, schema_editor):
+    # The id watermark becomes the newest timestamp it covered
+    RollupWatermark = apps.get_model('core_hub', 'RollupWatermark')
+    ExecutionLog = apps.get_model('core_hub', 'ExecutionLog')
+    for watermark in RollupWatermark.objects.filter(last_log_id__gt=0):
+        watermark.folded_until = ExecutionLog.objects.filter(
+            id__lte=watermark.last_log_id
+        ).aggregate(folded_until=Max('timestamp'))['folded_until']
+        watermark.save(update_fields=['folded_until'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0011_automapcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='folded_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(folded_until_from_log_id, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='rollupwatermark',
+            name='last_log_id',
+        ),
+    ]
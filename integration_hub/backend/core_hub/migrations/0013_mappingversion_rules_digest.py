@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 05:13
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def digest_existing_rules(apps, schema_editor):
+    MappingVersion = apps.get_model('core_hub', 'MappingVersion')
+    versions = list(MappingVersion.objects.only('id', 'rules'))
+    for version in versions:
+        raw = json.dumps(version.rules, sort_keys=True, default=str)
+        version.rules_digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    MappingVersion.objects.bulk_update(versions, ['rules_digest'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_hub', '0012_rollupwatermark_folded_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mappingversion',
+            name='rules_digest',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.RunPython(digest_existing_rules, migrations.RunPython.noop),
+    ]
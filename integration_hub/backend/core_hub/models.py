@@ -1,5 +1,9 @@
 from django.db import models
+from django.utils import timezone
+import hashlib
+import json
 import uuid
+import zlib
 
 class IntegrationProfile(models.Model):
     TYPE_CHOICES = [
@@ -12,18 +16,25 @@ class IntegrationProfile(models.Model):
     api_url = models.URLField(blank=True, null=True)
     auth_config = models.JSONField(default=dict, blank=True) # For tokens/secrets (Encrypt in production!)
     schema = models.JSONField(default=dict, blank=True) # Defines expected fields
+    options = models.JSONField(default=dict, blank=True) # Runtime tuning (HTTP pool, caching, limits...)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
 
+    def save(self, *args, **kwargs):
+        # Digests memoized by http_clients.py describe the old values
+        self.__dict__.pop('_digests', None)
+        super().save(*args, **kwargs)
+
 class MappingTemplate(models.Model):
     name = models.CharField(max_length=255)
     source = models.ForeignKey(IntegrationProfile, on_delete=models.CASCADE, related_name='source_templates')
     target = models.ForeignKey(IntegrationProfile, on_delete=models.CASCADE, related_name='target_templates')
     description = models.TextField(blank=True)
     active_version = models.ForeignKey('MappingVersion', on_delete=models.SET_NULL, null=True, blank=True, related_name='active_for_template')
+    log_payload_limit = models.PositiveIntegerField(null=True, blank=True) # Max bytes stored per logged payload (None = global default)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -38,6 +49,7 @@ class MappingVersion(models.Model):
     template = models.ForeignKey(MappingTemplate, on_delete=models.CASCADE, related_name='versions')
     version_number = models.PositiveIntegerField()
     rules = models.JSONField(default=list) # List of rules frozen at this version: [{ "source": "path", "target": "field", "transform": "func" }]
+    rules_digest = models.CharField(max_length=40, blank=True, editable=False) # SHA-1 of the rules, set on save
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -47,6 +59,83 @@ class MappingVersion(models.Model):
     def __str__(self):
         return f"{self.template.name} - v{self.version_number}"
 
+    @staticmethod
+    def digest_rules(rules):
+        raw = json.dumps(rules, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        # Hashed once here so executions key their cached plan without
+        # re-encoding the rules
+        self.rules_digest = self.digest_rules(self.rules)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'rules' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'rules_digest'}
+        super().save(*args, **kwargs)
+
+class PayloadBlob(models.Model):
+    """
+    Compressed JSON payload, content-addressed by the SHA-256 of its
+    canonical encoding so identical payloads are stored once.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField() # zlib-compressed canonical JSON
+    size = models.PositiveIntegerField() # Uncompressed size in bytes
+    truncated = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def from_payload(cls, payload, max_bytes=None):
+        """
+        Builds an unsaved blob for a payload. Payloads larger than max_bytes
+        are replaced by a truncation marker holding a prefix of the JSON.
+        """
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        payload_size = len(raw)
+        truncated = bool(max_bytes) and len(raw) > max_bytes
+        if truncated:
+            marker = {
+                "_truncated": True,
+                "original_size": len(raw),
+                "preview": raw[:max_bytes].decode('utf-8', errors='ignore'),
+            }
+            raw = json.dumps(marker, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        blob = cls(
+            digest=hashlib.sha256(raw).hexdigest(),
+            data=zlib.compress(raw, 6),
+            size=len(raw),
+            truncated=truncated,
+        )
+        blob.payload_size = payload_size # Before truncation, not stored
+        return blob
+
+    def load(self):
+        return json.loads(zlib.decompress(bytes(self.data)))
+
+    @classmethod
+    def delete_unreferenced(cls, min_age, batch_size=1000):
+        """
+        Deletes blobs older than min_age that no ExecutionLog references
+        (left behind when logs are deleted). The age floor spares blobs whose
+        logs are still being written; returns the number deleted.
+        """
+        orphans = cls.objects.filter(created_at__lt=timezone.now() - min_age).exclude(
+            digest__in=ExecutionLog.objects.filter(input_blob__isnull=False).values('input_blob')
+        ).exclude(
+            digest__in=ExecutionLog.objects.filter(output_blob__isnull=False).values('output_blob')
+        )
+        deleted = 0
+        while True:
+            digests = list(orphans.values_list('digest', flat=True)[:batch_size])
+            if not digests:
+                return deleted
+            # Rechecked in the DELETE itself, in case a log picked one up meanwhile
+            count, _ = orphans.filter(digest__in=digests).delete()
+            deleted += count
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes)"
+
 class ExecutionLog(models.Model):
     STATUS_CHOICES = [
         ('SUCCESS', 'Success'),
@@ -55,15 +144,134 @@ class ExecutionLog(models.Model):
 
     template = models.ForeignKey(MappingTemplate, on_delete=models.SET_NULL, null=True)
     version = models.ForeignKey(MappingVersion, on_delete=models.SET_NULL, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False) # Set at enqueue time, logs may be written later in bulk
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
-    input_data = models.JSONField(blank=True, null=True)
+    input_data = models.JSONField(blank=True, null=True) # Legacy inline payloads, new rows use the blobs
     output_data = models.JSONField(blank=True, null=True)
+    input_blob = models.ForeignKey(PayloadBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    output_blob = models.ForeignKey(PayloadBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     error_message = models.TextField(blank=True, null=True)
     is_test = models.BooleanField(default=False)
+    # Stage durations in milliseconds (see metrics.StageTimer); null on older rows
+    duration_ms = models.FloatField(blank=True, null=True)
+    fetch_ms = models.FloatField(blank=True, null=True)
+    transform_ms = models.FloatField(blank=True, null=True)
+    send_ms = models.FloatField(blank=True, null=True)
+    # Payload sizes in bytes of canonical JSON, before any truncation
+    input_size = models.PositiveIntegerField(blank=True, null=True)
+    output_size = models.PositiveIntegerField(blank=True, null=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='log_timestamp_idx'),
+            models.Index(fields=['template', 'timestamp'], name='log_template_timestamp_idx'),
+            models.Index(fields=['status', 'timestamp'], name='log_status_timestamp_idx'),
+            models.Index(fields=['is_test'], name='log_is_test_idx'),
+        ]
+
+    def get_input_data(self):
+        return self.input_blob.load() if self.input_blob_id else self.input_data
+
+    def get_output_data(self):
+        return self.output_blob.load() if self.output_blob_id else self.output_data
 
     def __str__(self):
         return f"{self.timestamp} - {self.status}"
+
+class ExecutionJob(models.Model):
+    """
+    A queued background execution, claimed and run by `manage.py run_workers`.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('SUCCESS', 'Success'),
+        ('ERROR', 'Error'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    template = models.ForeignKey(MappingTemplate, on_delete=models.CASCADE, related_name='jobs')
+    payload = models.JSONField(default=dict, blank=True) # Request body, as sent to the execute endpoint
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    result = models.JSONField(blank=True, null=True)
+    error_message = models.TextField(blank=True, null=True)
+    available_at = models.DateTimeField(default=timezone.now) # Not claimed before this (retry backoff)
+    locked_by = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True) # RUNNING jobs past this are reclaimed
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='job_status_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.status}"
+
+
+class ExecutionRollup(models.Model):
+    """
+    Per-minute aggregate of ExecutionLogs for one template and latency bucket,
+    maintained incrementally by stats.ExecutionStats.refresh().
+    """
+    template = models.ForeignKey(MappingTemplate, on_delete=models.CASCADE, related_name='rollups')
+    period = models.DateTimeField() # Start of the minute
+    latency_bucket = models.SmallIntegerField() # Index into stats.LATENCY_BUCKETS_MS, -1 when untimed
+    executions = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    duration_ms_sum = models.FloatField(default=0)
+    fetch_ms_sum = models.FloatField(default=0)
+    transform_ms_sum = models.FloatField(default=0)
+    send_ms_sum = models.FloatField(default=0)
+    input_bytes_sum = models.BigIntegerField(default=0)
+    output_bytes_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['template', 'period', 'latency_bucket'], name='rollup_unique_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['period'], name='rollup_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.template_id} @ {self.period} [{self.latency_bucket}]"
+
+
+class RollupWatermark(models.Model):
+    """
+    ExecutionLogs timestamped up to folded_until are in the rollups.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    folded_until = models.DateTimeField(blank=True, null=True)
+    refreshed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.folded_until}"
+
+
+class AutoMapCacheEntry(models.Model):
+    """
+    Cached auto-mapping suggestions, keyed by the SHA-256 of the sorted
+    source/target fields and the prompt version (see automap.AutoMapCache).
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    prompt_version = models.PositiveIntegerField()
+    suggestions = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at'], name='automap_last_used_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key[:12]} (v{self.prompt_version}, {self.hits} hits)"
@@ -0,0 +1,159 @@
+"""
+Process-pool offload for large mapping batches.
+
+Mapping runs on the event loop, which is fine for small inputs but stalls
+every other request on the worker while a large batch is transformed.
+Batches of at least OFFLOAD_MIN_RECORDS records are split into chunks of
+OFFLOAD_CHUNK_RECORDS and mapped in a ProcessPoolExecutor instead.
+
+Rules are not resent with every chunk: the first batch of a version ships
+them along, later chunks only reference the plan by version key, and a pool
+process that has not compiled that plan yet answers PlanNotLoaded, after
+which the chunk is resent together with the rules.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .compiler import RuleCompiler, version_key
+from .conf import hub_setting
+from .lifespan import on_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Compiled plans cached inside each pool process
+_WORKER_PLAN_CACHE_SIZE = 64
+_worker_plans = OrderedDict()
+
+
+class PlanNotLoaded(Exception):
+    """Raised in a pool process asked to run a plan it has not compiled."""
+
+
+class RecordMappingError(Exception):
+    """Returned, not raised, in place of a record that failed to map."""
+
+
+def map_each(plan, records):
+    """
+    Maps records one at a time, so one bad record does not fail the others.
+    """
+    results = []
+    for record in records:
+        try:
+            results.append(plan.apply(record))
+        except Exception as e:
+            results.append(RecordMappingError(str(e)))
+    return results
+
+
+def _map_chunk(version_key, rules, records):
+    """
+    Pool-side entry point: maps records with the plan for version_key,
+    compiling it from rules when they are sent along.
+    """
+    plan = _worker_plans.get(version_key)
+    if plan is None:
+        if rules is None:
+            raise PlanNotLoaded(version_key)
+        plan = _worker_plans[version_key] = RuleCompiler.compile(rules)
+        while len(_worker_plans) > _WORKER_PLAN_CACHE_SIZE:
+            _worker_plans.popitem(last=False)
+    else:
+        _worker_plans.move_to_end(version_key)
+    return map_each(plan, records)
+
+
+class MappingOffloader:
+    """
+    Maps record lists inline or in the shared process pool, by size.
+    """
+    _executor = None
+    _shipped_keys = set()
+    _lock = threading.Lock()
+    offloaded_batches = 0
+    offloaded_records = 0
+    plans_shipped = 0
+
+    @staticmethod
+    def should_offload(count):
+        return hub_setting('OFFLOAD_ENABLED') and count >= hub_setting('OFFLOAD_MIN_RECORDS')
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                # spawn: forking a process that runs threads (log flusher,
+                # event loop) is unsafe
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=hub_setting('OFFLOAD_MAX_WORKERS'),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return cls._executor
+
+    @classmethod
+    async def map_records(cls, version, plan, records):
+        """
+        Maps every record with plan (ASYNC), preserving order. Records that
+        fail to map come back as RecordMappingError.
+        """
+        if not cls.should_offload(len(records)):
+            return map_each(plan, records)
+
+        key = version_key(version)
+        size = hub_setting('OFFLOAD_CHUNK_RECORDS')
+        chunks = [records[start:start + size] for start in range(0, len(records), size)]
+        # First batch of a version: ship the rules with every chunk rather
+        # than letting each pool process miss and retry
+        with cls._lock:
+            first_use = key not in cls._shipped_keys
+            cls._shipped_keys.add(key)
+        try:
+            results = await asyncio.gather(*[
+                cls._run(key, version.rules, chunk, ship=first_use) for chunk in chunks
+            ])
+        except BrokenProcessPool:
+            logger.error("Mapping process pool broke; rebuilding it and mapping inline")
+            cls.shutdown()
+            return map_each(plan, records)
+
+        cls.offloaded_batches += 1
+        cls.offloaded_records += len(records)
+        return [mapped for chunk in results for mapped in chunk]
+
+    @classmethod
+    async def _run(cls, key, rules, chunk, ship=False):
+        loop = asyncio.get_running_loop()
+        executor = cls._get_executor()
+        if not ship:
+            try:
+                return await loop.run_in_executor(executor, _map_chunk, key, None, chunk)
+            except PlanNotLoaded:
+                pass
+        cls.plans_shipped += 1
+        return await loop.run_in_executor(executor, _map_chunk, key, rules, chunk)
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+            cls._shipped_keys.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def stats(cls):
+        return {
+            "enabled": hub_setting('OFFLOAD_ENABLED'),
+            "pool_started": cls._executor is not None,
+            "offloaded_batches": cls.offloaded_batches,
+            "offloaded_records": cls.offloaded_records,
+            "plans_shipped": cls.plans_shipped,
+        }
+
+
+on_shutdown(MappingOffloader.shutdown)
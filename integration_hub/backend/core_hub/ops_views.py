@@ -0,0 +1,55 @@
+"""
+Operational endpoints: runtime statistics of the in-process caches, buffers
+and upstream clients of this worker, and its execution metrics.
+"""
+from django.http import HttpResponse
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .automap import AutoMapCache
+from .batching import BatchingSender
+from .fetch_cache import FetchCache
+from .hedging import Hedger
+from .limits import UpstreamLimiter
+from .log_sink import ExecutionLogSink
+from .memo import TransformMemo
+from .metrics import ExecutionMetrics
+from .offload import MappingOffloader
+from .resilience import CircuitBreaker
+from .singleflight import SingleFlight
+from .template_cache import TemplateCache
+
+
+def runtime_stats():
+    """
+    Snapshot of this worker's runtime counters, grouped by component.
+    """
+    return {
+        "template_cache": TemplateCache.stats(),
+        "fetch_cache": FetchCache.stats(),
+        "fetch_coalescing": SingleFlight.stats(),
+        "log_sink": ExecutionLogSink.stats(),
+        "send_batching": BatchingSender.stats(),
+        "upstream_limits": UpstreamLimiter.stats(),
+        "circuit_breakers": CircuitBreaker.stats(),
+        "hedging": Hedger.stats(),
+        "mapping_offload": MappingOffloader.stats(),
+        "transform_memo": TransformMemo.stats(),
+        "auto_map_cache": AutoMapCache.stats(),
+    }
+
+
+@api_view(['GET'])
+def runtime(request):
+    """
+    Runtime counters for this worker process (not aggregated across workers).
+    """
+    return Response(runtime_stats())
+
+
+def metrics(request):
+    """
+    Per-template execution counters and stage latency histograms of this
+    worker process, in the Prometheus text format.
+    """
+    return HttpResponse(ExecutionMetrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ExecutionLogCursorPagination(CursorPagination):
+    """
+    Keyset pagination on timestamp: pages stay cheap however deep the client
+    scrolls, since no COUNT(*) or deep OFFSET is issued. Rows sharing a
+    timestamp are ordered by id, so a cursor landing among them resumes at
+    the right row.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class ExecutionJobCursorPagination(ExecutionLogCursorPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,112 @@
+"""
+The single-record execution pipeline: resolve input, map, send, log.
+
+Shared by the synchronous execute endpoint and the background job workers.
+"""
+import logging
+
+from .compiler import RuleCompiler
+from .log_sink import ExecutionLogSink
+from .metrics import ExecutionMetrics, StageTimer
+from .resilience import PermanentError
+from .utils import DataFetcher, DataSender
+
+logger = logging.getLogger(__name__)
+
+
+async def execute_template(template, body_data, timer=None):
+    """
+    Executes a mapping template for one request body (ASYNC).
+
+    Returns {"mapped_data", "target_response"}. Failures are logged as ERROR
+    executions and re-raised; ValueError marks a client/upstream error, and
+    its subclass PermanentError one that retrying cannot fix.
+    Stages are timed on timer (a new StageTimer by default) and recorded in
+    ExecutionMetrics.
+    """
+    if timer is None:
+        timer = StageTimer()
+    is_test = body_data.get('is_test', False)
+    input_data = None
+
+    try:
+        input_data = body_data.get('data')
+
+        # WEBOOK SUPPORT: If Source has no API URL (Passive), and no 'data' wrapper is found
+        if not input_data and not template.source.api_url:
+            input_data = body_data
+
+        # Fetch Logic
+        if not input_data:
+            if not template.source.api_url:
+                raise PermanentError("No input payload provided for Passive Source")
+
+            fetch_params = body_data.get('params', {})
+            try:
+                # Active Fetch ASYNC
+                with timer.stage('fetch'):
+                    input_data = await DataFetcher.fetch_data(
+                        template.source, fetch_params, use_cache=not body_data.get('no_cache', False)
+                    )
+            except PermanentError as e:
+                raise PermanentError(f"Fetch Error: {str(e)}")
+            except Exception as e:
+                raise ValueError(f"Fetch Error: {str(e)}")
+
+        # Get active version rules
+        if not template.active_version:
+            raise PermanentError("No active version found for this template")
+
+        with timer.stage('map'):
+            # Compiled once per version and reused across executions
+            plan = RuleCompiler.get_plan(template.active_version)
+
+            # Engine Execution (one document: inline; large batches are offloaded, see MappingOffloader)
+            output_data = plan.apply(input_data)
+
+        # Add template ID to the output data
+        output_data['template_id'] = template.id
+
+        # Send to Target ASYNC
+        target_response = None
+        if template.target:
+            with timer.stage('send'):
+                target_response = await DataSender.send_data(template.target, output_data)
+
+        # Log execution ASYNC (buffered, written in bulk off the response path)
+        with timer.stage('log'):
+            await ExecutionLogSink.record(
+                template=template,
+                version=template.active_version,
+                status='SUCCESS',
+                input_data=input_data,
+                output_data=output_data,
+                is_test=is_test,
+                **timer.log_fields()
+            )
+
+        ExecutionMetrics.observe(template.id, 'SUCCESS', timer)
+        return {
+            "mapped_data": output_data,
+            "target_response": target_response
+        }
+
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Execution failed: {error_msg}", exc_info=True)
+        # Safe Logging ASYNC
+        try:
+            with timer.stage('log'):
+                await ExecutionLogSink.record(
+                    template=template,
+                    version=template.active_version if template.active_version else None,
+                    status='ERROR',
+                    input_data=input_data,
+                    error_message=error_msg,
+                    is_test=is_test,
+                    **timer.log_fields()
+                )
+        except Exception as log_error:
+            logger.error(f"Failed to save error log: {log_error}", exc_info=True)
+        ExecutionMetrics.observe(template.id, 'ERROR', timer)
+        raise
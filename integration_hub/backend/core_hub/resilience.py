@@ -0,0 +1,259 @@
+"""
+Timeouts, retries and circuit breaking for upstream calls.
+
+Per IntegrationProfile options (defaults in INTEGRATION_HUB):
+    options["timeouts"] = {"connect": s, "read": s, "total": s}
+    options["retry"]    = {"attempts": n, "backoff_ms": ms, "max_backoff_ms": ms}
+    options["breaker"]  = {"enabled": bool, "failure_threshold": n, "reset_timeout": s}
+
+Only idempotent calls (Source GETs) are retried, with full-jitter exponential
+backoff. The breaker counts logical calls, not attempts: a call that still
+fails once its retries are exhausted (transport error, timeout, 5xx) is one
+failure. It opens after failure_threshold consecutive failures and then fails
+fast; every reset_timeout seconds one call is let through as a probe, which
+closes it again on success.
+"""
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from .conf import hub_setting
+from .limits import UpstreamLimiter, parse_retry_after
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# 4xx statuses that may still succeed on a later attempt
+TRANSIENT_CLIENT_STATUSES = (408, 425, 429)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class PermanentError(ValueError):
+    """Raised for failures a retry cannot fix: configuration errors, 4xx."""
+
+
+def status_error(message, status_code):
+    """
+    The error for an upstream error response: PermanentError for client
+    errors other than TRANSIENT_CLIENT_STATUSES, ValueError otherwise.
+    """
+    if 400 <= status_code < 500 and status_code not in TRANSIENT_CLIENT_STATUSES:
+        return PermanentError(message)
+    return ValueError(message)
+
+
+def _options(profile, section):
+    return (getattr(profile, 'options', None) or {}).get(section) or {}
+
+
+def timeout_for(profile):
+    """
+    Connect/read timeouts for the profile's pooled client.
+    """
+    options = _options(profile, 'timeouts')
+    read = options.get('read', hub_setting('HTTP_READ_TIMEOUT'))
+    return httpx.Timeout(read, connect=options.get('connect', hub_setting('HTTP_CONNECT_TIMEOUT')))
+
+
+def total_timeout_for(profile):
+    """
+    Overall budget in seconds for one upstream request (None = unbounded).
+    """
+    return _options(profile, 'timeouts').get('total', hub_setting('HTTP_TOTAL_TIMEOUT')) or None
+
+
+def retry_options_for(profile):
+    options = _options(profile, 'retry')
+    return {
+        'attempts': int(options.get('attempts', hub_setting('HTTP_RETRY_ATTEMPTS'))),
+        'backoff': options.get('backoff_ms', hub_setting('HTTP_RETRY_BACKOFF_MS')) / 1000.0,
+        'max_backoff': options.get('max_backoff_ms', hub_setting('HTTP_RETRY_MAX_BACKOFF_MS')) / 1000.0,
+    }
+
+
+def backoff_delay(attempt, options, retry_after=None):
+    """
+    Full-jitter exponential backoff, never shorter than the upstream's
+    Retry-After. Returns None when the wait would exceed max_backoff.
+    """
+    delay = random.uniform(0, min(options['max_backoff'], options['backoff'] * 2 ** attempt))
+    if retry_after:
+        if retry_after > options['max_backoff']:
+            return None
+        delay = max(delay, retry_after)
+    return delay
+
+
+class _Circuit:
+    __slots__ = ('state', 'failures', 'opened_at', 'probe_at', 'trips', 'rejected')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+        self.trips = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit state per profile id.
+    """
+    _circuits = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def options_for(profile):
+        options = _options(profile, 'breaker')
+        if not options.get('enabled', hub_setting('BREAKER_ENABLED')):
+            return None
+        return {
+            'failure_threshold': int(options.get('failure_threshold', hub_setting('BREAKER_FAILURE_THRESHOLD'))),
+            'reset_timeout': float(options.get('reset_timeout', hub_setting('BREAKER_RESET_TIMEOUT'))),
+        }
+
+    @classmethod
+    def before_call(cls, profile):
+        """
+        Raises ValueError while the profile's circuit is open. Once
+        reset_timeout has passed, one caller at a time is let through as a
+        probe (a probe that never reports back is replaced after another
+        reset_timeout).
+        """
+        options = cls.options_for(profile)
+        if options is None:
+            return
+        now = time.monotonic()
+        with cls._lock:
+            circuit = cls._circuits.get(profile.pk)
+            if circuit is None or circuit.state == CLOSED:
+                return
+            since = circuit.probe_at if circuit.state == HALF_OPEN else circuit.opened_at
+            remaining = since + options['reset_timeout'] - now
+            if remaining <= 0:
+                circuit.state = HALF_OPEN
+                circuit.probe_at = now
+                return
+            circuit.rejected += 1
+        raise ValueError(
+            f"Circuit open for profile '{profile.name}': upstream is failing, "
+            f"next probe in {remaining:.1f}s"
+        )
+
+    @classmethod
+    def record(cls, profile, healthy):
+        options = cls.options_for(profile)
+        if options is None:
+            return
+        with cls._lock:
+            circuit = cls._circuits.get(profile.pk)
+            if circuit is None:
+                if healthy:
+                    return
+                circuit = cls._circuits[profile.pk] = _Circuit()
+            if healthy:
+                circuit.state = CLOSED
+                circuit.failures = 0
+                return
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or circuit.failures >= options['failure_threshold']:
+                if circuit.state != OPEN:
+                    circuit.trips += 1
+                circuit.state = OPEN
+                circuit.opened_at = time.monotonic()
+
+    @classmethod
+    def reset(cls, profile_id=None):
+        with cls._lock:
+            if profile_id is None:
+                cls._circuits.clear()
+            else:
+                cls._circuits.pop(profile_id, None)
+
+    @classmethod
+    def state(cls, profile):
+        options = cls.options_for(profile)
+        with cls._lock:
+            circuit = cls._circuits.get(profile.pk) or _Circuit()
+            state = cls._describe(circuit)
+        state['enabled'] = options is not None
+        if options is not None and circuit.state == OPEN:
+            state['next_probe_in'] = round(max(circuit.opened_at + options['reset_timeout'] - time.monotonic(), 0), 2)
+        return state
+
+    @staticmethod
+    def _describe(circuit):
+        return {
+            "state": circuit.state,
+            "consecutive_failures": circuit.failures,
+            "trips": circuit.trips,
+            "rejected": circuit.rejected,
+        }
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {str(pk): cls._describe(circuit) for pk, circuit in cls._circuits.items()}
+
+
+@asynccontextmanager
+async def upstream_call(profile, send, idempotent=False):
+    """
+    Runs send() (one httpx request) under the profile's circuit breaker,
+    limits and total timeout, and yields the response. Idempotent calls are
+    retried on transport errors, timeouts and 429/502/503/504. The limiter
+    slot is held until the block exits, so streamed bodies count against it.
+    """
+    total = total_timeout_for(profile)
+    retry = retry_options_for(profile) if idempotent else {'attempts': 0}
+    attempt = 0
+
+    CircuitBreaker.before_call(profile)
+    while True:
+        async with UpstreamLimiter.slot(profile) as observe:
+            response = error = None
+            try:
+                response = await asyncio.wait_for(send(), total)
+            except asyncio.TimeoutError:
+                error = ValueError(f"Upstream request timed out after {total}s")
+            except httpx.TransportError as e:
+                error = e
+
+            if response is not None:
+                observe(response)
+
+            delay = None
+            if attempt < retry['attempts'] and (error is not None or response.status_code in RETRY_STATUSES):
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+                delay = backoff_delay(attempt, retry, retry_after)
+
+            if delay is None:
+                # One outcome per logical call, once retries are exhausted
+                CircuitBreaker.record(profile, response is not None and response.status_code < 500)
+                if error is not None:
+                    raise error
+                try:
+                    yield response
+                finally:
+                    await response.aclose()
+                return
+            if response is not None:
+                await response.aclose()
+
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def upstream_request(profile, send, idempotent=False):
+    """
+    upstream_call for requests whose body is read by send() itself.
+    """
+    async with upstream_call(profile, send, idempotent) as response:
+        return response
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import IntegrationProfile, MappingTemplate, MappingVersion, ExecutionLog
+from .models import IntegrationProfile, MappingTemplate, MappingVersion, ExecutionLog, ExecutionJob
+from .compiler import RuleCompiler, RuleCompilationError
 
 class IntegrationProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,6 +12,14 @@ class MappingVersionSerializer(serializers.ModelSerializer):
         model = MappingVersion
         fields = '__all__'
 
+    def validate_rules(self, value):
+        # Compile at save time so bad rules never reach an execution
+        try:
+            RuleCompiler.compile(value, strict=True)
+        except RuleCompilationError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
 class MappingTemplateSerializer(serializers.ModelSerializer):
     source_details = IntegrationProfileSerializer(source='source', read_only=True)
     target_details = IntegrationProfileSerializer(source='target', read_only=True)
@@ -22,7 +31,32 @@ class MappingTemplateSerializer(serializers.ModelSerializer):
 
 class ExecutionLogSerializer(serializers.ModelSerializer):
     template_name = serializers.CharField(source='template.name', read_only=True)
+    # Payloads live in compressed PayloadBlobs (inline columns for legacy rows)
+    input_data = serializers.SerializerMethodField()
+    output_data = serializers.SerializerMethodField()
     
     class Meta:
         model = ExecutionLog
+        exclude = ('input_blob', 'output_blob')
+
+    def __init__(self, *args, **kwargs):
+        # Optional projection: only serialize the named fields
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def get_input_data(self, obj):
+        return obj.get_input_data()
+
+    def get_output_data(self, obj):
+        return obj.get_output_data()
+
+
+class ExecutionJobSerializer(serializers.ModelSerializer):
+    template_name = serializers.CharField(source='template.name', read_only=True)
+
+    class Meta:
+        model = ExecutionJob
         fields = '__all__'
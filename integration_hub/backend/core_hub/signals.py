@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import IntegrationProfile, MappingTemplate, MappingVersion
+from .compiler import RuleCompiler
+from .template_cache import TemplateCache
+from .fetch_cache import FetchCache
+from .metrics import ExecutionMetrics
+from .resilience import CircuitBreaker
+
+
+@receiver(post_save, sender=MappingVersion)
+@receiver(post_delete, sender=MappingVersion)
+def invalidate_version_plan(sender, instance, **kwargs):
+    """
+    Drop the compiled plan so the next execution recompiles the saved rules.
+    """
+    RuleCompiler.invalidate(instance.pk)
+    TemplateCache.invalidate(template_id=instance.template_id)
+
+
+@receiver(post_save, sender=MappingTemplate)
+@receiver(post_delete, sender=MappingTemplate)
+def invalidate_template(sender, instance, **kwargs):
+    TemplateCache.invalidate(template_id=instance.pk)
+
+
+@receiver(post_delete, sender=MappingTemplate)
+def forget_template_metrics(sender, instance, **kwargs):
+    ExecutionMetrics.forget(instance.pk)
+
+
+@receiver(post_save, sender=IntegrationProfile)
+@receiver(post_delete, sender=IntegrationProfile)
+def invalidate_profile_templates(sender, instance, **kwargs):
+    TemplateCache.invalidate(profile_id=instance.pk)
+    FetchCache.clear(profile_id=instance.pk)
+    CircuitBreaker.reset(profile_id=instance.pk)
@@ -0,0 +1,86 @@
+"""
+Single-flight coalescing of identical concurrent Source fetches.
+
+Concurrent callers asking for the same key (resolved URL + auth identity)
+share one upstream request. The request runs as its own task, so a caller
+that disconnects does not cancel it for the others. With a coalescing window
+the finished result keeps being shared for window seconds afterwards; failed
+results are never shared beyond the callers already waiting.
+
+In-flight calls are tracked per event loop, so coalescing spans requests only
+on a shared loop (ASGI, run_workers; see lifespan.py).
+Under WSGI each request runs on its own loop and only the fetches within one
+request are coalesced.
+"""
+import asyncio
+import threading
+import weakref
+
+from .conf import hub_setting
+
+
+class SingleFlight:
+    """
+    In-flight call registry, one per event loop.
+    """
+    _calls = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+    leaders = 0
+    coalesced = 0
+
+    @staticmethod
+    def window_for(profile):
+        """
+        Returns the profile's coalescing window in seconds (0 = in-flight
+        only), or None when coalescing is disabled for it.
+        """
+        options = (getattr(profile, 'options', None) or {}).get('coalesce') or {}
+        if not options.get('enabled', hub_setting('FETCH_COALESCING')):
+            return None
+        return options.get('window_ms', 0) / 1000.0
+
+    @classmethod
+    def _calls_for(cls, loop):
+        with cls._lock:
+            calls = cls._calls.get(loop)
+            if calls is None:
+                calls = cls._calls[loop] = {}
+            return calls
+
+    @classmethod
+    async def do(cls, key, fn, window=0.0):
+        """
+        Awaits fn() once for all concurrent callers with the same key.
+        """
+        loop = asyncio.get_running_loop()
+        calls = cls._calls_for(loop)
+
+        task = calls.get(key)
+        if task is None:
+            cls.leaders += 1
+            task = calls[key] = loop.create_task(fn())
+            task.add_done_callback(lambda done: cls._finished(loop, calls, key, done, window))
+        else:
+            cls.coalesced += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finished(loop, calls, key, task, window):
+        failed = task.cancelled() or task.exception() is not None
+
+        def forget():
+            if calls.get(key) is task:
+                del calls[key]
+
+        if window and not failed:
+            loop.call_later(window, forget)
+        else:
+            forget()
+
+    @classmethod
+    def stats(cls):
+        return {
+            "leaders": cls.leaders,
+            "coalesced": cls.coalesced,
+            "tracked_keys": sum(len(calls) for calls in list(cls._calls.values())),
+        }
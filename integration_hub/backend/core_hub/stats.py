@@ -0,0 +1,252 @@
+"""
+Per-template execution statistics served from incrementally maintained rollups.
+
+refresh() folds the ExecutionLogs timestamped after the RollupWatermark into
+ExecutionRollup rows (one per template, minute and latency bucket) with a
+single GROUP BY in the database plus one bulk update and one bulk insert,
+then advances the watermark. Stats queries only sum rollup rows, so they
+stay fast however large the log table grows; percentiles come from the
+summed latency histogram, interpolated within the bucket (buckets grow by
+25%, bounding the error).
+
+Refreshes run in the background, never on a stats request: after each flush
+of the log sink (at most once per STATS_REFRESH_INTERVAL per process) and
+from `manage.py refresh_stats`.
+
+The watermark is a timestamp, not a log id: ids are assigned at INSERT but
+concurrent transactions can commit out of id order, so an id watermark
+could pass over rows committed late. Log timestamps are set when a log is
+recorded, so logs newer than STATS_ROLLUP_LAG seconds are left for a later
+refresh, giving buffered logs time to be written; a log written later than
+that is not counted until `refresh_stats --rebuild`. Test executions
+(is_test) are excluded.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMinute
+from django.utils import timezone
+
+from .conf import hub_setting
+from .models import ExecutionLog, ExecutionRollup, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets: 1 ms to ~109 s, plus one overflow bucket
+LATENCY_BUCKETS_MS = tuple(round(1.25 ** n, 3) for n in range(53))
+
+WATERMARK = 'execution_stats'
+
+_SUMMED_FIELDS = (
+    'executions', 'errors', 'duration_ms_sum', 'fetch_ms_sum', 'transform_ms_sum',
+    'send_ms_sum', 'input_bytes_sum', 'output_bytes_sum',
+)
+
+
+def _latency_bucket():
+    """
+    SQL CASE mapping duration_ms to its bucket index (-1 when untimed).
+    """
+    return Case(
+        *[When(duration_ms__lte=bound, then=Value(index)) for index, bound in enumerate(LATENCY_BUCKETS_MS)],
+        When(duration_ms__isnull=False, then=Value(len(LATENCY_BUCKETS_MS))),
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+
+
+def _percentile(histogram, total, q):
+    """
+    q-th percentile from {bucket index: count}, interpolated in the bucket.
+    """
+    rank = q / 100 * total
+    seen = 0
+    for index in sorted(histogram):
+        count = histogram[index]
+        if seen + count >= rank:
+            if index >= len(LATENCY_BUCKETS_MS):
+                return LATENCY_BUCKETS_MS[-1]
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0.0
+            upper = LATENCY_BUCKETS_MS[index]
+            return round(lower + (upper - lower) * (rank - seen) / count, 3)
+        seen += count
+    return None
+
+
+class ExecutionStats:
+    """
+    Rollup refresh and per-template statistics queries.
+    """
+    _refreshed_at = 0.0
+
+    @classmethod
+    def refresh(cls, force=False):
+        """
+        Folds new logs into the rollups. Returns how many logs were folded.
+        Without force, runs at most once per STATS_REFRESH_INTERVAL seconds
+        in this process.
+        """
+        now = time.monotonic()
+        if not force and now - cls._refreshed_at < hub_setting('STATS_REFRESH_INTERVAL'):
+            return 0
+        cls._refreshed_at = now
+        cutoff = timezone.now() - timedelta(seconds=hub_setting('STATS_ROLLUP_LAG'))
+        # Row lock: a concurrent refresh is skipped (or waits, without
+        # SKIP LOCKED) instead of double counting
+        skip_locked = connection.features.has_select_for_update_skip_locked
+
+        with transaction.atomic():
+            RollupWatermark.objects.get_or_create(name=WATERMARK)
+            watermark = RollupWatermark.objects.select_for_update(skip_locked=skip_locked).filter(
+                name=WATERMARK
+            ).first()
+            if watermark is None:
+                return 0
+            folded = 0
+            if watermark.folded_until is None or watermark.folded_until < cutoff:
+                folded = cls._fold(watermark.folded_until, cutoff)
+                watermark.folded_until = cutoff
+            watermark.refreshed_at = timezone.now()
+            watermark.save()
+
+        if folded:
+            logger.info(f"Folded {folded} execution logs into the stats rollups (up to {cutoff.isoformat()})")
+        return folded
+
+    @staticmethod
+    def _fold(lower, upper):
+        """
+        Adds the logs timestamped in (lower, upper] to the rollups.
+        """
+        logs = ExecutionLog.objects.filter(timestamp__lte=upper, is_test=False, template__isnull=False)
+        if lower is not None:
+            logs = logs.filter(timestamp__gt=lower)
+        groups = list(
+            logs
+            .annotate(period=TruncMinute('timestamp'), latency_bucket=_latency_bucket())
+            .values('template_id', 'period', 'latency_bucket')
+            .order_by()
+            .annotate(
+                executions=Count('id'),
+                errors=Count('id', filter=Q(status='ERROR')),
+                duration_ms_sum=Coalesce(Sum('duration_ms'), Value(0.0), output_field=FloatField()),
+                fetch_ms_sum=Coalesce(Sum('fetch_ms'), Value(0.0), output_field=FloatField()),
+                transform_ms_sum=Coalesce(Sum('transform_ms'), Value(0.0), output_field=FloatField()),
+                send_ms_sum=Coalesce(Sum('send_ms'), Value(0.0), output_field=FloatField()),
+                input_bytes_sum=Coalesce(Sum('input_size'), Value(0)),
+                output_bytes_sum=Coalesce(Sum('output_size'), Value(0)),
+            )
+        )
+        if not groups:
+            return 0
+
+        # Only refresh() writes rollups, under the watermark lock, so a
+        # read-modify-write of the touched rows is safe
+        periods = [group['period'] for group in groups]
+        existing = {
+            (rollup.template_id, rollup.period, rollup.latency_bucket): rollup
+            for rollup in ExecutionRollup.objects.filter(
+                template_id__in={group['template_id'] for group in groups},
+                period__gte=min(periods), period__lte=max(periods),
+            )
+        }
+        updated, created = [], []
+        for group in groups:
+            rollup = existing.get((group['template_id'], group['period'], group['latency_bucket']))
+            if rollup is None:
+                created.append(ExecutionRollup(
+                    template_id=group['template_id'], period=group['period'], latency_bucket=group['latency_bucket'],
+                    **{name: group[name] for name in _SUMMED_FIELDS}
+                ))
+                continue
+            for name in _SUMMED_FIELDS:
+                setattr(rollup, name, getattr(rollup, name) + group[name])
+            updated.append(rollup)
+        ExecutionRollup.objects.bulk_update(updated, _SUMMED_FIELDS, batch_size=500)
+        ExecutionRollup.objects.bulk_create(created, batch_size=500)
+        return sum(group['executions'] for group in groups)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Drops every rollup and refolds the whole log table.
+        """
+        with transaction.atomic():
+            ExecutionRollup.objects.all().delete()
+            RollupWatermark.objects.filter(name=WATERMARK).delete()
+        return cls.refresh(force=True)
+
+    @classmethod
+    def summary(cls, since, until, template_ids=None):
+        """
+        Statistics per template for executions in [since, until], at minute
+        resolution.
+        """
+        rollups = ExecutionRollup.objects.filter(
+            period__gte=since.replace(second=0, microsecond=0), period__lte=until
+        )
+        if template_ids is not None:
+            rollups = rollups.filter(template_id__in=template_ids)
+
+        totals = rollups.values('template_id').order_by('template_id').annotate(
+            timed=Coalesce(Sum('executions', filter=Q(latency_bucket__gte=0)), Value(0)),
+            **{f"total_{name}": Sum(name) for name in _SUMMED_FIELDS}
+        )
+        histograms = {}
+        for row in (
+            rollups.filter(latency_bucket__gte=0)
+            .values('template_id', 'latency_bucket').order_by()
+            .annotate(count=Sum('executions'))
+        ):
+            histograms.setdefault(row['template_id'], {})[row['latency_bucket']] = row['count']
+
+        minutes = max((until - since).total_seconds() / 60, 1 / 60)
+        watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+        return {
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "refreshed_at": watermark.refreshed_at.isoformat() if watermark and watermark.refreshed_at else None,
+            "templates": [cls._template_stats(row, histograms.get(row['template_id'], {}), minutes) for row in totals],
+        }
+
+    @classmethod
+    def empty(cls, template_id):
+        """
+        Stats of a template without executions in the window.
+        """
+        row = {'template_id': template_id, 'timed': 0, **{f"total_{name}": 0 for name in _SUMMED_FIELDS}}
+        return cls._template_stats(row, {}, 1)
+
+    @staticmethod
+    def _template_stats(row, histogram, minutes):
+        executions, timed = row['total_executions'], row['timed']
+
+        def mean(total, count):
+            return round(total / count, 3) if count else None
+
+        return {
+            "template_id": row['template_id'],
+            "executions": executions,
+            "errors": row['total_errors'],
+            "error_rate": round(row['total_errors'] / executions, 4) if executions else None,
+            "throughput_per_min": round(executions / minutes, 3),
+            "latency_ms": {
+                "p50": _percentile(histogram, timed, 50),
+                "p95": _percentile(histogram, timed, 95),
+                "p99": _percentile(histogram, timed, 99),
+                "mean": mean(row['total_duration_ms_sum'], timed),
+            },
+            # Mean time per timed execution spent in each stage
+            "stages_ms": {
+                "fetch": mean(row['total_fetch_ms_sum'], timed),
+                "transform": mean(row['total_transform_ms_sum'], timed),
+                "send": mean(row['total_send_ms_sum'], timed),
+            },
+            "payload_bytes": {
+                "input_mean": mean(row['total_input_bytes_sum'], executions),
+                "output_mean": mean(row['total_output_bytes_sum'], executions),
+            },
+        }
@@ -0,0 +1,160 @@
+"""
+In-process read-through cache of MappingTemplates used by the execute views.
+
+Entries hold the template with its source, target and active_version already
+loaded, so hot templates skip the DB round trip. Entries are dropped by the
+model signals in signals.py; with TEMPLATE_CACHE_INVALIDATION set to a Django
+cache alias, invalidations are also broadcast to other workers through a
+shared generation counter.
+
+Signals only reach the process that saved the model, so entries also expire
+after TEMPLATE_CACHE_TTL seconds: without a shared alias, other workers (and
+run_workers) see an edit within that delay.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .compiler import RuleCompiler
+from .conf import hub_setting
+from .models import MappingTemplate
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'core_hub:template_cache:generation'
+
+
+class TemplateCache:
+    """
+    Bounded LRU of (template, loaded_at) keyed by template id.
+    """
+    _entries = OrderedDict()
+    # Bumped by every invalidation, so a lookup racing one does not cache
+    # the row it read before the edit
+    _epoch = 0
+    _lock = threading.Lock()
+    _generation = None
+    _generation_checked_at = 0.0
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def _shared_cache(cls):
+        alias = hub_setting('TEMPLATE_CACHE_INVALIDATION')
+        return caches[alias] if alias else None
+
+    @classmethod
+    async def _sync_generation(cls):
+        """
+        Clears the local cache when another worker has bumped the shared
+        generation. Polled at most once per TEMPLATE_CACHE_SYNC_INTERVAL.
+        """
+        shared = cls._shared_cache()
+        if shared is None:
+            return
+        now = time.monotonic()
+        if now - cls._generation_checked_at < hub_setting('TEMPLATE_CACHE_SYNC_INTERVAL'):
+            return
+        cls._generation_checked_at = now
+        try:
+            generation = await shared.aget(GENERATION_KEY, 0)
+        except Exception as e:
+            logger.warning(f"Template cache generation check failed: {e}")
+            return
+        if generation != cls._generation:
+            if cls._generation is not None:
+                cls.clear()
+                RuleCompiler.invalidate()
+            cls._generation = generation
+
+    @classmethod
+    async def aget(cls, pk):
+        """
+        Returns the template with source, target and active_version loaded.
+        Raises MappingTemplate.DoesNotExist like the ORM lookup it replaces.
+        """
+        max_size = hub_setting('TEMPLATE_CACHE_SIZE')
+        if not max_size:
+            return await MappingTemplate.objects.select_related('source', 'target', 'active_version').aget(pk=pk)
+
+        await cls._sync_generation()
+
+        key = int(pk)
+        ttl = hub_setting('TEMPLATE_CACHE_TTL')
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and (not ttl or time.monotonic() - entry[1] < ttl):
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return entry[0]
+            cls.misses += 1
+            epoch = cls._epoch
+
+        loaded_at = time.monotonic()
+        template = await MappingTemplate.objects.select_related('source', 'target', 'active_version').aget(pk=key)
+
+        with cls._lock:
+            if cls._epoch == epoch:
+                cls._entries[key] = (template, loaded_at)
+                cls._entries.move_to_end(key)
+                while len(cls._entries) > max_size:
+                    cls._entries.popitem(last=False)
+        return template
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._epoch += 1
+
+    @classmethod
+    def invalidate(cls, template_id=None, profile_id=None, broadcast=True):
+        """
+        Drops one template, every template using a profile, or (with no
+        arguments) the whole cache.
+        """
+        with cls._lock:
+            cls._epoch += 1
+            if template_id is None and profile_id is None:
+                cls._entries.clear()
+            if template_id is not None:
+                cls._entries.pop(template_id, None)
+            if profile_id is not None:
+                for key in [
+                    key for key, (template, _) in cls._entries.items()
+                    if profile_id in (template.source_id, template.target_id)
+                ]:
+                    del cls._entries[key]
+
+        if broadcast:
+            cls._broadcast()
+
+    @classmethod
+    def _broadcast(cls):
+        shared = cls._shared_cache()
+        if shared is None:
+            return
+        try:
+            try:
+                generation = shared.incr(GENERATION_KEY)
+            except ValueError:
+                shared.add(GENERATION_KEY, 1, timeout=None)
+                generation = 1
+            # Our own bump needs no extra local clear
+            if cls._generation is not None and generation == cls._generation + 1:
+                cls._generation = generation
+        except Exception as e:
+            logger.warning(f"Template cache invalidation broadcast failed: {e}")
+
+    @classmethod
+    def stats(cls):
+        return {
+            "size": len(cls._entries),
+            "max_size": hub_setting('TEMPLATE_CACHE_SIZE'),
+            "ttl": hub_setting('TEMPLATE_CACHE_TTL'),
+            "hits": cls.hits,
+            "misses": cls.misses,
+        }
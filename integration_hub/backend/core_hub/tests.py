@@ -1,3 +1,1317 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+import httpx
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import automap
+from .ai_views import llm_failure_reason
+from .automap import AutoMapCache, match_fields, match_fuzzy
+from .batching import BatchingSender
+from .compiler import ExecutionPlan, RuleCompiler, RuleCompilationError, version_key
+from .engine import TransformationEngine
+from .fetch_cache import FetchCache
+from .expressions import ExpressionError, parse_expression
+from .hedging import Hedger
+from .http_clients import ClientRegistry, auth_identity, profile_fingerprint
+from .json_stream import JSONArrayStreamParser, aiter_array_items
+from .limits import ProfileLimiter, TokenBucket, UpstreamLimiter
+from .lifespan import mark_persistent_loop, run_shutdown_hooks
+from .log_sink import ExecutionLogSink, approx_size
+from .memo import TransformMemo
+from .metrics import BUCKETS, ExecutionMetrics
+from .offload import MappingOffloader
+from .jobs import JobQueue
+from .models import (
+    AutoMapCacheEntry, ExecutionJob, ExecutionLog, ExecutionRollup, IntegrationProfile, MappingTemplate,
+    MappingVersion, PayloadBlob, RollupWatermark,
+)
+from .resilience import CircuitBreaker, upstream_request
+from .stats import ExecutionStats
+from .template_cache import TemplateCache
+from .utils import DataFetcher
+
+
+def create_template(rules, source_url='http://source.local/api', target_url='http://target.local/api'):
+    source = IntegrationProfile.objects.create(name='Source', type='SOURCE', api_url=source_url)
+    target = IntegrationProfile.objects.create(name='Target', type='TARGET', api_url=target_url)
+    template = MappingTemplate.objects.create(name='Template', source=source, target=target)
+    version = MappingVersion.objects.create(template=template, version_number=1, rules=rules)
+    template.active_version = version
+    template.save()
+    return template
+
+
+class RuleCompilerTests(SimpleTestCase):
+    def test_plan_maps_paths_and_transforms(self):
+        plan = RuleCompiler.compile([
+            {"source_path": "data.razao_social", "target_field": "name", "transform": "UPPERCASE"},
+            {"source_path": "$.data.socios.0.nome", "target_field": "partner"},
+            {"source_path": "data.missing", "target_field": "missing", "transform": "DEFAULT(N/A)"},
+        ])
+        output = plan.apply({"data": {"razao_social": "acme", "socios": [{"nome": "Ana"}]}})
+        self.assertEqual(output, {"name": "ACME", "partner": "Ana", "missing": "N/A"})
+
+    def test_strict_compile_rejects_invalid_rules(self):
+        with self.assertRaises(RuleCompilationError):
+            RuleCompiler.compile([{"source_path": "a"}], strict=True)
+        with self.assertRaises(RuleCompilationError):
+            RuleCompiler.compile([{"source_path": "a", "target_field": "b", "transform": "NOPE"}], strict=True)
+        with self.assertRaises(RuleCompilationError):
+            RuleCompiler.compile({"not": "a list"})
+
+
+class JSONPathTests(SimpleTestCase):
+    DOCUMENT = {
+        "data": {
+            "name": "acme",
+            "first name": "x",
+            "0": "zero",
+            "tags": ["a", "b", "c", "d"],
+            "socios": [
+                {"nome": "Ana", "idade": 40, "cargo": "dir"},
+                {"nome": "Bia", "idade": 25},
+                {"nome": "Caio", "idade": 33, "cargo": "dir"},
+            ],
+        },
+        "list": [10, 20],
+    }
+
+    CASES = [
+        # Legacy dotted paths: dict keys first, digits index lists, None when missing
+        ('$.data.name', 'acme'),
+        ('data.socios.1.nome', 'Bia'),
+        ('data.0', 'zero'),
+        ('list.1', 20),
+        ('data.missing', None),
+        ('$.data.tags[9]', None),
+        ('$.data.tags[-1]', 'd'),
+        ("$['data']['first name']", 'x'),
+        # Indefinite paths resolve to a list of matches
+        ('$.data.socios[*].nome', ['Ana', 'Bia', 'Caio']),
+        ('$.data.socios.*.idade', [40, 25, 33]),
+        ('$..nome', ['Ana', 'Bia', 'Caio']),
+        ('$.data.tags[1:3]', ['b', 'c']),
+        ('$.data.tags[::2]', ['a', 'c']),
+        ('$.data.tags[0,2]', ['a', 'c']),
+        ("$.data['name','missing']", ['acme']),
+        ('$.missing[*]', []),
+        ('$.data.socios[?(@.idade > 30)].nome', ['Ana', 'Caio']),
+        ("$.data.socios[?(@.cargo == 'dir' && @.idade < 35)].nome", ['Caio']),
+        ('$.data.socios[?(@.idade < 30 || @.nome == "Ana")].nome', ['Ana', 'Bia']),
+        ('$.data.socios[?(@.cargo)].nome', ['Ana', 'Caio']),
+    ]
+
+    def test_paths(self):
+        for path, expected in self.CASES:
+            with self.subTest(path=path):
+                self.assertEqual(RuleCompiler.compile_path(path).resolve(self.DOCUMENT), expected)
+
+    def test_root_path(self):
+        self.assertEqual(RuleCompiler.compile_path('$').resolve(self.DOCUMENT), self.DOCUMENT)
+
+    def test_plan_resolves_shared_prefixes_like_single_paths(self):
+        plan = RuleCompiler.compile([
+            {"source_path": path, "target_field": str(n)} for n, (path, _) in enumerate(self.CASES)
+        ])
+        self.assertEqual(plan.apply(self.DOCUMENT), {str(n): expected for n, (_, expected) in enumerate(self.CASES)})
+
+    def test_transforms_fan_out_over_matches(self):
+        plan = RuleCompiler.compile([
+            {"source_path": "$.data.socios[*].nome", "target_field": "names", "transform": "UPPERCASE"},
+        ])
+        self.assertEqual(plan.apply(self.DOCUMENT), {"names": ["ANA", "BIA", "CAIO"]})
+
+    def test_unparseable_paths(self):
+        # Non-strict compiles fall back to the dotted lookup
+        self.assertIsNone(RuleCompiler.compile_path('$.data[bad').resolve(self.DOCUMENT))
+        with self.assertRaises(RuleCompilationError):
+            RuleCompiler.compile_path('$.data[bad', strict=True)
+
+
+def feed_in_chunks(document, path, size):
+    parser = JSONArrayStreamParser(path)
+    raw = document.encode('utf-8')
+    items = []
+    for start in range(0, len(raw), size):
+        items.extend(parser.feed(raw[start:start + size]))
+    return items + parser.close()
+
+
+class JSONArrayStreamParserTests(SimpleTestCase):
+    DOCUMENT = json.dumps({
+        "meta": {"note": "skip ] this } one [", "list": [1, {"x": "]"}]},
+        "data": [
+            {"skip": True},
+            {"items": [
+                {"name": "Ação \"quoted\" \\ ç", "nested": {"a": [1, 2, {"b": "{"}]}},
+                "plain string",
+                -1.5e3,
+                None,
+                [],
+            ]},
+        ],
+    })
+
+    def test_items_match_a_full_parse_at_any_chunk_size(self):
+        expected = json.loads(self.DOCUMENT)["data"][1]["items"]
+        # Size 1 also splits multi-byte UTF-8 characters
+        for size in (1, 2, 7, 64, len(self.DOCUMENT)):
+            with self.subTest(size=size):
+                self.assertEqual(feed_in_chunks(self.DOCUMENT, '$.data.1.items', size), expected)
+
+    def test_root_array_and_scalar_at_end_of_input(self):
+        self.assertEqual(feed_in_chunks('[1, "a", [2]]', '$', 1), [1, "a", [2]])
+        self.assertEqual(feed_in_chunks('[]', '', 1), [])
+
+    def test_items_are_returned_as_soon_as_complete(self):
+        parser = JSONArrayStreamParser('items')
+        self.assertEqual(parser.feed('{"items": [{"a": 1}, {"a"'), [{"a": 1}])
+        self.assertEqual(parser.feed(': 2}]}'), [{"a": 2}])
+        self.assertTrue(parser.done)
+
+    def test_missing_path_and_truncated_input(self):
+        parser = JSONArrayStreamParser('data.items')
+        parser.feed('{"data": {"other": [1]}}')
+        self.assertEqual(parser.close(), [])
+        self.assertFalse(parser.found)
+
+        parser = JSONArrayStreamParser('items')
+        parser.feed('{"items": [1, 2')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+        with self.assertRaises(ValueError):
+            JSONArrayStreamParser('items').feed('{"items": {')
+
+    def test_aiter_array_items_requires_the_array(self):
+        async def chunks(*parts):
+            for part in parts:
+                yield part.encode('utf-8')
+
+        async def collect(path, *parts):
+            return [item async for item in aiter_array_items(chunks(*parts), path)]
+
+        self.assertEqual(async_to_sync(collect)('a', '{"a": [1,', ' 2]}'), [1, 2])
+        with self.assertRaises(ValueError):
+            async_to_sync(collect)('b', '{"a": [1]}')
+
+
+def legacy_apply(rule, value):
+    """
+    The original single-call TransformationEngine.apply.
+    """
+    func_name, args = TransformationEngine.parse_rule(rule)
+    method = getattr(TransformationEngine, f"func_{func_name}", None)
+    return method(value, *args) if method else value
+
+
+class ExpressionTests(SimpleTestCase):
+    def transform(self, rule, strict=False):
+        return RuleCompiler.compile_transform(rule, strict=strict)
+
+    def test_pipeline_and_nested_calls(self):
+        self.assertEqual(self.transform('TRIM | UPPERCASE | DEFAULT(N/A)')('  acme '), 'ACME')
+        self.assertEqual(self.transform('TRIM | UPPERCASE | DEFAULT(N/A)')(''), 'N/A')
+        self.assertEqual(self.transform("DEFAULT('a, b')")(None), 'a, b')
+        self.assertEqual(self.transform('DEFAULT(UPPERCASE(n/a))')(None), 'N/A')
+        self.assertEqual(self.transform('ROUND(2)')('3.14159'), 3.14)
+        self.assertEqual(self.transform('LOWERCASE | NOPE')('ABC'), 'abc')
+
+    def test_legacy_single_calls_keep_their_results(self):
+        rules = [
+            'UPPERCASE', 'upper', 'DEFAULT(N/A)', 'DEFAULT(  x  )', 'DEFAULT(a, b)', 'DEFAULT()',
+            'DEFAULT( )', 'DEFAULT(f(x))', 'DEFAULT(f(x), y)', 'DEFAULT(f(x)', 'DEFAULT(x)extra', 'ROUND(2)',
+            'ROUND(x)', 'NOPE(1)',
+        ]
+        for rule in rules:
+            for value in (None, '', ' Acme ', '2.555'):
+                with self.subTest(rule=rule, value=value):
+                    self.assertEqual(self.transform(rule)(value), legacy_apply(rule, value))
+
+    def test_documented_differences_from_the_legacy_parser(self):
+        self.assertEqual(self.transform("DEFAULT('')")(None), '')
+        self.assertEqual(self.transform('DEFAULT("N/A")')(None), 'N/A')
+        self.assertEqual(self.transform('DEFAULT(N/A) ')(None), 'N/A')
+
+    def test_strict_mode(self):
+        with self.assertRaises(RuleCompilationError):
+            self.transform('DEFAULT(f(x))', strict=True)
+        with self.assertRaises(RuleCompilationError):
+            self.transform('ROUND(x)', strict=True)
+        with self.assertRaises(ExpressionError):
+            parse_expression("DEFAULT('open")
+        self.assertEqual(repr(parse_expression('TRIM|DEFAULT(UPPERCASE(a), b)')), (
+            "Pipeline([Call('TRIM', []), Call('DEFAULT', [Call('UPPERCASE', [Literal('a')]), Literal('b')])])"
+        ))
+
+
+class TransformMemoTests(SimpleTestCase):
+    def memos_after(self, rule):
+        before = len(TransformMemo._memos)
+        self.transform = RuleCompiler.compile_transform(rule)
+        return len(TransformMemo._memos) - before
+
+    def test_only_expensive_pure_expressions_are_memoized(self):
+        self.assertEqual(self.memos_after('TRIM | UPPERCASE'), 0)
+        self.assertEqual(self.memos_after("UPPERCASE | DATE_FORMAT('%d/%m/%Y')"), 1)
+        self.assertEqual(self.transform('2024-05-01T10:00:00Z'), '01/05/2024')
+
+    @override_settings(INTEGRATION_HUB={'TRANSFORM_MEMO_SIZE': 0})
+    def test_memo_can_be_disabled(self):
+        self.assertEqual(self.memos_after('DATE_FORMAT'), 0)
+
+
+class PlanCacheTests(TestCase):
+    def setUp(self):
+        RuleCompiler.invalidate()
+
+    def test_plan_follows_rules_edited_elsewhere(self):
+        template = create_template([{"source_path": "a", "target_field": "out"}])
+        version = template.active_version
+        self.assertEqual(RuleCompiler.get_plan(version).apply({"a": 1, "b": 2}), {"out": 1})
+
+        # Another process saves new rules: no signal reaches this cache, but
+        # the stored digest changes with them
+        rules = [{"source_path": "b", "target_field": "out"}]
+        MappingVersion.objects.filter(pk=version.pk).update(rules=rules, rules_digest=MappingVersion.digest_rules(rules))
+        version.refresh_from_db()
+        self.assertEqual(RuleCompiler.get_plan(version).apply({"a": 1, "b": 2}), {"out": 2})
+
+    @override_settings(INTEGRATION_HUB={'PLAN_CACHE_SIZE': 2})
+    def test_plan_cache_is_bounded(self):
+        template = create_template([])
+        for number, field in enumerate(('a', 'b', 'c', 'd'), start=2):
+            version = MappingVersion.objects.create(
+                template=template, version_number=number, rules=[{"source_path": field, "target_field": field}]
+            )
+            RuleCompiler.get_plan(version)
+        self.assertEqual(len(RuleCompiler._plans), 2)
+
+    def test_plan_lookup_does_not_hash_the_rules(self):
+        template = create_template([{"source_path": "a", "target_field": "a"}])
+        version = template.active_version
+        self.assertEqual(version.rules_digest, MappingVersion.digest_rules(version.rules))
+        RuleCompiler.get_plan(version)
+        with mock.patch.object(MappingVersion, 'digest_rules', side_effect=AssertionError):
+            RuleCompiler.get_plan(version)
+
+        version.rules = [{"source_path": "b", "target_field": "a"}]
+        version.save(update_fields=['rules'])
+        version.refresh_from_db()
+        self.assertEqual(RuleCompiler.get_plan(version).apply({"b": 2}), {"a": 2})
+
+    def test_profile_digests_are_computed_once_per_change(self):
+        profile = create_template([]).source
+        fingerprint, identity = profile_fingerprint(profile), auth_identity(profile)
+        with mock.patch('core_hub.http_clients.json.dumps', side_effect=AssertionError):
+            self.assertEqual((profile_fingerprint(profile), auth_identity(profile)), (fingerprint, identity))
+        profile.api_url = 'http://other.local/api'
+        profile.save()
+        self.assertNotEqual(profile_fingerprint(profile), fingerprint)
+
+    def test_invalidate_drops_every_plan_of_a_version(self):
+        template = create_template([{"source_path": "a", "target_field": "a"}])
+        RuleCompiler.get_plan(template.active_version)
+        RuleCompiler.invalidate(template.active_version.pk)
+        self.assertEqual(len(RuleCompiler._plans), 0)
+
+
+class TemplateCacheTests(TestCase):
+    def setUp(self):
+        TemplateCache.clear()
+        self.template = create_template([])
+
+    def get(self):
+        return async_to_sync(TemplateCache.aget)(self.template.pk)
+
+    def test_signal_invalidation(self):
+        self.get()
+        self.template.name = 'Renamed'
+        self.template.save()
+        self.assertEqual(self.get().name, 'Renamed')
+
+    def test_edits_from_other_processes_expire_after_ttl(self):
+        self.assertEqual(self.get().name, 'Template')
+        # No signal reaches this process
+        MappingTemplate.objects.filter(pk=self.template.pk).update(name='Renamed')
+        self.assertEqual(self.get().name, 'Template')
+        with mock.patch('core_hub.template_cache.time.monotonic', return_value=time.monotonic() + 60):
+            self.assertEqual(self.get().name, 'Renamed')
+
+    def test_invalidation_during_a_fetch_skips_the_stale_insert(self):
+        fetch = MappingTemplate.objects.select_related('source', 'target', 'active_version').aget
+
+        async def racing_fetch(**kwargs):
+            template = await fetch(**kwargs)
+            TemplateCache.invalidate(template_id=template.pk, broadcast=False)
+            return template
+
+        queryset = mock.Mock()
+        queryset.aget = racing_fetch
+        with mock.patch.object(MappingTemplate.objects, 'select_related', return_value=queryset):
+            self.get()
+        self.assertNotIn(self.template.pk, TemplateCache._entries)
+        self.get()
+        self.assertIn(self.template.pk, TemplateCache._entries)
+
+
+class LogSinkTests(SimpleTestCase):
+    def setUp(self):
+        ExecutionLogSink._take(len(ExecutionLogSink._buffer))
+        ExecutionLogSink.written = ExecutionLogSink.failed = 0
+        patcher = mock.patch.object(ExecutionLogSink, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def entry(self, records):
+        entry = ExecutionLog(status='SUCCESS')
+        entry._pending_payloads = (records, None)
+        entry._approx_bytes = approx_size(records)
+        return entry
+
+    def test_approx_size_tracks_json_size(self):
+        records = [{"id": n, "name": "x" * 20} for n in range(1000)]
+        exact = len(json.dumps(records))
+        self.assertAlmostEqual(approx_size(records), exact, delta=exact * 0.05)
+        self.assertEqual(approx_size(None), 0)
+
+    @override_settings(INTEGRATION_HUB={'LOG_BUFFER_MAX_BYTES': 10000})
+    def test_buffer_is_bounded_by_payload_bytes(self):
+        self.assertTrue(ExecutionLogSink._enqueue(self.entry([{"n": "x" * 6000}])))
+        self.assertFalse(ExecutionLogSink._enqueue(self.entry([{"n": "x" * 6000}])))
+        self.assertTrue(ExecutionLogSink._enqueue(self.entry({"n": 1})))
+        ExecutionLogSink._take(10)
+        self.assertEqual(ExecutionLogSink._buffered_bytes, 0)
+
+    def test_failed_flush_is_retried_once(self):
+        ExecutionLogSink._enqueue(self.entry({"n": 1}))
+        with mock.patch.object(ExecutionLogSink, '_write', side_effect=[Exception('gone'), None]) as write:
+            ExecutionLogSink.flush()
+        self.assertEqual(write.call_count, 2)
+        self.assertEqual((ExecutionLogSink.written, ExecutionLogSink.failed), (1, 0))
+
+        ExecutionLogSink._enqueue(self.entry({"n": 1}))
+        with mock.patch.object(ExecutionLogSink, '_write', side_effect=Exception('gone')):
+            with self.assertLogs('core_hub.log_sink', 'ERROR') as logs:
+                ExecutionLogSink.flush()
+        self.assertEqual(ExecutionLogSink.failed, 1)
+        self.assertIn('Lost 1 buffered execution logs', logs.output[0])
+
+
+class PayloadBlobTests(TestCase):
+    def blob(self, payload):
+        blob = PayloadBlob.from_payload(payload)
+        blob.save()
+        return blob
+
+    def test_delete_unreferenced_keeps_referenced_and_recent_blobs(self):
+        referenced, orphan, fresh = self.blob({"n": 1}), self.blob({"n": 2}), self.blob({"n": 3})
+        ExecutionLog.objects.create(status='SUCCESS', output_blob=referenced)
+        PayloadBlob.objects.exclude(pk=fresh.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(PayloadBlob.delete_unreferenced(timedelta(days=1), batch_size=1), 1)
+        self.assertEqual(
+            set(PayloadBlob.objects.values_list('digest', flat=True)), {referenced.digest, fresh.digest}
+        )
+        self.assertFalse(PayloadBlob.objects.filter(pk=orphan.pk).exists())
+
+
+def upstream_transport(requests=None):
+    """
+    MockTransport answering every upstream call with a small JSON document.
+    """
+    def handler(request):
+        if requests is not None:
+            requests.append(request)
+        return httpx.Response(200, json={"a": "value"})
+    return httpx.MockTransport(handler)
+
+
+@override_settings(INTEGRATION_HUB={'LOG_BUFFER_ENABLED': False})
+class ClientLifecycleTests(TransactionTestCase):
+    def setUp(self):
+        TemplateCache.clear()
+        ClientRegistry.set_transport(upstream_transport())
+        self.addCleanup(ClientRegistry.set_transport, None)
+        self.template = create_template([{"source_path": "a", "target_field": "b"}])
+        self.url = f'/api/templates/{self.template.pk}/execute/'
+        self.built = []
+        build = ClientRegistry._build
+
+        def spy(*args):
+            entry = build(*args)
+            self.built.append(entry.client)
+            return entry
+        patcher = mock.patch.object(ClientRegistry, '_build', side_effect=spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_clients_are_closed_after_requests_on_short_lived_loops(self):
+        # The sync test client runs async views like WSGI: one loop per request
+        for _ in range(3):
+            response = self.client.post(self.url, data='{"params": {}}', content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.built)
+        self.assertTrue(all(client.is_closed for client in self.built))
+        self.assertEqual(len(ClientRegistry._pools), 0)
+
+    def test_clients_are_kept_on_a_shared_server_loop(self):
+        # An ASGI server without lifespan: one loop of its own, never marked
+        # persistent, serving every request
+        async def serve():
+            client = AsyncClient()
+            for _ in range(3):
+                response = await client.post(self.url, data='{"params": {}}', content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(self.built), 2)
+            self.assertFalse(any(client.is_closed for client in self.built))
+            await run_shutdown_hooks()
+
+        asyncio.run(serve())
+        self.assertTrue(all(client.is_closed for client in self.built))
+
+    async def test_clients_are_reused_on_a_persistent_loop(self):
+        mark_persistent_loop()
+        client = AsyncClient()
+        for _ in range(3):
+            response = await client.post(self.url, data='{"params": {}}', content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        # One client for the Source, one for the Target, kept open
+        self.assertEqual(len(self.built), 2)
+        self.assertFalse(any(client.is_closed for client in self.built))
+        await run_shutdown_hooks()
+        self.assertTrue(all(client.is_closed for client in self.built))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        CircuitBreaker.reset()
+        self.profile = IntegrationProfile(pk=1, name='Flaky', options={
+            "retry": {"attempts": 2, "backoff_ms": 0},
+            "breaker": {"enabled": True, "failure_threshold": 2, "reset_timeout": 60},
+        })
+
+    def call(self, *statuses):
+        statuses = iter(statuses)
+
+        async def send():
+            return httpx.Response(next(statuses))
+        return async_to_sync(upstream_request)(self.profile, send, idempotent=True)
+
+    def test_retried_attempts_count_as_one_call(self):
+        self.assertEqual(self.call(503, 503, 200).status_code, 200)
+        self.assertEqual(CircuitBreaker.state(self.profile)['consecutive_failures'], 0)
+
+        self.assertEqual(self.call(503, 503, 503).status_code, 503)
+        state = CircuitBreaker.state(self.profile)
+        self.assertEqual((state['state'], state['consecutive_failures']), ('closed', 1))
+
+        self.call(500)
+        self.assertEqual(CircuitBreaker.state(self.profile)['state'], 'open')
+        with self.assertRaises(ValueError):
+            self.call(200)
+
+
+class FakeClock:
+    """
+    Deterministic time.monotonic and asyncio.sleep: a sleep lets the other
+    tasks run, then moves the clock to its wake-up time.
+    """
+    _yield = staticmethod(asyncio.sleep)
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        wake = self.now + seconds
+        await self._yield(0)
+        self.now = max(self.now, wake)
+
+
+class UpstreamLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for patcher in (
+            mock.patch('core_hub.limits.time', self.clock),
+            mock.patch('core_hub.limits.asyncio.sleep', self.clock.sleep),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def limiter(self, **limits):
+        profile = IntegrationProfile(pk=1, name='Limited', options={"limits": limits})
+        return ProfileLimiter(UpstreamLimiter.options_for(profile))
+
+    def test_token_bucket_reservations(self):
+        bucket = TokenBucket(rate=2, burst=2)
+        now = self.clock.now
+        self.assertEqual([bucket.reserve(now) for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        # Refills at rate, capped at burst
+        self.assertEqual(bucket.delay(now + 2), 0.0)
+        self.assertEqual(bucket.delay(now + 100), 0.0)
+        self.assertEqual(bucket.tokens, 2.0)
+
+    def test_rate_limited_callers_wait_their_turn(self):
+        limiter = self.limiter(max_concurrency=0, rate_per_sec=1, burst=1, max_wait_ms=1500)
+
+        async def run():
+            # The third token is 2s away, beyond max_wait
+            return await asyncio.gather(*[limiter.acquire() for _ in range(3)], return_exceptions=True)
+        results = async_to_sync(run)()
+        self.assertEqual(results[:2], [None, None])
+        self.assertIsInstance(results[2], asyncio.TimeoutError)
+        self.assertEqual((limiter.acquired, limiter.timeouts, limiter.in_flight), (2, 1, 2))
+        self.assertEqual(limiter.stats()['max_wait_ms'], 1000.0)
+        self.assertEqual(self.clock.now, 1001.0)
+
+    def test_concurrency_cap(self):
+        limiter = self.limiter(max_concurrency=2, max_wait_ms=10)
+
+        async def run():
+            await limiter.acquire()
+            self.assertTrue(await limiter.try_acquire())
+            self.assertFalse(await limiter.try_acquire())
+            with self.assertRaises(asyncio.TimeoutError):
+                await limiter.acquire()
+            limiter.release()
+            self.assertTrue(await limiter.try_acquire())
+        async_to_sync(run)()
+        self.assertEqual((limiter.in_flight, limiter.timeouts), (2, 1))
+
+    def test_adaptive_backoff_and_recovery(self):
+        limiter = self.limiter(max_concurrency=0, rate_per_sec=10, max_wait_ms=5000)
+
+        async def run():
+            limiter.observe(429, retry_after=2)
+            self.assertEqual(limiter.bucket.rate, 5.0)
+            self.assertFalse(await limiter.try_acquire())
+            started = self.clock.now
+            await limiter.acquire()
+            # Held back until Retry-After passed
+            self.assertEqual(self.clock.now - started, 2.0)
+        async_to_sync(run)()
+
+        for _ in range(10):
+            limiter.observe(503)
+        self.assertEqual(limiter.bucket.rate, 0.5)  # Floor: rate_per_sec / 20
+        for _ in range(30):
+            limiter.observe(200)
+        self.assertEqual(limiter.bucket.rate, 10.0)
+        self.assertEqual(limiter.throttled, 11)
+
+        static = self.limiter(max_concurrency=0, rate_per_sec=10, adaptive=False)
+        static.observe(429, retry_after=5)
+        self.assertEqual((static.bucket.rate, static.paused_until, static.throttled), (10.0, 0.0, 0))
+
+
+class HedgerTests(SimpleTestCase):
+    OPTIONS = {'percentile': 95, 'min_delay': 0.01, 'max_delay': 0.01, 'min_samples': 1}
+
+    def setUp(self):
+        Hedger._histograms.clear()
+        Hedger.hedges_fired = Hedger.hedges_skipped = 0
+
+    def hedged(self, profile, delays):
+        delays = iter(delays)
+
+        async def send():
+            await asyncio.sleep(next(delays))
+            return httpx.Response(200)
+
+        async def run():
+            # The caller's own slot, as upstream_call holds it
+            release = await UpstreamLimiter.try_acquire(profile)
+            try:
+                return await Hedger.hedged(profile, send, self.OPTIONS)
+            finally:
+                release()
+        return async_to_sync(run)()
+
+    def test_cancelled_primary_is_observed(self):
+        profile = IntegrationProfile(pk=1, name='Slow', options={})
+        self.hedged(profile, [1.0, 0.0])
+        self.assertEqual(Hedger.hedges_fired, 1)
+        # Both attempts observed, the cancelled primary at ~the hedge delay
+        self.assertEqual(Hedger._histograms[1].total, 2)
+
+    def test_hedge_respects_concurrency_limit(self):
+        profile = IntegrationProfile(pk=2, name='Limited', options={"limits": {"max_concurrency": 1}})
+        self.hedged(profile, [0.05, 0.0])
+        self.assertEqual((Hedger.hedges_fired, Hedger.hedges_skipped), (0, 1))
+
+
+class SourceFetchTestCase(SimpleTestCase):
+    """
+    Source fetches against a MockTransport that records every request.
+    """
+    def setUp(self):
+        FetchCache.clear()
+        CircuitBreaker.reset()
+        self.addCleanup(CircuitBreaker.reset)
+        self.requests = []
+        self.status = 200
+        self.etag = None
+
+        async def handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.01)
+            if self.etag and request.headers.get('If-None-Match') == self.etag:
+                return httpx.Response(304)
+            headers = {'ETag': self.etag} if self.etag else {}
+            return httpx.Response(self.status, json={"url": str(request.url)}, headers=headers)
+
+        ClientRegistry.set_transport(httpx.MockTransport(handler))
+        self.addCleanup(ClientRegistry.set_transport, None)
+
+    def profile(self, token='one', **options):
+        options.setdefault('retry', {"attempts": 0})
+        return IntegrationProfile(
+            pk=1, name='Source', api_url='http://source.local/items/{id}',
+            auth_config={"type": "Bearer", "token": token}, options=options,
+        )
+
+    def fetch(self, *calls):
+        async def run():
+            try:
+                return await asyncio.gather(*[
+                    DataFetcher.fetch_data(profile, {"id": item_id}) for profile, item_id in calls
+                ])
+            finally:
+                await ClientRegistry.aclose_all()
+        return async_to_sync(run)()
+
+
+class FetchCacheTests(SourceFetchTestCase):
+    def test_cache_is_keyed_by_params_and_auth_identity(self):
+        profile = self.profile(cache={"ttl": 60})
+        self.fetch((profile, 1))
+        self.fetch((profile, 1))
+        self.assertEqual(len(self.requests), 1)
+
+        self.fetch((profile, 2))
+        self.fetch((self.profile(token='two', cache={"ttl": 60}), 1))
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual([request.headers['Authorization'] for request in self.requests[1:]],
+                         ['Bearer one', 'Bearer two'])
+
+    def test_expired_entries_are_refetched_or_revalidated(self):
+        profile = self.profile(cache={"ttl": 60})
+        self.fetch((profile, 1))
+        entry, = FetchCache._entries.values()
+        entry.expires_at = 0
+        self.fetch((profile, 1))
+        self.assertEqual(len(self.requests), 2)
+
+        self.etag = '"v1"'
+        FetchCache.clear()
+        self.fetch((profile, 1))
+        entry, = FetchCache._entries.values()
+        entry.expires_at = 0
+        revalidated = FetchCache.revalidated
+        self.assertEqual(self.fetch((profile, 1)), [{"url": 'http://source.local/items/1'}])
+        self.assertEqual(self.requests[-1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(FetchCache.revalidated, revalidated + 1)
+        self.assertTrue(entry.is_fresh())
+
+
+class SingleFlightTests(SourceFetchTestCase):
+    def test_concurrent_identical_fetches_share_one_request(self):
+        profile = self.profile(coalesce={"enabled": True})
+        results = self.fetch((profile, 1), (profile, 1), (profile, 1), (profile, 2))
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(results[0], results[2])
+        self.assertNotEqual(results[0], results[3])
+
+        # Different credentials never share a response
+        self.fetch((profile, 1), (self.profile(token='two', coalesce={"enabled": True}), 1))
+        self.assertEqual(len(self.requests), 4)
+
+    def test_coalescing_window_and_failures(self):
+        profile = self.profile(coalesce={"enabled": True, "window_ms": 10000})
+
+        async def run():
+            first = await DataFetcher.fetch_data(profile, {"id": 1})
+            second = await DataFetcher.fetch_data(profile, {"id": 1})
+            await ClientRegistry.aclose_all()
+            return first, second
+        first, second = async_to_sync(run)()
+        self.assertEqual((first, len(self.requests)), (second, 1))
+
+        # A failed result is not kept for later callers
+        self.status = 503
+        failing = self.profile(coalesce={"enabled": True, "window_ms": 10000})
+        failing.pk = 2
+
+        async def fail_twice():
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    await DataFetcher.fetch_data(failing, {"id": 1})
+            await ClientRegistry.aclose_all()
+        async_to_sync(fail_twice)()
+        self.assertEqual(len(self.requests), 3)
+
+
+@override_settings(INTEGRATION_HUB={'OFFLOAD_MIN_RECORDS': 10, 'OFFLOAD_CHUNK_RECORDS': 7, 'OFFLOAD_MAX_WORKERS': 2})
+class MappingOffloaderTests(TestCase):
+    RULES = [
+        {"source_path": "name", "target_field": "name", "transform": "TRIM | UPPERCASE"},
+        {"source_path": "items[*].price", "target_field": "prices"},
+    ]
+
+    def setUp(self):
+        MappingOffloader.shutdown()
+        self.addCleanup(MappingOffloader.shutdown)
+        self.version = create_template(self.RULES).active_version
+        self.plan = RuleCompiler.get_plan(self.version)
+        self.records = [{"name": f" item {n} ", "items": [{"price": n}, {"price": n * 2}]} for n in range(30)]
+
+    def map_records(self):
+        return async_to_sync(MappingOffloader.map_records)(self.version, self.plan, self.records)
+
+    def test_offloaded_chunks_match_inline_mapping_in_order(self):
+        batches, shipped = MappingOffloader.offloaded_batches, MappingOffloader.plans_shipped
+        expected = [self.plan.apply(record) for record in self.records]
+        self.assertEqual(self.map_records(), expected)
+        self.assertEqual(MappingOffloader.offloaded_batches, batches + 1)
+        # First use of the version: the rules travel with each of the 5 chunks
+        self.assertEqual(MappingOffloader.plans_shipped, shipped + 5)
+        self.assertEqual(self.map_records(), expected)
+
+    def test_chunks_are_resent_with_rules_after_plan_not_loaded(self):
+        self.map_records()
+        # A fresh pool has no plans, but the version counts as shipped
+        MappingOffloader.shutdown()
+        MappingOffloader._shipped_keys.add(version_key(self.version))
+        shipped = MappingOffloader.plans_shipped
+        self.assertEqual(self.map_records(), [self.plan.apply(record) for record in self.records])
+        self.assertEqual(MappingOffloader.plans_shipped, shipped + 5)
+
+    def test_broken_pool_falls_back_to_inline_mapping(self):
+        with mock.patch.object(MappingOffloader, '_run', side_effect=BrokenProcessPool()):
+            self.assertEqual(self.map_records(), [self.plan.apply(record) for record in self.records])
+        self.assertIsNone(MappingOffloader._executor)
+
+    def test_small_batches_stay_inline(self):
+        self.records = self.records[:5]
+        with mock.patch.object(MappingOffloader, '_run', side_effect=AssertionError):
+            self.assertEqual(len(self.map_records()), 5)
+
+
+class BatchingSenderTests(SimpleTestCase):
+    def setUp(self):
+        CircuitBreaker.reset()
+        self.addCleanup(CircuitBreaker.reset)
+        self.posted = []
+        self.status = 200
+        self.respond = lambda records: {"results": [{"id": record["n"]} for record in records]}
+
+        def handler(request):
+            records = json.loads(request.content)
+            self.posted.append(records)
+            if self.status != 200:
+                return httpx.Response(self.status, text='unavailable')
+            return httpx.Response(200, json=self.respond(records))
+
+        ClientRegistry.set_transport(httpx.MockTransport(handler))
+        self.addCleanup(ClientRegistry.set_transport, None)
+        self.profile = IntegrationProfile(pk=1, name='Target', type='TARGET', api_url='http://target.local/bulk', options={
+            "batch": {"max_size": 3, "max_linger_ms": 20, "results_path": "$.results"},
+        })
+
+    def submit(self, *numbers):
+        options = BatchingSender.options_for(self.profile)
+
+        async def run():
+            try:
+                return await asyncio.gather(*[
+                    BatchingSender.submit(self.profile, {"n": number}, options) for number in numbers
+                ], return_exceptions=True)
+            finally:
+                await BatchingSender.aflush_all()
+                await ClientRegistry.aclose_all()
+        return async_to_sync(run)()
+
+    def test_each_submitter_gets_its_own_slice(self):
+        results = self.submit(1, 2, 3, 4)
+        # Flushed at max_size, then the remaining record after the linger
+        self.assertEqual(self.posted, [[{"n": 1}, {"n": 2}, {"n": 3}], [{"n": 4}]])
+        self.assertEqual(results, [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}])
+
+    def test_unsplittable_response_goes_to_every_submitter(self):
+        self.respond = lambda records: {"accepted": len(records)}
+        self.assertEqual(self.submit(1, 2), [{"accepted": 2}, {"accepted": 2}])
+        self.assertEqual(len(self.posted), 1)
+
+    def test_failed_flush_rejects_every_pending_submitter(self):
+        self.status = 400
+        results = self.submit(1, 2, 3)
+        self.assertEqual(len(self.posted), 1)
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+            self.assertIn('400', str(result))
+
+
+@override_settings(INTEGRATION_HUB={'LOG_BUFFER_ENABLED': False})
+class BatchAndStreamTests(TransactionTestCase):
+    def setUp(self):
+        TemplateCache.clear()
+        ClientRegistry.set_transport(upstream_transport())
+        self.addCleanup(ClientRegistry.set_transport, None)
+        self.template = create_template([{"source_path": "a", "target_field": "b"}])
+        ExecutionMetrics.forget(self.template.pk)
+
+    def executions(self, status):
+        return ExecutionMetrics._executions.get((self.template.pk, status), 0)
+
+    def test_batch_records_metrics(self):
+        response = self.client.post(
+            f'/api/templates/{self.template.pk}/execute-batch/',
+            data=json.dumps([{"a": 1}, "not a record"]), content_type='application/json'
+        )
+        self.assertEqual(response.json()['succeeded'], 1)
+        self.assertEqual(self.executions('ERROR'), 1)
+
+    def post_batch(self, records):
+        return self.client.post(
+            f'/api/templates/{self.template.pk}/execute-batch/',
+            data=json.dumps(records), content_type='application/json'
+        )
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_batch_body_is_not_capped_by_django_upload_limit(self):
+        response = self.post_batch([{"a": "x" * 100}] * 50)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['succeeded'], 50)
+
+        with override_settings(INTEGRATION_HUB={'BATCH_MAX_BODY_BYTES': 1024}):
+            self.assertEqual(self.post_batch([{"a": "x" * 100}] * 50).status_code, 413)
+
+    def test_batch_reports_mapping_errors_per_record(self):
+        original = ExecutionPlan.apply
+
+        def apply(plan, record):
+            if record.get('a') == 'bad':
+                raise TypeError('cannot map')
+            return original(plan, record)
+
+        with mock.patch.object(ExecutionPlan, 'apply', apply):
+            response = self.post_batch([{"a": 1}, "not a record", {"a": "bad"}, {"a": 4}])
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['index'] for result in body['results']], [0, 3])
+        self.assertEqual(body['errors'], [
+            {"index": 1, "error": "Record is not a JSON object"}, {"index": 2, "error": "cannot map"},
+        ])
+
+    @override_settings(INTEGRATION_HUB={'STREAM_SEND_CHUNK_SIZE': 1, 'LOG_BUFFER_ENABLED': False})
+    def test_stream_is_sent_as_it_is_mapped_under_wsgi(self):
+        # The sync test client runs the view like WSGI: on a per-request loop
+        applied = []
+        original = ExecutionPlan.apply
+
+        def apply(plan, record):
+            applied.append(record)
+            return original(plan, record)
+
+        body = '\n'.join(json.dumps({"a": number}) for number in range(50))
+        with mock.patch.object(ExecutionPlan, 'apply', apply):
+            response = self.client.post(
+                f'/api/templates/{self.template.pk}/execute-stream/?send=false',
+                data=body, content_type='application/x-ndjson'
+            )
+            self.assertFalse(response.is_async)
+            content = iter(response.streaming_content)
+            self.assertEqual(json.loads(next(content))['b'], 0)
+            # Produced a few chunks ahead at most, not the whole upload
+            self.assertLess(len(applied), 10)
+            lines = [json.loads(line) for line in content]
+            response.close()
+        self.assertEqual([line['b'] for line in lines], list(range(1, 50)))
+        log = ExecutionLog.objects.select_related('input_blob').get()
+        self.assertEqual(log.get_input_data(), {"mode": "stream", "records": 50})
+
+    @mock.patch('core_hub.views.UPLOAD_READ_CHUNK_SIZE', 7)
+    async def test_stream_reads_lines_across_chunks(self):
+        body = '{"a": "first"}\n\nnot json\n{"a": "last"}'
+        response = await AsyncClient().post(
+            f'/api/templates/{self.template.pk}/execute-stream/?send=false',
+            data=body, content_type='application/x-ndjson'
+        )
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        lines = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(lines[0]['b'], 'first')
+        self.assertEqual(lines[1]['line'], 3)
+        self.assertIn('error', lines[1])
+        self.assertEqual(lines[2]['b'], 'last')
+        self.assertEqual(self.executions('ERROR'), 1)
+        log = await ExecutionLog.objects.select_related('input_blob').aget()
+        self.assertEqual(log.get_input_data(), {"mode": "stream", "records": 3})
+
+
+@override_settings(INTEGRATION_HUB={'LOG_BUFFER_ENABLED': False})
+class OpsEndpointTests(TransactionTestCase):
+    def setUp(self):
+        TemplateCache.clear()
+        ClientRegistry.set_transport(upstream_transport())
+        self.addCleanup(ClientRegistry.set_transport, None)
+        self.template = create_template([{"source_path": "a", "target_field": "b"}])
+        ExecutionMetrics.forget(self.template.pk)
+        response = self.client.post(
+            f'/api/templates/{self.template.pk}/execute/', data='{"params": {}}', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_prometheus_metrics(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        template = f'template_id="{self.template.pk}"'
+
+        self.assertIn("# TYPE integration_hub_executions_total counter", lines)
+        self.assertIn("# TYPE integration_hub_stage_duration_seconds histogram", lines)
+        self.assertIn(f'integration_hub_executions_total{{{template},status="SUCCESS"}} 1', lines)
+        for stage in ('fetch', 'send', 'total'):
+            labels = f'{template},stage="{stage}"'
+            self.assertIn(f'integration_hub_stage_duration_seconds_count{{{labels}}} 1', lines)
+            self.assertIn(f'integration_hub_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 1', lines)
+            buckets = [
+                int(line.rsplit(' ', 1)[1]) for line in lines
+                if line.startswith(f'integration_hub_stage_duration_seconds_bucket{{{labels},')
+            ]
+            self.assertEqual(len(buckets), len(BUCKETS) + 1)
+            self.assertEqual(buckets, sorted(buckets))
+            total, = [line for line in lines if line.startswith(f'integration_hub_stage_duration_seconds_sum{{{labels}}}')]
+            self.assertGreaterEqual(float(total.rsplit(' ', 1)[1]), 0.0)
+
+    def test_runtime_stats(self):
+        stats = self.client.get('/api/runtime/').json()
+        self.assertEqual(set(stats), {
+            "template_cache", "fetch_cache", "fetch_coalescing", "log_sink", "send_batching", "upstream_limits",
+            "circuit_breakers", "hedging", "mapping_offload", "transform_memo", "auto_map_cache",
+        })
+        self.assertGreaterEqual(stats["template_cache"]["misses"], 1)
+        self.assertIn("pending", stats["log_sink"])
+        self.assertIn("offloaded_batches", stats["mapping_offload"])
+
+
+@override_settings(INTEGRATION_HUB={'LOG_BUFFER_ENABLED': False, 'JOB_MAX_ATTEMPTS': 2})
+class JobQueueTests(TestCase):
+    def setUp(self):
+        TemplateCache.clear()
+        self.template = create_template([{"source_path": "a", "target_field": "b"}])
+
+    def claim(self):
+        return JobQueue.claim('worker-1')
+
+    def expire(self, job):
+        ExecutionJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_claim_and_retry_with_backoff(self):
+        job = JobQueue.enqueue(self.template, {"data": {"a": 1}})
+        claimed = self.claim()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, 'RUNNING', 1))
+        self.assertIsNone(self.claim())
+
+        JobQueue.fail(claimed, 'Upstream API Error: 503')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertIsNone(self.claim())
+
+        ExecutionJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+        claimed = self.claim()
+        self.assertEqual(claimed.attempts, 2)
+        JobQueue.fail(claimed, 'Upstream API Error: 503')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'ERROR')
+
+    def test_permanent_failure_is_not_retried(self):
+        job = JobQueue.enqueue(self.template, {})
+        JobQueue.fail(self.claim(), 'Template not found', retryable=False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('ERROR', 1))
+
+    def test_expired_leases_are_reclaimed_until_attempts_run_out(self):
+        job = JobQueue.enqueue(self.template, {})
+        self.expire(self.claim())
+        self.assertEqual(self.claim().attempts, 2)
+
+        self.expire(job)
+        self.assertIsNone(self.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'ERROR')
+
+    def test_renew_extends_only_a_held_lease(self):
+        JobQueue.enqueue(self.template, {})
+        claimed = self.claim()
+        self.expire(claimed)
+        self.assertTrue(JobQueue.renew(claimed))
+        self.assertIsNone(self.claim())
+
+        ExecutionJob.objects.filter(pk=claimed.pk).update(locked_by='worker-2')
+        self.assertFalse(JobQueue.renew(claimed))
+
+    def test_worker_fails_jobs_without_an_active_version_at_once(self):
+        from .management.commands.run_workers import Command
+
+        MappingTemplate.objects.filter(pk=self.template.pk).update(active_version=None)
+        job = JobQueue.enqueue(self.template, {"data": {"a": 1}})
+        async_to_sync(Command().run_job)(self.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('ERROR', 1))
+        self.assertEqual(ExecutionLog.objects.filter(status='ERROR').count(), 1)
+
+
+class ExecutionStatsTests(TestCase):
+    def setUp(self):
+        self.template = create_template([])
+
+    def log(self, seconds_ago, duration_ms=100.0, status='SUCCESS', **fields):
+        return ExecutionLog.objects.create(
+            template=self.template, status=status, duration_ms=duration_ms,
+            timestamp=timezone.now() - timedelta(seconds=seconds_ago), **fields
+        )
+
+    def summary(self):
+        now = timezone.now()
+        return ExecutionStats.summary(now - timedelta(hours=1), now, [self.template.pk])['templates'][0]
+
+    @override_settings(INTEGRATION_HUB={'STATS_ROLLUP_LAG': 30})
+    def test_refresh_folds_logs_into_rollups(self):
+        self.log(120)
+        self.log(120, duration_ms=300.0, status='ERROR')
+        self.log(120, is_test=True)
+        self.log(5)  # Inside the lag: left for a later refresh
+        self.assertEqual(ExecutionStats.refresh(force=True), 2)
+        self.assertEqual(ExecutionStats.refresh(force=True), 0)
+
+        stats = self.summary()
+        self.assertEqual((stats['executions'], stats['errors'], stats['latency_ms']['mean']), (2, 1, 200.0))
+
+        # A later log in the same minute and bucket updates the existing rollup
+        ExecutionLog.objects.filter(timestamp__gt=timezone.now() - timedelta(seconds=10)).delete()
+        self.log(120)
+        with override_settings(INTEGRATION_HUB={'STATS_ROLLUP_LAG': 0}):
+            # Timestamped before the watermark: only a rebuild counts it
+            self.assertEqual(ExecutionStats.refresh(force=True), 0)
+            self.assertEqual(ExecutionStats.rebuild(), 3)
+        self.assertEqual(self.summary()['executions'], 3)
+
+    def test_logs_committed_out_of_id_order_are_folded(self):
+        self.log(120, id=10)
+        with override_settings(INTEGRATION_HUB={'STATS_ROLLUP_LAG': 100}):
+            self.assertEqual(ExecutionStats.refresh(force=True), 1)
+        # Lower id, committed later, but timestamped after the watermark
+        self.log(60, id=5)
+        with override_settings(INTEGRATION_HUB={'STATS_ROLLUP_LAG': 30}):
+            self.assertEqual(ExecutionStats.refresh(force=True), 1)
+        self.assertEqual(self.summary()['executions'], 2)
+
+    def test_stats_requests_are_read_only(self):
+        self.log(120)
+        response = self.client.get(f'/api/templates/{self.template.pk}/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['executions'], 0)
+        self.assertFalse(ExecutionRollup.objects.exists())
+        self.assertFalse(RollupWatermark.objects.exists())
+
+
+class AutoMapCacheTests(TestCase):
+    def put(self, name, **fields):
+        key = AutoMapCache.key([name], ['target'], 1)
+        AutoMapCache.put(key, 1, {"suggestions": [name], "ai_powered": True})
+        if fields:
+            AutoMapCacheEntry.objects.filter(key=key).update(**fields)
+        return key
+
+    def test_hit_and_key_ignores_field_order(self):
+        key = self.put('a')
+        self.assertEqual(key, AutoMapCache.key(['a'], ['target'], 1))
+        self.assertEqual(AutoMapCache.key(['a', 'b'], ['t'], 1), AutoMapCache.key(['b', 'a'], ['t'], 1))
+        self.assertNotEqual(key, AutoMapCache.key(['a'], ['target'], 2))
+
+        hits = AutoMapCache.hits
+        self.assertEqual(AutoMapCache.get(key), {"suggestions": ['a'], "ai_powered": True})
+        self.assertEqual(AutoMapCache.hits, hits + 1)
+        self.assertEqual(AutoMapCacheEntry.objects.get(key=key).hits, 1)
+        self.assertIsNone(AutoMapCache.get(AutoMapCache.key(['b'], ['target'], 1)))
+
+    @override_settings(INTEGRATION_HUB={'AUTOMAP_CACHE_TTL': 60})
+    def test_expired_entries_are_misses_and_get_purged(self):
+        stale = self.put('a', created_at=timezone.now() - timedelta(seconds=61))
+        self.assertIsNone(AutoMapCache.get(stale))
+        self.put('b')
+        self.assertFalse(AutoMapCacheEntry.objects.filter(key=stale).exists())
+
+    @override_settings(INTEGRATION_HUB={'AUTOMAP_CACHE_MAX_ENTRIES': 2})
+    def test_least_recently_used_entry_is_evicted(self):
+        now = timezone.now()
+        first = self.put('a', last_used_at=now - timedelta(seconds=30))
+        second = self.put('b', last_used_at=now - timedelta(seconds=20))
+        self.assertIsNotNone(AutoMapCache.get(first))  # Now the most recent
+        third = self.put('c')
+        self.assertEqual(set(AutoMapCacheEntry.objects.values_list('key', flat=True)), {first, third})
+        self.assertIsNone(AutoMapCache.get(second))
+
+    @override_settings(INTEGRATION_HUB={'AUTOMAP_CACHE_MAX_ENTRIES': 0})
+    def test_disabled_cache_stores_nothing(self):
+        self.put('a')
+        self.assertFalse(AutoMapCacheEntry.objects.exists())
+
+    def test_endpoint_answers_repeats_from_the_cache(self):
+        llm = [{"source_path": "razao", "target_field": "legal", "confidence": 90, "transform": "", "reasoning": ""}]
+        data = {"source_fields": json.dumps(['cnpj', 'razao']), "target_fields": json.dumps(['cnpj', 'legal'])}
+        with mock.patch('core_hub.ai_views.suggest_with_llm', return_value=llm) as suggest:
+            first = self.client.post('/api/ai/auto-map/', data).json()
+            second = self.client.post('/api/ai/auto-map/', data).json()
+        suggest.assert_called_once_with(['cnpj', 'razao'], ['legal'])
+        self.assertEqual((first['cached'], second['cached']), (False, True))
+        self.assertEqual(first['suggestions'], second['suggestions'])
+        self.assertTrue(second['ai_powered'])
+
+
+class FuzzyMatcherTests(SimpleTestCase):
+    def test_local_tiers_resolve_unambiguous_fields(self):
+        suggestions, unresolved = match_fields(
+            ['$.data.cnpj', 'razaoSocial', 'cep', 'telefone', 'fone'],
+            ['cnpj', 'razao_social', 'zip_code', 'phone', 'anything'],
+        )
+        self.assertEqual(
+            {s['target_field']: (s['source_path'], s['matched_by']) for s in suggestions},
+            {'cnpj': ('$.data.cnpj', 'exact'), 'razao_social': ('razaoSocial', 'normalized'),
+             'zip_code': ('cep', 'synonym')},
+        )
+        # Two phone candidates: left to the matcher
+        self.assertEqual(unresolved, ['phone', 'anything'])
+
+    def test_similar_names_are_paired_one_to_one(self):
+        suggestions = match_fuzzy(
+            ['customer_full_name', 'customer_email_addr', 'order_total_amt'],
+            ['customerName', 'customerEmail', 'orderTotal', 'unrelated'],
+        )
+        self.assertEqual(
+            {s['target_field']: s['source_path'] for s in suggestions},
+            {'customerName': 'customer_full_name', 'customerEmail': 'customer_email_addr',
+             'orderTotal': 'order_total_amt'},
+        )
+        for suggestion in suggestions:
+            self.assertEqual(suggestion['matched_by'], 'fuzzy')
+            self.assertTrue(30 <= suggestion['confidence'] <= 99)
+
+    def test_similarity_matrix_is_bounded_cosine(self):
+        sources = ['a_b', 'a_c', 'b_c', 'abc', 'a_b_c']
+        targets = ['a_b', 'c', 'xyz']
+        similarity = automap.similarity_matrix(sources, targets)
+        self.assertEqual(similarity.shape, (3, 5))
+        self.assertAlmostEqual(float(similarity[0, 0]), 1.0, places=5)
+        self.assertTrue(np.all(similarity[2] == 0))
+        self.assertTrue(np.all((similarity >= 0) & (similarity <= 1.0001)))
+
+    # Greedy takes (0, 0) first and leaves target 1 without a source
+    CONTESTED = np.array([[0.9, 0.8], [0.85, 0.1]], dtype=np.float32)
+
+    @skipIf(automap.min_weight_full_bipartite_matching is None, "scipy is not installed")
+    def test_assignment_maximizes_total_similarity(self):
+        self.assertEqual(sorted(automap._assign(self.CONTESTED, 0.3)), [(0, 1), (1, 0)])
+
+    def test_greedy_assignment_without_scipy(self):
+        with mock.patch.object(automap, 'min_weight_full_bipartite_matching', None):
+            self.assertEqual(sorted(automap._assign(self.CONTESTED, 0.3)), [(0, 0)])
+
+    def test_candidates_are_pruned_per_target(self):
+        similarity = np.array([[0.9, 0.8, 0.7], [0.2, 0.6, 0.5]], dtype=np.float32)
+        targets, sources = automap._candidate_pairs(similarity, 0.3, 1)
+        self.assertEqual(sorted(zip(targets.tolist(), sources.tolist())), [(0, 0), (1, 1)])
+        targets, sources = automap._candidate_pairs(similarity, 0.3, 0)
+        self.assertEqual(len(targets), 5)
+        # A target whose only candidate was taken stays unmatched
+        self.assertEqual(automap._assign(np.array([[0.9], [0.8]], dtype=np.float32), 0.3, 1), [(0, 0)])
+
+    def test_fallback_reason_hides_error_details(self):
+        with mock.patch('core_hub.ai_views.GEMINI_API_KEY', 'key'):
+            self.assertEqual(llm_failure_reason(TimeoutError('secret host')), 'llm_timeout')
+            self.assertEqual(llm_failure_reason(json.JSONDecodeError('bad', 'doc', 0)), 'llm_invalid_response')
+            self.assertEqual(llm_failure_reason(RuntimeError('token=abc')), 'llm_error')
+        with mock.patch('core_hub.ai_views.GEMINI_API_KEY', None):
+            self.assertEqual(llm_failure_reason(ValueError('GEMINI_API_KEY not configured')), 'llm_not_configured')
+
+
+class ExecutionLogAPITests(TestCase):
+    def setUp(self):
+        self.template = create_template([])
+        self.other = create_template([])
+        self.now = timezone.now()
+
+    def log(self, template=None, status='SUCCESS', seconds_ago=0, **fields):
+        return ExecutionLog.objects.create(
+            template=template or self.template, status=status,
+            timestamp=self.now - timedelta(seconds=seconds_ago), **fields
+        )
+
+    def get(self, **params):
+        return self.client.get('/api/logs/', params)
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_filters(self):
+        old = self.log(seconds_ago=3600)
+        error = self.log(status='ERROR', seconds_ago=10)
+        test_run = self.log(is_test=True, seconds_ago=5)
+        other = self.log(template=self.other)
+
+        self.assertEqual(self.ids(self.get(template=self.other.pk)), [other.pk])
+        self.assertEqual(self.ids(self.get(status='error')), [error.pk])
+        self.assertEqual(self.ids(self.get(is_test='true')), [test_run.pk])
+        since = (self.now - timedelta(minutes=1)).isoformat()
+        until = (self.now - timedelta(seconds=1)).isoformat()
+        self.assertEqual(self.ids(self.get(since=since, until=until)), [test_run.pk, error.pk])
+        self.assertNotIn(old.pk, self.ids(self.get(since=since)))
+
+        self.assertEqual(self.get(template='abc').status_code, 400)
+        self.assertEqual(self.get(since='yesterday').status_code, 400)
+
+    def test_fields_projection(self):
+        blob = PayloadBlob.from_payload({"cnpj": "1"})
+        blob.save()
+        log = self.log(input_blob=blob)
+
+        row = self.get().json()['results'][0]
+        self.assertNotIn('input_data', row)
+        self.assertEqual(row['template_name'], 'Template')
+
+        row = self.get(fields='id, status,input_data').json()['results'][0]
+        self.assertEqual(row, {"id": log.pk, "status": 'SUCCESS', "input_data": {"cnpj": "1"}})
+
+        detail = self.client.get(f'/api/logs/{log.pk}/').json()
+        self.assertEqual(detail['input_data'], {"cnpj": "1"})
+
+        response = self.get(fields='id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+    def test_cursor_pages_through_equal_timestamps(self):
+        logs = [self.log() for _ in range(5)] + [self.log(seconds_ago=1) for _ in range(2)]
+        seen = []
+        response = self.get(page_size=2, fields='id')
+        while True:
+            seen += self.ids(response)
+            if not response.json()['next']:
+                break
+            response = self.client.get(response.json()['next'])
+        self.assertEqual(seen, [log.pk for log in reversed(logs[:5])] + [log.pk for log in reversed(logs[5:])])
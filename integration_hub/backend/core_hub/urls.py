@@ -2,20 +2,25 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     IntegrationProfileViewSet, MappingTemplateViewSet, 
-    MappingVersionViewSet, ExecutionLogViewSet,
-    execute_template_async
+    MappingVersionViewSet, ExecutionLogViewSet, ExecutionJobViewSet,
+    execute_template_async, execute_batch_async, execute_stream_async
 )
-from . import ai_views
+from . import ai_views, ops_views
 
 router = DefaultRouter()
 router.register(r'profiles', IntegrationProfileViewSet)
 router.register(r'templates', MappingTemplateViewSet)
 router.register(r'versions', MappingVersionViewSet)
 router.register(r'logs', ExecutionLogViewSet)
+router.register(r'jobs', ExecutionJobViewSet)
 
 urlpatterns = [
     path('templates/<int:pk>/execute/', execute_template_async, name='execute-template'),
+    path('templates/<int:pk>/execute-batch/', execute_batch_async, name='execute-template-batch'),
+    path('templates/<int:pk>/execute-stream/', execute_stream_async, name='execute-template-stream'),
     path('', include(router.urls)),
     path('ai/auto-map/', ai_views.auto_map, name='auto-map'),
+    path('runtime/', ops_views.runtime, name='runtime-stats'),
+    path('metrics/', ops_views.metrics, name='metrics'),
 ]
 
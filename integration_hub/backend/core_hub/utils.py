@@ -1,6 +1,14 @@
 import httpx
 import json
 import logging
+from .http_clients import ClientRegistry, auth_identity, resolve_secret
+from .fetch_cache import FetchCache
+from .singleflight import SingleFlight
+from .batching import BatchingSender
+from .hedging import Hedger
+from .lifespan import is_persistent_loop
+from .resilience import PermanentError, status_error, upstream_call, upstream_request
+from .json_stream import aiter_array_items
 
 logger = logging.getLogger(__name__)
 
@@ -15,54 +23,123 @@ class DataFetcher:
         Resolves a secret value. 
         If value starts with 'env:', reads from os.environ.
         """
-        if value and isinstance(value, str) and value.startswith('env:'):
-            env_var = value.split(':', 1)[1]
-            import os
-            return os.getenv(env_var, '') 
-        return value
+        return resolve_secret(value)
 
     @staticmethod
-    async def fetch_data(profile, params=None):
+    def build_url(profile, params=None):
         """
-        Fetches data from the profile's api_url ASYNC.
+        Resolves the profile's api_url with the given URL parameters.
         """
         if not profile.api_url:
-            raise ValueError("Source Profile has no API URL configured.")
+            raise PermanentError("Source Profile has no API URL configured.")
 
         url = profile.api_url
-        headers = {}
-        
-        # auth_config handling
-        auth = profile.auth_config
-        if auth:
-            if auth.get('type') == 'Bearer':
-                token = DataFetcher._resolve_secret(auth.get('token'))
-                headers['Authorization'] = f"Bearer {token}"
-            elif auth.get('type') == 'Basic':
-                pass 
-            elif auth.get('type') == 'ApiKey':
-                key_name = auth.get('key_name', 'X-API-Key')
-                key_value = DataFetcher._resolve_secret(auth.get('value'))
-                headers[key_name] = key_value
 
         # Parameter substitution
         if params:
             try:
                 url = url.format(**params)
             except KeyError as e:
-                raise ValueError(f"Missing required URL parameter: {e}")
+                raise PermanentError(f"Missing required URL parameter: {e}")
+        return url
+
+    @staticmethod
+    async def fetch_data(profile, params=None, use_cache=True):
+        """
+        Fetches data from the profile's api_url ASYNC.
+        Uses the profile's pooled client, which already carries the auth headers.
+        When the profile enables options["cache"], responses are served from
+        FetchCache and revalidated with conditional requests once expired;
+        use_cache=False bypasses the cache for this call. Concurrent identical
+        fetches are coalesced (see SingleFlight, options["coalesce"]) and
+        upstream calls go through the profile's limits, timeouts, retries and
+        circuit breaker (see resilience.upstream_call).
+        """
+        url = DataFetcher.build_url(profile, params)
+
+        ttl = FetchCache.ttl_for(profile) if use_cache else None
+        cache_key = entry = None
+        if ttl:
+            cache_key = (profile.pk, url, auth_identity(profile))
+            entry = FetchCache.get(cache_key)
+            if entry is not None and entry.is_fresh():
+                FetchCache.hits += 1
+                return entry.payload
 
         logger.info(f"Fetching data (ASYNC) from {url} with params {params}")
-        
+
+        # Identical concurrent fetches share one upstream request
+        window = SingleFlight.window_for(profile)
+        if window is None:
+            return await DataFetcher._fetch_remote(profile, url, ttl, cache_key, entry)
+        if not use_cache:
+            window = 0.0
+        flight_key = (profile.pk, url, auth_identity(profile), use_cache)
+        return await SingleFlight.do(
+            flight_key,
+            lambda: DataFetcher._fetch_remote(profile, url, ttl, cache_key, entry),
+            window
+        )
+
+    @staticmethod
+    async def _fetch_remote(profile, url, ttl=None, cache_key=None, entry=None):
+        """
+        GETs url with the profile's pooled client, revalidating and storing
+        the FetchCache entry when caching is enabled.
+        """
+        headers = entry.validators() if entry is not None else {}
         try:
-            async with httpx.AsyncClient(verify=False, follow_redirects=True) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                return response.json()
+            client = ClientRegistry.get_client(profile)
+            # Slow GETs are hedged with a second identical request when the
+            # profile opts in (options["hedge"])
+            send = Hedger.wrap(profile, lambda: client.get(url, headers=headers, follow_redirects=True))
+            response = await upstream_request(profile, send, idempotent=True)
+
+            if entry is not None and response.status_code == 304:
+                FetchCache.revalidated += 1
+                FetchCache.refresh(entry, ttl)
+                return entry.payload
+
+            response.raise_for_status()
+            payload = response.json()
+
+            if ttl:
+                FetchCache.misses += 1
+                if 'no-store' not in response.headers.get('Cache-Control', ''):
+                    FetchCache.store(
+                        cache_key, payload, ttl,
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified'),
+                    )
+            return payload
         except httpx.RequestError as e:
              raise ValueError(f"Failed to fetch data: {str(e)}")
         except httpx.HTTPStatusError as e:
-             raise ValueError(f"Upstream API Error: {e.response.status_code} - {e.response.text}")
+             raise status_error(f"Upstream API Error: {e.response.status_code} - {e.response.text}", e.response.status_code)
+
+    @staticmethod
+    async def stream_records(profile, params=None, records_path=''):
+        """
+        Streams the records of the JSON array at records_path in the source
+        response ASYNC, parsing the body incrementally as bytes arrive.
+        """
+        url = DataFetcher.build_url(profile, params)
+        logger.info(f"Streaming records (ASYNC) from {url} at '{records_path or '$'}'")
+
+        try:
+            client = ClientRegistry.get_client(profile)
+            request = client.build_request('GET', url)
+            send = lambda: client.send(request, stream=True, follow_redirects=True)
+            async with upstream_call(profile, send, idempotent=True) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for record in aiter_array_items(response.aiter_bytes(), records_path):
+                    yield record
+        except httpx.RequestError as e:
+             raise ValueError(f"Failed to fetch data: {str(e)}")
+        except httpx.HTTPStatusError as e:
+             raise status_error(f"Upstream API Error: {e.response.status_code} - {e.response.text}", e.response.status_code)
 
 class DataSender:
     """
@@ -70,33 +147,40 @@ class DataSender:
     """
     @staticmethod
     async def send_data(profile, data):
+        """
+        Sends mapped data to the Target ASYNC. Single records are micro-batched
+        when the profile enables options["batch"] (see BatchingSender) and the
+        loop is persistent; on a per-request loop a batch could only ever
+        hold that request's record.
+        """
         if not profile.api_url:
             return None 
 
+        if isinstance(data, dict):
+            batch_options = BatchingSender.options_for(profile)
+            if batch_options and is_persistent_loop():
+                return await BatchingSender.submit(profile, data, batch_options)
+        return await DataSender.post(profile, data)
+
+    @staticmethod
+    async def post(profile, data):
+        """
+        POSTs data to the Target as-is with the profile's pooled client.
+        """
         url = profile.api_url
         headers = {'Content-Type': 'application/json'}
-        
-        auth = profile.auth_config
-        if auth:
-            if auth.get('type') == 'Bearer':
-                token = DataFetcher._resolve_secret(auth.get('token'))
-                headers['Authorization'] = f"Bearer {token}"
-            elif auth.get('type') == 'ApiKey':
-                key_name = auth.get('key_name', 'X-API-Key')
-                key_value = DataFetcher._resolve_secret(auth.get('value'))
-                headers[key_name] = key_value
 
         logger.info(f"Sending data (ASYNC) to {url}")
         
         try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.post(url, json=data, headers=headers)
-                response.raise_for_status()
-                try:
-                    return response.json()
-                except ValueError:
-                    return {"status": response.status_code, "text": response.text}
+            client = ClientRegistry.get_client(profile)
+            response = await upstream_request(profile, lambda: client.post(url, json=data, headers=headers))
+            response.raise_for_status()
+            try:
+                return response.json()
+            except ValueError:
+                return {"status": response.status_code, "text": response.text}
         except httpx.RequestError as e:
              raise ValueError(f"Failed to send data: {str(e)}")
         except httpx.HTTPStatusError as e:
-             raise ValueError(f"Upstream Target Error: {e.response.status_code} - {e.response.text}")
+             raise status_error(f"Upstream Target Error: {e.response.status_code} - {e.response.text}", e.response.status_code)
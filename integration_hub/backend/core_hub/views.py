@@ -1,13 +1,28 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
-from .models import IntegrationProfile, MappingTemplate, MappingVersion, ExecutionLog
+from rest_framework.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import IntegrationProfile, MappingTemplate, MappingVersion, ExecutionLog, ExecutionJob
 from .serializers import (
     IntegrationProfileSerializer, MappingTemplateSerializer, 
-    MappingVersionSerializer, ExecutionLogSerializer
+    MappingVersionSerializer, ExecutionLogSerializer, ExecutionJobSerializer
 )
-from .engine import TransformationEngine
+from .pagination import ExecutionLogCursorPagination, ExecutionJobCursorPagination
+from .compiler import RuleCompiler
+from .conf import hub_setting
+from .template_cache import TemplateCache
+from .log_sink import ExecutionLogSink
+from .metrics import ExecutionMetrics, StageTimer
+from .jobs import JobQueue
+from .lifespan import release_loop, releases_loop
+from .offload import MappingOffloader, RecordMappingError
+from .pipeline import execute_template
+from .resilience import CircuitBreaker
+from .stats import ExecutionStats
 from .utils import DataFetcher, DataSender
+from datetime import timedelta
 import json
 import logging
 
@@ -17,144 +32,601 @@ class IntegrationProfileViewSet(viewsets.ModelViewSet):
     queryset = IntegrationProfile.objects.all()
     serializer_class = IntegrationProfileSerializer
 
+    @action(detail=True, methods=['get'])
+    def circuit(self, request, pk=None):
+        """
+        Circuit breaker state of this profile's upstream (this worker only).
+        """
+        return Response(CircuitBreaker.state(self.get_object()))
+
+    @action(detail=True, methods=['post'], url_path='circuit/reset')
+    def reset_circuit(self, request, pk=None):
+        """
+        Closes the breaker so the next call goes straight to the upstream.
+        """
+        profile = self.get_object()
+        CircuitBreaker.reset(profile_id=profile.pk)
+        return Response(CircuitBreaker.state(profile))
+
 class MappingTemplateViewSet(viewsets.ModelViewSet):
     queryset = MappingTemplate.objects.all()
     serializer_class = MappingTemplateSerializer
 
-from django.http import JsonResponse
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Latency percentiles, error rate and throughput of this template.
+        Query params: window (seconds, default STATS_DEFAULT_WINDOW) or
+        since/until (ISO 8601). Read-only: the rollups are refreshed in the
+        background (see stats.py).
+        """
+        template = self.get_object()
+        since, until = _stats_window(request.query_params)
+        summary = ExecutionStats.summary(since, until, template_ids=[template.pk])
+        stats = summary.pop('templates')
+        summary.update(stats[0] if stats else ExecutionStats.empty(template.pk))
+        return Response(summary)
+
+    @action(detail=False, methods=['get'], url_path='stats', url_name='stats-list')
+    def stats_list(self, request):
+        """
+        Stats of every template executed in the window (same params as the
+        detail action).
+        """
+        since, until = _stats_window(request.query_params)
+        return Response(ExecutionStats.summary(since, until))
+
+
+def _stats_datetime(params, name):
+    value = parse_datetime(params[name])
+    if value is None:
+        raise ValidationError({name: "Invalid ISO 8601 datetime."})
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _stats_window(params):
+    until = _stats_datetime(params, 'until') if params.get('until') else timezone.now()
+    if params.get('since'):
+        since = _stats_datetime(params, 'since')
+    else:
+        window = params.get('window') or str(hub_setting('STATS_DEFAULT_WINDOW'))
+        if not window.isdigit() or not int(window):
+            raise ValidationError({"window": "Expected a positive number of seconds."})
+        since = until - timedelta(seconds=int(window))
+    if since >= until:
+        raise ValidationError({"since": "Must be earlier than until."})
+    return since, until
+
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
+import asyncio
 import json
+import queue
+import threading
+
+# Bytes read per thread hop by the batch and NDJSON stream endpoints
+UPLOAD_READ_CHUNK_SIZE = 64 * 1024
+# Response chunks a WSGI stream may produce ahead of the client
+STREAM_QUEUE_CHUNKS = 2
+
+
+class BodyTooLarge(ValueError):
+    pass
+
+
+async def _read_body(request, max_bytes):
+    """
+    Reads the request body up to max_bytes. Used instead of request.body,
+    which is capped by DATA_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    too_large = BodyTooLarge(f"Request body too large (max {max_bytes} bytes)")
+    if max_bytes and int(request.META.get('CONTENT_LENGTH') or 0) > max_bytes:
+        raise too_large
+    chunks = []
+    size = 0
+    while True:
+        chunk = await asyncio.to_thread(request.read, UPLOAD_READ_CHUNK_SIZE)
+        if not chunk:
+            return b''.join(chunks)
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
 
 @csrf_exempt
+@releases_loop
 async def execute_template_async(request, pk=None):
     """
     Executes a mapping template (ASYNC).
+
+    With ?async=true the execution is queued as an ExecutionJob instead and
+    202 is returned with the job id; poll /api/jobs/<id>/ for the result.
     """
     if request.method != 'POST':
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
-    # Async ORM Fetch with select_related to avoid lazy loading issues
+    timer = StageTimer()
+
+    # Cached read-through of template, profiles and active version
     try:
-        template = await MappingTemplate.objects.select_related('source', 'target', 'active_version').aget(pk=pk)
+        with timer.stage('template'):
+            template = await TemplateCache.aget(pk)
     except MappingTemplate.DoesNotExist:
             return JsonResponse({"error": "Template not found"}, status=404)
 
-    input_data = None
-    
     # Parse body
     try:
         body_data = json.loads(request.body)
     except json.JSONDecodeError:
         return JsonResponse({"error": "Malformed JSON payload"}, status=400)
 
+    # Fire-and-forget: queue the execution for `manage.py run_workers`
+    if _query_flag(request, 'async'):
+        job = await sync_to_async(JobQueue.enqueue)(template, body_data)
+        return JsonResponse({
+            "job_id": str(job.pk),
+            "status": job.status,
+            "status_url": reverse('executionjob-detail', args=[job.pk]),
+        }, status=202)
+
+    try:
+        result = await execute_template(template, body_data, timer)
+    except Exception as e:
+        status_code = 400 if isinstance(e, ValueError) else 500
+        response = JsonResponse({"error": str(e)}, status=status_code)
+    else:
+        response = JsonResponse(result)
+    response['Server-Timing'] = timer.server_timing()
+    return response
+
+@csrf_exempt
+@releases_loop
+async def execute_batch_async(request, pk=None):
+    """
+    Executes a mapping template over an array of records (ASYNC).
+
+    Body is either a JSON array of records, or an object with:
+        - records: array of records to map
+        - params / records_path: fetch from the Source and map the array
+          found at records_path (defaults to the payload root)
+        - is_test: flag the execution log as a test run
+    The body may exceed DATA_UPLOAD_MAX_MEMORY_SIZE, up to
+    BATCH_MAX_BODY_BYTES. Records that are not objects or fail to map are
+    reported in errors by index; the rest are sent to the Target in a single
+    request and the whole batch is logged as one ExecutionLog row.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        template = await TemplateCache.aget(pk)
+    except MappingTemplate.DoesNotExist:
+        return JsonResponse({"error": "Template not found"}, status=404)
+
+    try:
+        body_data = json.loads(await _read_body(request, hub_setting('BATCH_MAX_BODY_BYTES')))
+    except BodyTooLarge as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Malformed JSON payload"}, status=400)
+
+    if isinstance(body_data, list):
+        body_data = {'records': body_data}
+    if not isinstance(body_data, dict):
+        return JsonResponse({"error": "Expected a JSON array or object"}, status=400)
+
     is_test = body_data.get('is_test', False)
-    
+    records = None
+    timer = StageTimer()
+
     try:
-        input_data = body_data.get('data')
-        
-        # WEBOOK SUPPORT: If Source has no API URL (Passive), and no 'data' wrapper is found
-        if not input_data and not template.source.api_url:
-            input_data = body_data
-            
-        # Fetch Logic
-        if not input_data:
+        records = body_data.get('records')
+        records_path = body_data.get('records_path', '')
+
+        if records is None:
             if not template.source.api_url:
-                raise ValueError("No input payload provided for Passive Source")
-            
-            fetch_params = body_data.get('params', {})
+                raise ValueError("No records provided for Passive Source")
             try:
-                # Active Fetch ASYNC
-                input_data = await DataFetcher.fetch_data(template.source, fetch_params)
+                # Parsed incrementally: only the records are kept, not the whole document
+                with timer.stage('fetch'):
+                    records = [
+                        record async for record in
+                        DataFetcher.stream_records(template.source, body_data.get('params', {}), records_path)
+                    ]
             except Exception as e:
-                    raise ValueError(f"Fetch Error: {str(e)}")
+                raise ValueError(f"Fetch Error: {str(e)}")
+        elif not isinstance(records, list):
+            raise ValueError("'records' must be a JSON array")
+
+        max_records = hub_setting('BATCH_MAX_RECORDS')
+        if len(records) > max_records:
+            raise ValueError(f"Batch too large: {len(records)} records (max {max_records})")
 
-        # Get active version rules
         if not template.active_version:
-                raise ValueError("No active version found for this template")
-        
-        rules = template.active_version.rules
-        output_data = {}
-        
-        # Helper to get value by path
-        def get_value_by_path(data, path):
-            if path.startswith('$.'):
-                path = path[2:]
-            parts = path.split('.')
-            current = data
-            for part in parts:
-                if isinstance(current, dict) and part in current:
-                    current = current[part]
-                elif isinstance(current, list) and part.isdigit():
-                    try:
-                        idx = int(part)
-                        if 0 <= idx < len(current):
-                            current = current[idx]
-                        else:
-                            return None
-                    except (ValueError, IndexError):
-                        return None
-                else:
-                    return None
-            return current
-
-        # Engine Execution (CPU bound, fast enough to run in main thread for now)
-        for rule in rules:
-            source_path = rule.get('source_path', '')
-            target_field = rule.get('target_field', '')
-            transform = rule.get('transform', '')
-
-            raw_value = get_value_by_path(input_data, source_path)
-            transformed_value = TransformationEngine.apply(raw_value, transform)
-            output_data[target_field] = transformed_value
-
-        # Add template ID to the output data
-        output_data['template_id'] = template.id
-
-        # Send to Target ASYNC
+            raise ValueError("No active version found for this template")
+
+        plan = RuleCompiler.get_plan(template.active_version)
+
+        valid = []
+        errors = []
+        for index, record in enumerate(records):
+            if not isinstance(record, (dict, list)):
+                errors.append({"index": index, "error": "Record is not a JSON object"})
+                continue
+            valid.append(index)
+
+        # Large batches are mapped in the process pool, off the event loop
+        with timer.stage('map'):
+            mapped_list = await MappingOffloader.map_records(
+                template.active_version, plan, [records[index] for index in valid]
+            )
+
+        results = []
+        for index, mapped in zip(valid, mapped_list):
+            if isinstance(mapped, RecordMappingError):
+                errors.append({"index": index, "error": str(mapped)})
+                continue
+            mapped['template_id'] = template.id
+            results.append({"index": index, "mapped_data": mapped})
+        errors.sort(key=lambda error: error['index'])
+
+        mapped_records = [result['mapped_data'] for result in results]
+
+        # One Target request for the whole batch
         target_response = None
-        if template.target:
-            target_response = await DataSender.send_data(template.target, output_data)
-
-        # Log execution ASYNC
-        await ExecutionLog.objects.acreate(
-            template=template,
-            version=template.active_version,
-            status='SUCCESS',
-            input_data=input_data,
-            output_data=output_data,
-            is_test=is_test
-        )
+        if template.target and mapped_records:
+            with timer.stage('send'):
+                target_response = await DataSender.send_data(template.target, mapped_records)
+
+        batch_status = 'ERROR' if errors else 'SUCCESS'
+        with timer.stage('log'):
+            await ExecutionLogSink.record(
+                template=template,
+                version=template.active_version,
+                status=batch_status,
+                input_data=records,
+                output_data=mapped_records,
+                error_message=f"{len(errors)} of {len(records)} records failed" if errors else None,
+                is_test=is_test,
+                **timer.log_fields()
+            )
+        ExecutionMetrics.observe(template.id, batch_status, timer)
 
         return JsonResponse({
-            "mapped_data": output_data,
+            "total": len(records),
+            "succeeded": len(results),
+            "failed": len(errors),
+            "results": results,
+            "errors": errors,
             "target_response": target_response
         })
 
     except Exception as e:
         error_msg = str(e)
-        logger.error(f"Execution failed: {error_msg}", exc_info=True)
-        # Safe Logging ASYNC
+        logger.error(f"Batch execution failed: {error_msg}", exc_info=True)
         try:
-            # We can't access template.active_version easily if template failed to load
-            if 'template' in locals():
-                await ExecutionLog.objects.acreate(
+            with timer.stage('log'):
+                await ExecutionLogSink.record(
                     template=template,
-                    version=template.active_version if template.active_version else None,
+                    version=template.active_version,
                     status='ERROR',
-                    input_data=input_data if 'input_data' in locals() else None,
+                    input_data=records,
                     error_message=error_msg,
-                    is_test=is_test
+                    is_test=is_test,
+                    **timer.log_fields()
                 )
         except Exception as log_error:
             logger.error(f"Failed to save error log: {log_error}", exc_info=True)
-            
+        ExecutionMetrics.observe(template.id, 'ERROR', timer)
+
         status_code = 400 if isinstance(e, ValueError) else 500
         return JsonResponse({"error": error_msg}, status=status_code)
 
+def _query_flag(request, name, default=False):
+    value = request.GET.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+@csrf_exempt
+@releases_loop
+async def execute_stream_async(request, pk=None):
+    """
+    Executes a mapping template over an NDJSON upload, streaming NDJSON back.
+
+    Each request line is one JSON record; each response line is its mapped
+    record, or {"line": n, "error": "..."} when a line cannot be mapped.
+    Records are read, mapped and written STREAM_SEND_CHUNK_SIZE at a time,
+    so memory stays flat regardless of upload size. Mapped records are
+    forwarded to the Target in chunks of the same size (disable with
+    ?send=false).
+
+    Under ASGI the response is an async iterator consumed on the server
+    loop; Django spools the whole upload to a temporary file before the view
+    runs, so the response only starts once the upload is complete. Under
+    WSGI the view's loop ends when it returns, and Django would collect an
+    async iterator into a list before sending anything, so the stream runs
+    on a loop of its own in a thread and is handed to the server as a sync
+    iterator, at most STREAM_QUEUE_CHUNKS chunks ahead of the client; lines
+    are read as they arrive.
+
+    With ?fetch=true the records come from the Source instead: the body is a
+    JSON object with params and records_path, and the source response is
+    parsed incrementally so each record is mapped as soon as it arrives.
+    Query params: is_test, send, fetch.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        template = await TemplateCache.aget(pk)
+    except MappingTemplate.DoesNotExist:
+        return JsonResponse({"error": "Template not found"}, status=404)
+
+    if not template.active_version:
+        return JsonResponse({"error": "No active version found for this template"}, status=400)
+
+    plan = RuleCompiler.get_plan(template.active_version)
+    is_test = _query_flag(request, 'is_test')
+    send = _query_flag(request, 'send', default=True) and bool(template.target and template.target.api_url)
+
+    if _query_flag(request, 'fetch'):
+        if not template.source.api_url:
+            return JsonResponse({"error": "Source has no API URL to fetch from"}, status=400)
+        try:
+            body_data = json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Malformed JSON payload"}, status=400)
+        if not isinstance(body_data, dict):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
+        records = _iter_fetched_records(template, body_data.get('params', {}), body_data.get('records_path', ''))
+        position_key = 'index'
+    else:
+        records = _iter_uploaded_records(request)
+        position_key = 'line'
+
+    def stream():
+        return _stream_mapped_records(records, position_key, template, plan, is_test, send)
+
+    response = StreamingHttpResponse(
+        # The WSGI handler would collect an async iterator before sending it
+        stream() if isinstance(request, ASGIRequest) else _iterate_on_own_loop(stream),
+        content_type='application/x-ndjson'
+    )
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _put_unless_stopped(chunks, item, stop):
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _iterate_on_own_loop(make_stream):
+    """
+    Runs the async iterator returned by make_stream() on a loop of its own
+    in a thread and yields its chunks, for WSGI servers. The thread stays at
+    most STREAM_QUEUE_CHUNKS chunks ahead, and stops when the response is
+    closed (e.g. the client went away).
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    stop = threading.Event()
+    done = object()
+
+    async def produce():
+        stream = make_stream()
+        try:
+            async for chunk in stream:
+                if not await asyncio.to_thread(_put_unless_stopped, chunks, chunk, stop):
+                    break
+        finally:
+            await stream.aclose()
+
+    def run():
+        try:
+            # async_to_sync gives the loop the per-request treatment, so its
+            # pooled clients are released when the stream ends
+            async_to_sync(produce)()
+        except Exception as e:
+            logger.error(f"Streaming execution thread failed: {e}", exc_info=True)
+        finally:
+            connections.close_all()
+            _put_unless_stopped(chunks, done, stop)
+
+    threading.Thread(target=run, name='execution-stream', daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        stop.set()
+
+
+async def _iter_uploaded_records(request):
+    """
+    Yields (line_number, record, error) for each non-blank NDJSON line.
+    The body is read in UPLOAD_READ_CHUNK_SIZE chunks in a thread, keeping
+    file and socket reads off the event loop.
+    """
+    line_number = 0
+    partial = b''
+    while True:
+        chunk = await asyncio.to_thread(request.read, UPLOAD_READ_CHUNK_SIZE)
+        lines = (partial + chunk).split(b'\n')
+        partial = lines.pop() if chunk else b''
+        for raw_line in lines:
+            line_number += 1
+            if not raw_line.strip():
+                continue
+            try:
+                yield line_number, json.loads(raw_line), None
+            except ValueError as e:
+                yield line_number, None, str(e)
+        if not chunk:
+            return
+
+
+async def _iter_fetched_records(template, params, records_path):
+    """
+    Yields (index, record, None) for each record streamed from the Source.
+    """
+    index = 0
+    async for record in DataFetcher.stream_records(template.source, params, records_path):
+        yield index, record, None
+        index += 1
+
+
+async def _stream_mapped_records(records, position_key, template, plan, is_test, send):
+    chunk_size = hub_setting('STREAM_SEND_CHUNK_SIZE')
+    pending = []
+    out_lines = []
+    total = failed = 0
+    error_msg = None
+    timer = StageTimer()
+
+    async def flush_to_target():
+        if send and pending:
+            with timer.stage('send'):
+                await DataSender.send_data(template.target, list(pending))
+        pending.clear()
+
+    try:
+        async for position, record, error in records:
+            total += 1
+            if error is None and not isinstance(record, (dict, list)):
+                error = "Record is not a JSON object"
+            if error is not None:
+                failed += 1
+                out_lines.append(json.dumps({position_key: position, "error": error}))
+            else:
+                mapped = plan.apply(record)
+                mapped['template_id'] = template.id
+                out_lines.append(json.dumps(mapped, default=str))
+                if send:
+                    pending.append(mapped)
+
+            if len(out_lines) >= chunk_size:
+                yield '\n'.join(out_lines) + '\n'
+                out_lines.clear()
+            if len(pending) >= chunk_size:
+                await flush_to_target()
+
+        await flush_to_target()
+        if out_lines:
+            yield '\n'.join(out_lines) + '\n'
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Streaming execution failed: {error_msg}", exc_info=True)
+        yield json.dumps({"error": error_msg}) + '\n'
+    finally:
+        if error_msg is None and failed:
+            error_msg = f"{failed} of {total} records failed"
+        try:
+            # Only counts are logged: the stream itself is never held in memory
+            await ExecutionLogSink.record(
+                template=template,
+                version=template.active_version,
+                status='ERROR' if error_msg else 'SUCCESS',
+                input_data={"mode": "stream", "records": total},
+                output_data={"mode": "stream", "mapped": total - failed, "failed": failed},
+                error_message=error_msg,
+                is_test=is_test,
+                **timer.log_fields()
+            )
+        except Exception as log_error:
+            logger.error(f"Failed to save stream log: {log_error}", exc_info=True)
+        ExecutionMetrics.observe(template.id, 'ERROR' if error_msg else 'SUCCESS', timer)
+        # Under WSGI the stream is consumed on a loop of its own
+        await release_loop()
+
 class MappingVersionViewSet(viewsets.ModelViewSet):
     queryset = MappingVersion.objects.all()
     serializer_class = MappingVersionSerializer
 
 class ExecutionLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Execution logs, newest first, keyset-paginated.
+
+    Filters: template, status, is_test, since, until (ISO 8601).
+    Projection: fields=id,status,... (payloads are left out of lists unless
+    input_data/output_data are requested explicitly; unknown names are a 400).
+    """
     queryset = ExecutionLog.objects.all()
     serializer_class = ExecutionLogSerializer
+    pagination_class = ExecutionLogCursorPagination
+
+    PAYLOAD_FIELDS = ('input_data', 'output_data')
+    LIST_FIELDS = ('id', 'template', 'template_name', 'version', 'timestamp', 'status', 'error_message', 'is_test')
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if fields:
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+            unknown = sorted(set(fields) - set(self.serializer_class().fields))
+            if unknown:
+                raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}."})
+            return fields
+        if self.action == 'list':
+            return list(self.LIST_FIELDS)
+        return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('template')
+        params = self.request.query_params
+
+        if params.get('template'):
+            if not params['template'].isdigit():
+                raise ValidationError({"template": "Expected a template id."})
+            queryset = queryset.filter(template_id=params['template'])
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'].upper())
+        if params.get('is_test') in ('true', 'false', '1', '0'):
+            queryset = queryset.filter(is_test=params['is_test'] in ('true', '1'))
+        for param, lookup in (('since', 'timestamp__gte'), ('until', 'timestamp__lt')):
+            if params.get(param):
+                value = parse_datetime(params[param])
+                if value is None:
+                    raise ValidationError({param: "Invalid ISO 8601 datetime."})
+                queryset = queryset.filter(**{lookup: value})
+
+        fields = self.get_requested_fields()
+        if fields is None or any(name in fields for name in self.PAYLOAD_FIELDS):
+            return queryset.select_related('input_blob', 'output_blob')
+        return queryset.defer(*self.PAYLOAD_FIELDS)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+
+class ExecutionJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Background execution jobs, newest first. Filters: template, status.
+    """
+    queryset = ExecutionJob.objects.all()
+    serializer_class = ExecutionJobSerializer
+    pagination_class = ExecutionJobCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('template')
+        params = self.request.query_params
+        if params.get('template'):
+            if not params['template'].isdigit():
+                raise ValidationError({"template": "Expected a template id."})
+            queryset = queryset.filter(template_id=params['template'])
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'].upper())
+        return queryset
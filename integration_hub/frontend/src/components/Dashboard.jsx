@@ -13,12 +13,13 @@ const Dashboard = () => {
     useEffect(() => {
         Promise.all([
             IntegrationService.getTemplates(),
-            IntegrationService.getLogs()
+            IntegrationService.getLogs({ page_size: 100 })
         ]).then(([tplRes, logsRes]) => {
+            const logs = logsRes.data.results;
             setStats({
                 totalTemplates: tplRes.data.length,
-                totalExecutions: logsRes.data.length,
-                recentLogs: logsRes.data.slice(0, 5) // Last 5
+                totalExecutions: logsRes.data.next ? `${logs.length}+` : logs.length,
+                recentLogs: logs.slice(0, 5) // Last 5
             });
         });
     }, []);
@@ -33,7 +33,7 @@ const Step2Mapping = ({ rules, onChange, sourceSchema, targetSchema }) => {
 
     const transformations = [
         'UPPERCASE', 'LOWERCASE', 'TRIM', 'REMOVE_PUNCTUATION',
-        'ROUND(2)', 'DATE_FORMAT(%Y-%m-%d)', 'DEFAULT(0)'
+        'ROUND(2)', 'DATE_FORMAT(%Y-%m-%d)', 'DEFAULT(0)', 'TRIM | UPPERCASE'
     ];
 
     // Schema-to-Schema Auto-Mapping
@@ -115,7 +115,7 @@ const Step2Mapping = ({ rules, onChange, sourceSchema, targetSchema }) => {
                 <div>
                     <p className="font-semibold">Mapping Instructions</p>
                     <p>Enter the JSON Path for the source (e.g. <code>$.company.name</code>) and the Destination Field Name.</p>
-                    <p>Optional: Apply transformation functions like <code>UPPERCASE</code>, <code>DATE_FORMAT</code>, etc.</p>
+                    <p>Optional: Apply transformation functions like <code>UPPERCASE</code>, <code>DATE_FORMAT</code>, etc. Chain them with <code>|</code>, e.g. <code>TRIM | UPPERCASE | DEFAULT(N/A)</code>.</p>
                 </div>
             </div>
 
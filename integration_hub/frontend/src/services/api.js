@@ -16,7 +16,8 @@ export const IntegrationService = {
     deleteTemplate: (id) => api.delete(`templates/${id}/`),
     createVersion: (data) => api.post('versions/', data),
     executeTemplate: (id, inputData) => api.post(`templates/${id}/execute/`, { data: inputData }),
-    getLogs: () => api.get('logs/'),
+    // Paginated: { next, previous, results }
+    getLogs: (params) => api.get('logs/', { params }),
     // AI Auto-Mapping
     autoMap: (formData) => api.post('ai/auto-map/', formData, {
         headers: { 'Content-Type': 'multipart/form-data' }